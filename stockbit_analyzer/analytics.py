@@ -0,0 +1,231 @@
+import numpy as np
+
+from stockbit_analyzer.brokers import UNKNOWN
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import BUY, load_rows
+
+
+GROUP_BY = ("type", "category")
+GROUP_PER = ("date", "symbol")
+GROUP_METRICS = ("net_value", "net_lot", "buy_value", "sell_value")
+
+
+def rows_to_arrays(rows):
+    """Convert stored (date, side, broker, value, lot, avg) rows into column arrays"""
+    if not rows:
+        empty = np.array([], dtype=object)
+        return {
+            "dates": empty,
+            "is_buy": np.array([], dtype=bool),
+            "brokers": empty,
+            "value": np.array([], dtype=np.float64),
+            "lot": np.array([], dtype=np.float64),
+            "avg": np.array([], dtype=np.float64),
+        }
+
+    dates, sides, brokers, values, lots, avgs = zip(*rows)
+    return {
+        "dates": np.asarray(dates, dtype=object),
+        "is_buy": np.asarray(sides, dtype=object) == BUY,
+        "brokers": np.asarray(brokers, dtype=object),
+        "value": np.nan_to_num(np.asarray(values, dtype=np.float64)),
+        "lot": np.nan_to_num(np.asarray(lots, dtype=np.float64)),
+        "avg": np.asarray(avgs, dtype=np.float64),
+    }
+
+
+def trailing_streak(mask):
+    """Length of the run of True values ending at the last column, per row"""
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    return np.cumprod(mask[:, ::-1], axis=1).sum(axis=1)
+
+
+def compute_flow(arrays):
+    """Aggregate per-broker net flow, average prices and streaks from column arrays"""
+    broker_codes, broker_idx = np.unique(arrays["brokers"].astype(str), return_inverse=True)
+    day_codes, day_idx = np.unique(arrays["dates"].astype(str), return_inverse=True)
+    n_brokers = len(broker_codes)
+    n_days = len(day_codes)
+
+    is_buy = arrays["is_buy"]
+    value = arrays["value"]
+    lot = arrays["lot"]
+    sign = np.where(is_buy, 1.0, -1.0)
+
+    def per_broker(weights):
+        return np.bincount(broker_idx, weights=weights, minlength=n_brokers)
+
+    buy_value = per_broker(value * is_buy)
+    sell_value = per_broker(value * ~is_buy)
+    buy_lot = per_broker(lot * is_buy)
+    sell_lot = per_broker(lot * ~is_buy)
+
+    # Lot-weighted average prices over the rows with a known average; brokers
+    # without such rows on a side get NaN
+    known = ~np.isnan(arrays["avg"])
+    lot_x_avg = np.where(known, lot * arrays["avg"], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buy_avg = per_broker(lot_x_avg * is_buy) / per_broker(lot * known * is_buy)
+        sell_avg = per_broker(lot_x_avg * ~is_buy) / per_broker(lot * known * ~is_buy)
+
+    # Broker x day net value matrix drives the streak computation
+    daily_net = np.bincount(
+        broker_idx * n_days + day_idx,
+        weights=value * sign,
+        minlength=n_brokers * n_days,
+    ).reshape(n_brokers, n_days)
+
+    accumulation_streak = trailing_streak(daily_net > 0)
+    distribution_streak = trailing_streak(daily_net < 0)
+
+    return {
+        "dates": day_codes,
+        "brokers": broker_codes,
+        "net_value": buy_value - sell_value,
+        "net_lot": buy_lot - sell_lot,
+        "buy_value": buy_value,
+        "sell_value": sell_value,
+        "buy_lot": buy_lot,
+        "sell_lot": sell_lot,
+        "buy_avg": buy_avg,
+        "sell_avg": sell_avg,
+        "avg_spread": buy_avg - sell_avg,
+        "active_days": (daily_net != 0).sum(axis=1),
+        "accumulation_days": (daily_net > 0).sum(axis=1),
+        "streak": accumulation_streak - distribution_streak,
+    }
+
+
+def rank_flow(flow, by="net_value"):
+    """Reorder every per-broker column of a flow result by `by`, largest first"""
+    order = np.argsort(-flow[by], kind="stable")
+    ranked = {"dates": flow["dates"]}
+    for key, column in flow.items():
+        if key != "dates":
+            ranked[key] = column[order]
+    return ranked
+
+
+def broker_flow(conn, symbol, start=None, end=None, by="net_value"):
+    """Ranked per-broker accumulation/distribution table for a symbol over a date window"""
+    arrays = rows_to_arrays(load_rows(conn, symbol, start, end))
+    return rank_flow(compute_flow(arrays), by=by)
+
+
+def format_flow_table(flow, top=10):
+    """Format the top accumulators and distributors of a ranked flow result"""
+    dates = flow["dates"]
+    if len(dates) == 0:
+        return "No stored data for this window"
+
+    header = (
+        f"{'Broker':<7} {'Net val':>16} {'Net lot':>12} {'B.avg':>10} "
+        f"{'S.avg':>10} {'Spread':>9} {'Days+':>6} {'Streak':>7}"
+    )
+    separator = "-" * len(header)
+
+    def format_rows(indices):
+        lines = []
+        for i in indices:
+            lines.append(
+                f"{flow['brokers'][i]:<7} "
+                f"{flow['net_value'][i]:>16,.0f} "
+                f"{flow['net_lot'][i]:>12,.0f} "
+                f"{flow['buy_avg'][i]:>10,.1f} "
+                f"{flow['sell_avg'][i]:>10,.1f} "
+                f"{flow['avg_spread'][i]:>9,.1f} "
+                f"{flow['accumulation_days'][i]:>6} "
+                f"{flow['streak'][i]:>+7}"
+            )
+        return lines
+
+    n = len(flow["brokers"])
+    accumulating = [i for i in range(min(top, n)) if flow["net_value"][i] > 0]
+    distributing = [i for i in range(n - 1, max(n - top, 0) - 1, -1) if flow["net_value"][i] < 0]
+
+    lines = [f"📅 Window: {dates[0]} to {dates[-1]} ({len(dates)} trading days)", ""]
+    lines.extend(["ACCUMULATING", header, separator])
+    lines.extend(format_rows(accumulating))
+    lines.extend(["", "DISTRIBUTING", header, separator])
+    lines.extend(format_rows(distributing))
+    return "\n".join(lines)
+
+
+def broker_groups(conn, by="type"):
+    """Group labels and a store broker id -> label index lookup array from the brokers table"""
+    if by not in GROUP_BY:
+        raise ValueError(f"Unknown broker grouping {by!r}; expected one of {', '.join(GROUP_BY)}")
+    rows = conn.execute(f"SELECT id, {by} FROM brokers").fetchall()
+    labels = sorted({value or UNKNOWN for _, value in rows} | {UNKNOWN})
+    label_index = {label: index for index, label in enumerate(labels)}
+
+    # Id 0 stands for rows stored without a broker id
+    lookup = np.full(max((broker_id for broker_id, _ in rows), default=0) + 1, label_index[UNKNOWN], dtype=np.int64)
+    for broker_id, value in rows:
+        lookup[broker_id] = label_index[value or UNKNOWN]
+    return np.array(labels, dtype=object), lookup
+
+
+def group_flow(conn, by="type", per=None, start=None, end=None):
+    """Net flow of broker groups (foreign/local by type, or by category) over every stored symbol and day
+
+    SQLite sums the broker_activity index per broker id (and per date or
+    symbol with `per`); the grouping itself is one bincount over a
+    broker id -> group lookup. Metrics are (groups x keys) arrays, where
+    keys are the dates or symbols, or a single 'all' column.
+    """
+    if per is not None and per not in GROUP_PER:
+        raise ValueError(f"Unknown flow breakdown {per!r}; expected one of {', '.join(GROUP_PER)}")
+    labels, lookup = broker_groups(conn, by)
+
+    key = per or "'all'"
+    query = (
+        f"SELECT COALESCE(broker_id, 0), {key}, "
+        "SUM(net_value), SUM(net_lot), SUM(buy_value), SUM(sell_value) FROM broker_activity WHERE 1"
+    )
+    params = []
+    if start:
+        query += " AND date >= ?"
+        params.append(to_iso_date(start))
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    rows = conn.execute(query + " GROUP BY 1, 2", params).fetchall()
+
+    flow = {"by": by, "per": per, "groups": labels}
+    if not rows:
+        flow["keys"] = np.array([], dtype=object)
+        for metric in GROUP_METRICS:
+            flow[metric] = np.zeros((len(labels), 0))
+        return flow
+
+    ids, keys, *metrics = zip(*rows)
+    key_codes, key_idx = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    n_groups, n_keys = len(labels), len(key_codes)
+    cells = lookup[np.asarray(ids, dtype=np.int64)] * n_keys + key_idx
+
+    flow["keys"] = key_codes.astype(object)
+    for metric, values in zip(GROUP_METRICS, metrics):
+        flow[metric] = np.bincount(
+            cells, weights=np.asarray(values, dtype=np.float64), minlength=n_groups * n_keys
+        ).reshape(n_groups, n_keys)
+    return flow
+
+
+def format_group_flow(flow, metric="net_value"):
+    """Format a group_flow result: one row per key, one column per group"""
+    keys = flow["keys"]
+    if len(keys) == 0:
+        return "No stored activity for this window"
+
+    groups = list(flow["groups"])
+    header = f"{(flow['per'] or 'window').capitalize():<10} " + " ".join(f"{group:>18}" for group in groups)
+    lines = [f"📊 {metric} by broker {flow['by']}", "", header, "-" * len(header)]
+    values = flow[metric]
+    for column, key in enumerate(keys):
+        lines.append(f"{key:<10} " + " ".join(f"{values[row, column]:>18,.0f}" for row in range(len(groups))))
+    if len(keys) > 1:
+        lines.append("-" * len(header))
+        lines.append(f"{'Total':<10} " + " ".join(f"{total:>18,.0f}" for total in values.sum(axis=1)))
+    return "\n".join(lines)
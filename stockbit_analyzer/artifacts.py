@@ -0,0 +1,153 @@
+import json
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.page_helpers import (
+    BROKER_SUMMARY_LOCATOR, HELPERS_VERSION, call_helper, last_helper_result, rows_from_cells,
+)
+from stockbit_analyzer.parsing import parse_broker_table
+
+
+ARTIFACT_ROOT = Path.home() / ".stockbit_data" / "artifacts"
+
+SCREENSHOT_FILE = "screenshot.png"
+CONTAINER_FILE = "container.html"
+PAGE_FILE = "page.html"
+RESULT_FILE = "last_result.json"
+META_FILE = "meta.json"
+
+# Tags whose boundaries separate words in the rendered text
+BLOCK_TAGS = {"br", "div", "li", "p", "table", "tbody", "td", "th", "thead", "tr"}
+
+log = get_logger(__name__)
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Approximate innerText of saved page HTML: text with cell and block boundaries as whitespace"""
+    collector = _TextCollector()
+    collector.feed(html)
+    collector.close()
+    return "".join(collector.parts)
+
+
+def get_artifact_root(artifact_dir=None):
+    return Path(artifact_dir) if artifact_dir else ARTIFACT_ROOT
+
+
+def capture_failure(page, artifact_dir, stock_symbol, reason, target_date=None):
+    """Save what a failed step left behind: screenshot, container HTML and the last helper result
+
+    Written to <artifact_dir>/<symbol>/<date>-<time>/; returns that directory.
+    Capturing never raises, so a batch can move straight on.
+    """
+    day = target_date.strftime("%Y-%m-%d") if target_date else "run"
+    path = get_artifact_root(artifact_dir) / (stock_symbol or "unknown") / f"{day}-{time.strftime('%H%M%S')}"
+    path.mkdir(parents=True, exist_ok=True)
+
+    # Read before markContainer below replaces it
+    last = last_helper_result(page)
+    meta = {
+        "symbol": stock_symbol,
+        "date": day if target_date else None,
+        "reason": str(reason),
+        "captured": datetime.now().isoformat(timespec="seconds"),
+        "helpers_version": HELPERS_VERSION,
+        "files": [],
+    }
+    try:
+        meta["url"] = page.url
+    except Exception:
+        meta["url"] = None
+
+    try:
+        page.screenshot(path=str(path / SCREENSHOT_FILE), full_page=True, timeout=10000)
+        meta["files"].append(SCREENSHOT_FILE)
+    except Exception as e:
+        log.warning(f"Could not save screenshot: {e}", extra={"symbol": stock_symbol, "phase": "artifacts"})
+
+    try:
+        html = None
+        if call_helper(page, "markContainer").get("found"):
+            html = page.locator(BROKER_SUMMARY_LOCATOR).first.evaluate("element => element.outerHTML")
+        if html:
+            (path / CONTAINER_FILE).write_text(html, encoding="utf-8")
+            meta["files"].append(CONTAINER_FILE)
+        else:
+            # No container to narrow down to; keep the whole document
+            (path / PAGE_FILE).write_text(page.content(), encoding="utf-8")
+            meta["files"].append(PAGE_FILE)
+    except Exception as e:
+        log.warning(f"Could not save page HTML: {e}", extra={"symbol": stock_symbol, "phase": "artifacts"})
+
+    if last is not None:
+        (path / RESULT_FILE).write_text(json.dumps(last, indent=2, default=str), encoding="utf-8")
+        meta["files"].append(RESULT_FILE)
+
+    (path / META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    log.info(f"Failure artifacts saved to {path}", extra={"symbol": stock_symbol, "date": meta["date"], "phase": "artifacts"})
+    return path
+
+
+def replay_artifact(path):
+    """Re-parse a failure artifact directory, saved .html file or --dump-raw .txt offline
+
+    Returns a day dict with 'rows' (empty if nothing parsed), 'symbol',
+    'date', 'source' and, when the header row is missing, 'error'.
+    """
+    path = Path(path)
+    meta = {}
+    if path.is_dir():
+        if (path / META_FILE).exists():
+            meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        for name in (CONTAINER_FILE, PAGE_FILE):
+            if (path / name).exists():
+                source = path / name
+                break
+        else:
+            raise FileNotFoundError(f"No {CONTAINER_FILE} or {PAGE_FILE} in {path}")
+    else:
+        source = path
+        # --dump-raw files are <symbol>/<YYYY-MM-DD>.txt
+        meta = {"symbol": path.parent.name, "date": path.stem}
+
+    text = source.read_text(encoding="utf-8")
+    if source.suffix == ".html":
+        text = html_to_text(text)
+
+    cells = parse_broker_table(text)
+    day_data = {
+        "symbol": meta.get("symbol"),
+        "date": meta.get("date"),
+        "source": str(source),
+        "rows": rows_from_cells(cells or []),
+    }
+    if cells is None:
+        day_data["error"] = "Could not find header row"
+        day_data["rawExcerpt"] = " ".join(text.split())[:500]
+    return day_data
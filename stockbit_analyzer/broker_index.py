@@ -0,0 +1,76 @@
+from stockbit_analyzer.parsing import to_iso_date
+
+
+def last_trading_days(conn, days, end=None):
+    """The most recent `days` stored trading dates up to `end`, oldest first"""
+    query = "SELECT date FROM trading_days"
+    params = []
+    if end:
+        query += " WHERE date <= ?"
+        params.append(to_iso_date(end))
+    query += " ORDER BY date DESC LIMIT ?"
+    params.append(days)
+    return [row[0] for row in conn.execute(query, params)][::-1]
+
+
+def broker_top_symbols(conn, broker, days=5, end=None, limit=10, net_sell=False):
+    """Symbols a broker net-bought (or net-sold) most over the last `days` trading days
+
+    Reads only the broker's slice of the broker_activity index, so the cost
+    depends on that broker's recent activity, not on the number of symbols.
+    """
+    window = last_trading_days(conn, days, end=end)
+    if not window:
+        return []
+
+    order = "ASC" if net_sell else "DESC"
+    rows = conn.execute(
+        f"""
+        SELECT symbol, SUM(net_value) AS net_value, SUM(net_lot), SUM(buy_value), SUM(sell_value), COUNT(*)
+        FROM broker_activity
+        WHERE broker = ? AND date >= ? AND date <= ?
+        GROUP BY symbol
+        HAVING SUM(net_value) {'<' if net_sell else '>'} 0
+        ORDER BY net_value {order}
+        LIMIT ?
+        """,
+        (broker, window[0], window[-1], limit),
+    ).fetchall()
+
+    return [
+        {
+            "symbol": symbol,
+            "net_value": net_value,
+            "net_lot": net_lot,
+            "buy_value": buy_value,
+            "sell_value": sell_value,
+            "active_days": active_days,
+            "start": window[0],
+            "end": window[-1],
+        }
+        for symbol, net_value, net_lot, buy_value, sell_value, active_days in rows
+    ]
+
+
+def format_broker_activity(broker, results, net_sell=False):
+    """Format broker_top_symbols results as a table"""
+    if not results:
+        return f"No stored activity for broker {broker}"
+
+    action = "net-sold" if net_sell else "net-bought"
+    lines = [
+        f"📅 {broker} {action} from {results[0]['start']} to {results[0]['end']}",
+        "",
+        f"{'Symbol':<8} {'Net val':>18} {'Net lot':>14} {'B.val':>18} {'S.val':>18} {'Days':>5}",
+        "-" * 86,
+    ]
+    for result in results:
+        lines.append(
+            f"{result['symbol']:<8} "
+            f"{result['net_value']:>18,.0f} "
+            f"{result['net_lot']:>14,.0f} "
+            f"{result['buy_value']:>18,.0f} "
+            f"{result['sell_value']:>18,.0f} "
+            f"{result['active_days']:>5}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,177 @@
+import csv
+import os
+from pathlib import Path
+
+
+BUNDLED_REGISTRY = Path(__file__).with_name("brokers.csv")
+LOCAL_REGISTRY = Path.home() / ".stockbit_data" / "brokers.csv"
+
+FIELDS = ("id", "code", "name", "type", "category")
+BROKER_TYPES = ("foreign", "local", "unknown")
+UNKNOWN = "unknown"
+
+# Codes first seen in extracted rows get store ids from here up, below are registry ids
+UNREGISTERED_ID_BASE = 1000
+
+_cache = {}
+
+
+def get_registry_path(path=None):
+    """Local registry overrides: an explicit path, STOCKBIT_BROKERS_FILE or ~/.stockbit_data/brokers.csv"""
+    if path:
+        return Path(path)
+    return Path(os.getenv("STOCKBIT_BROKERS_FILE") or LOCAL_REGISTRY)
+
+
+def read_registry_file(path):
+    """{code: entry} of one registry CSV (id, code, name, type, category)"""
+    entries = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            code = row["code"].strip().upper()
+            entry = {
+                "id": int(row["id"]),
+                "code": code,
+                "name": (row.get("name") or "").strip(),
+                "type": (row.get("type") or UNKNOWN).strip().lower(),
+                "category": (row.get("category") or "").strip().lower(),
+            }
+            if entry["type"] not in BROKER_TYPES:
+                raise ValueError(f"{path}: broker {code} has type {entry['type']!r}; expected one of {', '.join(BROKER_TYPES)}")
+            if not 0 < entry["id"] < UNREGISTERED_ID_BASE:
+                raise ValueError(f"{path}: broker {code} id {entry['id']} is outside 1..{UNREGISTERED_ID_BASE - 1}")
+            entries[code] = entry
+    return entries
+
+
+def load_registry(path=None):
+    """Bundled broker registry with the local overrides applied; {code: entry}, read once per file change"""
+    files = [BUNDLED_REGISTRY]
+    local = get_registry_path(path)
+    if local.exists():
+        files.append(local)
+    key = tuple((str(file), file.stat().st_mtime_ns) for file in files)
+    if key not in _cache:
+        entries = {}
+        for file in files:
+            entries.update(read_registry_file(file))
+        owners = {}
+        for entry in entries.values():
+            owner = owners.setdefault(entry["id"], entry["code"])
+            if owner != entry["code"]:
+                raise ValueError(f"Broker id {entry['id']} is used by both {owner} and {entry['code']}")
+        _cache.clear()
+        _cache[key] = entries
+    return _cache[key]
+
+
+def registry_ids(path=None):
+    """{code: id} of registered brokers"""
+    return {code: entry["id"] for code, entry in load_registry(path).items()}
+
+
+def foreign_codes(path=None):
+    """Codes of the brokers registered as foreign"""
+    return tuple(code for code, entry in load_registry(path).items() if entry["type"] == "foreign")
+
+
+def update_local_entry(code, name=None, broker_type=None, category=None, path=None):
+    """Add or change a broker in the local registry file; returns the merged entry"""
+    code = code.strip().upper()
+    local = get_registry_path(path)
+    local_entries = read_registry_file(local) if local.exists() else {}
+    registry = load_registry(path)
+
+    entry = dict(local_entries.get(code) or registry.get(code) or {
+        "id": max((entry["id"] for entry in registry.values()), default=0) + 1,
+        "code": code, "name": "", "type": UNKNOWN, "category": "",
+    })
+    if name is not None:
+        entry["name"] = name
+    if broker_type is not None:
+        if broker_type not in BROKER_TYPES:
+            raise ValueError(f"Unknown broker type {broker_type!r}; expected one of {', '.join(BROKER_TYPES)}")
+        entry["type"] = broker_type
+    if category is not None:
+        entry["category"] = category.lower()
+    local_entries[code] = entry
+
+    local.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = local.with_name(local.name + ".tmp")
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(sorted(local_entries.values(), key=lambda entry: entry["id"]))
+    os.replace(tmp_path, local)
+    return entry
+
+
+def sync_registry(conn, path=None):
+    """Bring the store's brokers table in line with the registry; writes only what changed
+
+    A code the store first saw unregistered keeps its rows: they move to
+    the registry id once the code is registered.
+    """
+    stored = {
+        code: (broker_id, name, broker_type, category)
+        for broker_id, code, name, broker_type, category in conn.execute(
+            "SELECT id, code, name, type, category FROM brokers"
+        )
+    }
+    changes = []
+    for code, entry in load_registry(path).items():
+        wanted = (entry["id"], entry["name"], entry["type"], entry["category"])
+        if stored.get(code) != wanted:
+            changes.append((code, stored.get(code), wanted))
+    if not changes:
+        return 0
+
+    with conn:
+        for code, current, (broker_id, name, broker_type, category) in changes:
+            if not current or current[0] != broker_id:
+                owner = conn.execute("SELECT code FROM brokers WHERE id = ?", (broker_id,)).fetchone()
+                if owner and owner[0] != code:
+                    raise ValueError(f"Broker id {broker_id} of {code} is already used by {owner[0]} in the store")
+            if current and current[0] != broker_id:
+                for table in ("broker_rows", "broker_activity"):
+                    conn.execute(f"UPDATE {table} SET broker_id = ? WHERE broker_id = ?", (broker_id, current[0]))
+            conn.execute(
+                "INSERT INTO brokers (id, code, name, type, category) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (code) DO UPDATE SET id = excluded.id, name = excluded.name, "
+                "type = excluded.type, category = excluded.category",
+                (broker_id, code, name, broker_type, category),
+            )
+    return len(changes)
+
+
+def broker_ids(conn, codes):
+    """{code: store id} of broker codes, registering codes not seen before as unknown
+
+    Call inside the caller's write transaction (store.begin_write), so
+    concurrent writers can't allocate the same id for different codes.
+    """
+    codes = sorted(set(codes))
+    if not codes:
+        return {}
+    placeholders = ", ".join("?" * len(codes))
+    ids = dict(conn.execute(f"SELECT code, id FROM brokers WHERE code IN ({placeholders})", codes))
+    missing = [code for code in codes if code not in ids]
+    if missing:
+        next_id = max(UNREGISTERED_ID_BASE, conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM brokers").fetchone()[0])
+        for offset, code in enumerate(missing):
+            ids[code] = next_id + offset
+        conn.executemany(
+            "INSERT INTO brokers (id, code, type) VALUES (?, ?, ?)",
+            [(ids[code], code, UNKNOWN) for code in missing],
+        )
+    return ids
+
+
+def format_registry(entries):
+    """Format registry entries as a table"""
+    lines = [f"{'Id':>4} {'Code':<5} {'Type':<8} {'Category':<14} Name", "-" * 72]
+    for entry in sorted(entries, key=lambda entry: entry["id"]):
+        lines.append(
+            f"{entry['id']:>4} {entry['code']:<5} {entry['type']:<8} {entry['category']:<14} {entry['name']}"
+        )
+    return "\n".join(lines)
@@ -1,48 +1,630 @@
 #!/usr/bin/env python
+"""Command line entry point; only login, extract, repair, watch and serve import the browser stack"""
 import argparse
 import sys
-from stockbit_analyzer.runner import main as run_analyzer
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Stockbit Broker Summary Analyzer")
+
+def add_common(parser):
+    parser.add_argument(
+        "--store", type=str, help="Path of the local broker summary store (default: ~/.stockbit_data/broker_summary.db)"
+    )
+    parser.add_argument("--debug", action="store_true", help="Raise errors with a traceback")
+
+
+def add_window(parser, top=True):
+    parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD) of the analysis window")
+    parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD) of the analysis window")
+    if top:
+        parser.add_argument("--top", type=int, default=10, help="Number of rows to show per side (default: 10)")
+
+
+def add_browser(parser):
+    parser.add_argument(
+        "--manual-login", action="store_true",
+        help="Open a visible browser and wait for you to log in"
+    )
     parser.add_argument(
-        "--debug", 
-        action="store_true", 
-        help="Enable debug mode"
+        "--cdp-url", type=str, help="Attach to an already-running Chromium over CDP (e.g. http://127.0.0.1:9222)"
     )
     parser.add_argument(
-        "--manual-login",
-        action="store_true",
-        help="Enable manual login mode - browser will wait for you to log in manually"
+        "--log-level", type=str, default="INFO",
+        help="Minimum level of progress logs (default: INFO)"
     )
     parser.add_argument(
-        "--stock",
-        type=str,
-        help="Stock symbol to analyze (e.g., BUMI)"
+        "--log-format", choices=("text", "json"), default="text",
+        help="Progress logs on stderr as text or JSON lines"
     )
     parser.add_argument(
-        "--extract",
-        action="store_true",
-        help="Extract broker summary data after login"
+        "--log-file", type=str, metavar="PATH",
+        help="Also append progress logs to PATH as JSON lines"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Don't write progress logs to the terminal")
+
+
+def add_extract_options(parser):
+    parser.add_argument(
+        "--pages", type=int, default=1,
+        help="Split the days across this many browser pages (default: 1)"
+    )
+    parser.add_argument(
+        "--format", choices=("text", "ndjson"), default="text",
+        help="Formatted tables, or one JSON line per day"
+    )
+    parser.add_argument(
+        "--dump-raw", type=str, metavar="DIR",
+        help="Archive each day's raw table text under DIR/<symbol>/<date>.txt"
+    )
+    add_batch(parser)
+    parser.add_argument(
+        "--metrics-file", type=str, metavar="PATH",
+        help="Write run metrics to PATH in Prometheus text format"
+    )
+    parser.add_argument(
+        "--profile", type=str, metavar="DIR",
+        help="Record a Chrome trace and a cProfile of the run into DIR"
+    )
+
+
+def add_batch(parser):
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Unattended run: no dwell, failure artifacts, non-zero exit on errors"
+    )
+    parser.add_argument("--artifacts", type=str, metavar="DIR", help="Where failure artifacts are saved")
+
+
+def add_serve_options(parser):
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1",
+        help="Address the API listens on (default: 127.0.0.1)"
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port the API listens on (default: 8765)")
+
+
+def add_screen_options(parser):
+    parser.add_argument("--signal", type=str, default="top3_concentration",
+                        help="top3_concentration, foreign_net_value, accumulation_streak or avg_gap_pct")
+    parser.add_argument("--foreign", type=str, help="Comma-separated broker codes treated as foreign")
+
+
+def add_broker_options(parser):
+    parser.add_argument("--net-sell", action="store_true", help="Rank net-sold symbols instead")
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the cross-symbol broker index first")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Stockbit Broker Summary Analyzer",
+        epilog="Run '<command> --help' for a command's options. The older flag style (--stock X --extract) still works.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="<command>")
+
+    login = commands.add_parser("login", help="Log in to Stockbit and keep the browser profile authenticated")
+    add_common(login)
+    add_browser(login)
+    login.set_defaults(handler=run_browser, extract=False, stock=None)
+
+    extract = commands.add_parser("extract", help="Extract broker summary days of a symbol into the store")
+    add_common(extract)
+    add_browser(extract)
+    extract.add_argument("--stock", type=str, required=True, help="Stock symbol to extract (e.g. BUMI)")
+    extract.add_argument("--days", type=int, default=1, help="Number of trading days to extract (default: 1)")
+    add_extract_options(extract)
+    extract.set_defaults(handler=run_browser, extract=True)
+
+    repair = commands.add_parser("repair", help="Re-fetch only the stored days of a symbol that failed validation")
+    add_common(repair)
+    add_browser(repair)
+    add_window(repair, top=False)
+    repair.add_argument("--stock", type=str, required=True, help="Stock symbol to repair")
+    repair.add_argument(
+        "--recheck", action="store_true",
+        help="Re-validate the stored days first (e.g. days stored before validation existed)"
+    )
+    add_batch(repair)
+    repair.set_defaults(handler=run_repair, extract=True)
+
+    watch = commands.add_parser("watch", help="Snapshot today's broker summary of symbols on an interval")
+    add_common(watch)
+    add_browser(watch)
+    watch.add_argument("--stock", type=str, required=True, help="Comma-separated symbols to watch (e.g. BUMI,BBCA)")
+    watch.add_argument(
+        "--interval", type=int, default=300,
+        help="Seconds between snapshots (default: 300)"
+    )
+    watch.add_argument("--until", type=str, metavar="HH:MM", help="Stop once this time of day is reached")
+    watch.add_argument("--rounds", type=int, help="Stop after this many snapshots")
+    watch.set_defaults(handler=run_watch)
+
+    serve = commands.add_parser("serve", help="Keep a logged-in browser warm and accept extraction jobs over HTTP")
+    add_common(serve)
+    add_browser(serve)
+    add_serve_options(serve)
+    serve.set_defaults(handler=run_serve)
+
+    export = commands.add_parser("export", help="Write stored rows of a symbol as CSV or JSON lines")
+    add_common(export)
+    add_window(export, top=False)
+    export.add_argument("--stock", type=str, required=True, help="Stock symbol to export")
+    export.add_argument("--format", choices=("csv", "ndjson"), default="csv", help="Output format (default: csv)")
+    export.set_defaults(handler=show_export)
+
+    flow = commands.add_parser("flow", help="Rank stored brokers of a symbol by net flow")
+    add_common(flow)
+    add_window(flow)
+    flow.add_argument("--stock", type=str, required=True, help="Stock symbol to rank")
+    flow.set_defaults(handler=show_flow)
+
+    series = commands.add_parser("series", help="Print one broker's daily series from the broker x day matrix")
+    add_common(series)
+    add_window(series, top=False)
+    series.add_argument("series", nargs="?", metavar="BROKER", help="Broker code")
+    series.add_argument("--stock", type=str, required=True, help="Stock symbol")
+    series.add_argument("--metric", type=str, default="net_lot", help="Matrix metric (default: net_lot)")
+    series.add_argument(
+        "--rebuild", dest="rebuild_matrix", action="store_true",
+        help="Rebuild the matrix from the store first"
     )
+    series.set_defaults(handler=show_series)
+
+    broker = commands.add_parser("broker", help="Rank the symbols a broker net-bought (or sold) most")
+    add_common(broker)
+    broker.add_argument("broker", nargs="?", metavar="BROKER", help="Broker code")
+    broker.add_argument("--days", type=int, default=1, help="Number of stored trading days to look back (default: 1)")
+    broker.add_argument("--end", type=str, help="Last date (YYYY-MM-DD) of the window")
+    broker.add_argument("--top", type=int, default=10, help="Number of symbols to show (default: 10)")
+    add_broker_options(broker)
+    broker.set_defaults(handler=show_broker_activity)
+
+    screen = commands.add_parser("screen", help="Rank all stored symbols by a signal")
+    add_common(screen)
+    add_window(screen)
+    add_screen_options(screen)
+    screen.add_argument("--days", type=int, help="Number of stored trading days to look back (default: all stored days)")
+    screen.set_defaults(handler=show_screen)
+
+    rolling = commands.add_parser("rolling", help="Show 5/20/60-day rolling net accumulation per broker")
+    add_common(rolling)
+    rolling.add_argument("--stock", type=str, required=True, help="Stock symbol")
+    rolling.add_argument("--top", type=int, default=10, help="Number of brokers to show per side (default: 10)")
+    rolling.add_argument("--verify", dest="verify_indicators", action="store_true",
+                         help="Check the indicators against a full recompute from the store")
+    rolling.set_defaults(handler=show_rolling)
+
+    query = commands.add_parser("query", help="Broker summary, one broker's series or the top brokers of a stored symbol")
+    add_common(query)
+    add_window(query, top=False)
+    query.add_argument("stock", metavar="SYMBOL", help="Stock symbol")
+    query.add_argument("--date", type=str, help="One day (YYYY-MM-DD); same as --start D --end D")
+    query.add_argument("--broker", type=str, help="Print this broker's daily series instead of the summary")
+    query.add_argument("--top", type=int, help="Only the N largest net buyers (or sellers with --net-sell)")
+    query.add_argument("--net-sell", action="store_true", help="With --top, rank net sellers")
+    query.add_argument(
+        "--format", choices=("text", "ndjson"), default="text",
+        help="Formatted table, or one JSON line per result"
+    )
+    query.set_defaults(handler=show_query)
+
+    brokers = commands.add_parser("brokers", help="List the broker registry, or add/change a broker locally")
+    add_common(brokers)
+    brokers.add_argument("--set", type=str, metavar="CODE", help="Add or change this broker in the local registry")
+    brokers.add_argument("--name", type=str, help="With --set, the broker's name")
+    brokers.add_argument("--type", choices=("foreign", "local", "unknown"), help="With --set, foreign or local")
+    brokers.add_argument("--category", type=str, help="With --set, e.g. institutional, retail, state_owned")
+    brokers.set_defaults(handler=show_brokers)
+
+    group_flow = commands.add_parser("group-flow", help="Foreign/local (or per category) net flow over all stored symbols")
+    add_common(group_flow)
+    add_window(group_flow, top=False)
+    group_flow.add_argument("--by", choices=("type", "category"), default="type", help="Group brokers by (default: type)")
+    group_flow.add_argument("--per", choices=("date", "symbol"), help="One row per date or symbol (default: the window total)")
+    group_flow.add_argument(
+        "--metric", choices=("net_value", "net_lot", "buy_value", "sell_value"), default="net_value",
+        help="Column to show (default: net_value)"
+    )
+    group_flow.set_defaults(handler=show_group_flow)
+
+    quality = commands.add_parser("quality", help="List stored days flagged by validation")
+    add_common(quality)
+    add_window(quality, top=False)
+    quality.add_argument("--stock", type=str, help="Only this symbol (default: every symbol)")
+    quality.add_argument("--recheck", action="store_true", help="Re-validate the stored days first")
+    quality.set_defaults(handler=show_quality)
+
+    intraday = commands.add_parser("intraday", help="Show a symbol's stored intraday snapshots")
+    add_common(intraday)
+    intraday.add_argument("stock", metavar="SYMBOL", help="Stock symbol")
+    intraday.add_argument("--date", type=str, help="Trading day (YYYY-MM-DD, default: today)")
+    intraday.add_argument("--at", type=str, metavar="HH:MM[:SS]", help="Rebuild the table as of this time (default: latest)")
+    intraday.set_defaults(handler=show_intraday)
+
+    replay = commands.add_parser("replay", help="Re-parse a failure artifact or --dump-raw file offline")
+    add_common(replay)
+    replay.add_argument("replay", metavar="PATH", help="Artifact directory, saved .html or raw .txt file")
+    replay.set_defaults(handler=show_replay)
+    return parser, set(commands.choices)
+
+
+def parse_legacy_args(argv):
+    """Parse the older flag style: one flat set of options where a mode flag (--flow, --serve, ...) picks the command"""
+    parser = argparse.ArgumentParser(
+        description="Stockbit Broker Summary Analyzer",
+        epilog="Older flag style; run with a command (e.g. 'extract --help') for the current one.",
+    )
+    add_common(parser)
+    add_browser(parser)
+    add_window(parser)
+    add_extract_options(parser)
+    add_serve_options(parser)
+    add_screen_options(parser)
+    add_broker_options(parser)
+    parser.add_argument("--stock", type=str, help="Stock symbol to analyze (e.g. BUMI)")
     parser.add_argument(
-        "--days",
-        type=int,
-        default=1,
-        help="Number of days to look back for broker summary data (default: 1, today only)"
+        "--days", type=int,
+        help="Number of trading days to look back (default: 1, today only; with --screen, all stored days)"
     )
-    return parser.parse_args()
+    parser.add_argument("--extract", action="store_true", help="Extract broker summary data after login")
+    parser.add_argument("--flow", action="store_true", help="Same as the flow command")
+    parser.add_argument("--series", type=str, metavar="BROKER", help="Same as the series command")
+    parser.add_argument("--metric", type=str, default="net_lot", help="Matrix metric for --series (default: net_lot)")
+    parser.add_argument("--rebuild-matrix", action="store_true", help="Rebuild the matrix of --stock from the store")
+    parser.add_argument("--broker", type=str, help="Same as the broker command")
+    parser.add_argument("--screen", action="store_true", help="Same as the screen command")
+    parser.add_argument("--rolling", action="store_true", help="Same as the rolling command")
+    parser.add_argument("--verify-indicators", action="store_true", help="With --rolling, same as rolling --verify")
+    parser.add_argument("--serve", action="store_true", help="Same as the serve command")
+    parser.add_argument("--replay", type=str, metavar="PATH", help="Same as the replay command")
+    args = parser.parse_args(argv)
+    if args.replay:
+        args.handler = show_replay
+    elif args.flow:
+        args.handler = show_flow
+    elif args.series or args.rebuild_matrix:
+        args.handler = show_series
+    elif args.serve:
+        args.handler = run_serve
+    elif args.rolling:
+        args.handler = show_rolling
+    elif args.screen:
+        args.handler = show_screen
+    elif args.broker or args.rebuild_index:
+        args.handler = show_broker_activity
+    else:
+        args.handler = run_browser
+    if args.days is None and not args.screen:
+        args.days = 1
+    return args
+
 
-def main():
-    args = parse_args()
+def show_flow(args):
+    from stockbit_analyzer.store import open_store
+
+    if not args.stock:
+        raise ValueError("--flow requires --stock")
+    # numpy-backed; only loaded once there is something to compute
+    from stockbit_analyzer.analytics import broker_flow, format_flow_table
+
+    conn = open_store(args.store)
     try:
-        run_analyzer(
-            manual_login=args.manual_login,
-            stock_symbol=args.stock,
-            extract_data=args.extract,
-            days=args.days
-        )
+        flow = broker_flow(conn, args.stock, start=args.start, end=args.end)
+    finally:
+        conn.close()
+    print(format_flow_table(flow, top=args.top))
+
+
+def show_series(args):
+    from stockbit_analyzer.store import get_store_path, open_store
+
+    if not args.stock:
+        raise ValueError("--series/--rebuild-matrix requires --stock")
+    from stockbit_analyzer.matrix import BrokerMatrix, build_matrix, get_matrix_root
+
+    root = get_matrix_root(get_store_path(args.store))
+    if args.rebuild_matrix:
+        conn = open_store(args.store)
+        try:
+            matrix = build_matrix(conn, args.stock, root)
+        finally:
+            conn.close()
+        print(f"Rebuilt {args.stock} matrix: {len(matrix.brokers)} brokers x {len(matrix.dates)} days")
+    if args.series:
+        matrix = BrokerMatrix(root, args.stock)
+        dates, values = matrix.series(args.series, args.metric, start=args.start, end=args.end)
+        for date, value in zip(dates, values):
+            print(f"{date}  {value:>16,.0f}")
+
+
+def show_broker_activity(args):
+    from stockbit_analyzer.broker_index import broker_top_symbols, format_broker_activity
+    from stockbit_analyzer.store import open_store, rebuild_broker_index
+
+    conn = open_store(args.store)
+    try:
+        if args.rebuild_index:
+            indexed = rebuild_broker_index(conn)
+            print(f"Rebuilt broker index: {indexed} broker/day/symbol entries")
+        if args.broker:
+            results = broker_top_symbols(
+                conn, args.broker, days=args.days, end=args.end,
+                limit=args.top, net_sell=args.net_sell
+            )
+            print(format_broker_activity(args.broker, results, net_sell=args.net_sell))
+    finally:
+        conn.close()
+
+
+def show_screen(args):
+    from stockbit_analyzer.matrix import get_matrix_root
+    from stockbit_analyzer.screener import format_screen_table, screen
+    from stockbit_analyzer.store import get_store_path
+
+    foreign_brokers = None
+    if args.foreign:
+        foreign_brokers = tuple(code.strip().upper() for code in args.foreign.split(",") if code.strip())
+    results = screen(
+        get_matrix_root(get_store_path(args.store)),
+        signal=args.signal,
+        top=args.top,
+        start=args.start,
+        end=args.end,
+        days=args.days,
+        foreign_brokers=foreign_brokers,
+    )
+    print(format_screen_table(results, args.signal))
+
+
+def show_rolling(args):
+    from stockbit_analyzer.store import get_store_path, open_store
+
+    if not args.stock:
+        raise ValueError("--rolling requires --stock")
+    from stockbit_analyzer.indicators import (
+        check_consistency, format_rolling_table, get_indicator_root, load_indicators,
+        rebuild_from_store, snapshot_path,
+    )
+
+    conn = open_store(args.store)
+    try:
+        root = get_indicator_root(get_store_path(args.store))
+        engine = load_indicators(root, conn, args.stock)
+        if args.verify_indicators:
+            mismatches = check_consistency(engine, conn)
+            if mismatches:
+                print(f"⚠️  {len(mismatches)} indicator mismatches, rebuilding from store:")
+                for mismatch in mismatches:
+                    print(f"   {mismatch}")
+                engine = rebuild_from_store(conn, args.stock)
+            else:
+                print("✅ Rolling indicators match a full recompute")
+        engine.save(snapshot_path(root, args.stock))
+    finally:
+        conn.close()
+    print(format_rolling_table(engine, top=args.top))
+
+
+def show_replay(args):
+    from stockbit_analyzer.artifacts import replay_artifact
+    from stockbit_analyzer.summary import format_broker_summary_table
+
+    day_data = replay_artifact(args.replay)
+    print(f"{day_data['symbol'] or '?'} {day_data['date'] or '?'} from {day_data['source']}")
+    if day_data.get("error"):
+        print(f"Error: {day_data['error']}")
+        print(f"Raw text: {day_data['rawExcerpt']}")
+        return 1
+    print(format_broker_summary_table(day_data["rows"]))
+    print(f"Parsed {len(day_data['rows'])} rows")
+    return 0 if day_data["rows"] else 1
+
+
+def show_query(args):
+    import json
+    from stockbit_analyzer.query import (
+        broker_series, broker_summary, format_broker_series, format_broker_totals, top_brokers,
+    )
+    from stockbit_analyzer.store import open_store
+
+    symbol = args.stock.upper()
+    start, end = (args.date, args.date) if args.date else (args.start, args.end)
+    conn = open_store(args.store)
+    try:
+        if args.broker:
+            results = broker_series(conn, symbol, args.broker.upper(), start=start, end=end)
+        elif args.top:
+            results = top_brokers(conn, symbol, start=start, end=end, limit=args.top, net_sell=args.net_sell)
+        else:
+            results = broker_summary(conn, symbol, start=start, end=end)
+    finally:
+        conn.close()
+
+    if args.format == "ndjson":
+        for result in results:
+            sys.stdout.write(json.dumps(result) + "\n")
+    elif args.broker:
+        print(format_broker_series(symbol, args.broker.upper(), results))
+    else:
+        print(format_broker_totals(symbol, results))
+
+
+def show_quality(args):
+    from stockbit_analyzer.quality import flagged_days, format_flagged_days, recheck_symbol
+    from stockbit_analyzer.store import list_symbols, open_store
+
+    symbol = args.stock.upper() if args.stock else None
+    conn = open_store(args.store)
+    try:
+        if args.recheck:
+            for recheck in [symbol] if symbol else list_symbols(conn):
+                print(f"Re-checked {recheck}: {recheck_symbol(conn, recheck)} flagged day(s)")
+        days = flagged_days(conn, symbol, start=args.start, end=args.end)
+    finally:
+        conn.close()
+    print(format_flagged_days(days))
+    return 1 if days else 0
+
+
+def show_brokers(args):
+    from stockbit_analyzer.brokers import format_registry, get_registry_path, load_registry, update_local_entry
+    from stockbit_analyzer.store import open_store
+
+    if args.set:
+        entry = update_local_entry(args.set, name=args.name, broker_type=args.type, category=args.category)
+        # Opening the store syncs its brokers table (and stored ids) with the registry
+        open_store(args.store).close()
+        print(f"Saved {entry['code']} (id {entry['id']}, {entry['type']}) to {get_registry_path()}")
+        return
+    print(format_registry(load_registry().values()))
+
+
+def show_group_flow(args):
+    from stockbit_analyzer.analytics import format_group_flow, group_flow
+    from stockbit_analyzer.store import open_store
+
+    conn = open_store(args.store)
+    try:
+        flow = group_flow(conn, by=args.by, per=args.per, start=args.start, end=args.end)
+    finally:
+        conn.close()
+    print(format_group_flow(flow, metric=args.metric))
+
+
+def show_intraday(args):
+    from datetime import datetime
+    from stockbit_analyzer.intraday import format_snapshot, list_snapshots, load_snapshot
+    from stockbit_analyzer.store import open_store
+
+    symbol = args.stock.upper()
+    date = args.date or datetime.now()
+    # Pad HH:MM so it compares as the end of that minute
+    at = args.at + ":59" if args.at and args.at.count(":") == 1 else args.at
+    conn = open_store(args.store)
+    try:
+        snapshots = [snapshot for snapshot in list_snapshots(conn, symbol, date) if not at or snapshot[0] <= at]
+        snapshot = load_snapshot(conn, symbol, date, at=at)
+    finally:
+        conn.close()
+    print(format_snapshot(symbol, date, snapshot, snapshots))
+
+
+def show_export(args):
+    import csv
+    import json
+    from stockbit_analyzer.store import load_rows, open_store
+
+    conn = open_store(args.store)
+    try:
+        rows = load_rows(conn, args.stock.upper(), start=args.start, end=args.end)
+    finally:
+        conn.close()
+    fields = ("date", "side", "broker", "value", "lot", "avg")
+    if args.format == "ndjson":
+        for row in rows:
+            sys.stdout.write(json.dumps(dict(zip(fields, row))) + "\n")
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(fields)
+        writer.writerows(rows)
+
+
+def setup_logging(args):
+    from stockbit_analyzer.logs import configure_logging
+
+    configure_logging(
+        level=args.log_level, log_format=args.log_format, log_file=args.log_file, console=not args.quiet
+    )
+
+
+def run_browser(args):
+    # Playwright and dotenv only load for commands that drive a page
+    from stockbit_analyzer.runner import main as run_analyzer
+
+    setup_logging(args)
+    return run_analyzer(
+        manual_login=args.manual_login,
+        stock_symbol=args.stock,
+        extract_data=args.extract,
+        days=getattr(args, "days", 1),
+        store_path=args.store,
+        cdp_url=args.cdp_url,
+        raw_dir=getattr(args, "dump_raw", None),
+        pages=getattr(args, "pages", 1),
+        output_format=getattr(args, "format", "text"),
+        batch=getattr(args, "batch", False),
+        artifact_dir=getattr(args, "artifacts", None),
+        metrics_file=getattr(args, "metrics_file", None),
+        profile_dir=getattr(args, "profile", None),
+        dates=getattr(args, "dates", None)
+    )
+
+
+def run_repair(args):
+    from datetime import datetime
+    from stockbit_analyzer.parsing import ISO_DATE_FORMAT
+    from stockbit_analyzer.quality import flagged_days, format_flagged_days, recheck_symbol
+    from stockbit_analyzer.store import open_store
+
+    args.stock = args.stock.upper()
+    conn = open_store(args.store)
+    try:
+        if args.recheck:
+            recheck_symbol(conn, args.stock)
+        days = flagged_days(conn, args.stock, start=args.start, end=args.end)
+    finally:
+        conn.close()
+    if not days:
+        print(f"✅ No flagged days for {args.stock}")
         return 0
+
+    print(f"Re-fetching {len(days)} flagged day(s) of {args.stock}: {', '.join(date for _, date, _ in days)}")
+    args.dates = [datetime.strptime(date, ISO_DATE_FORMAT) for _, date, _ in days]
+    status = run_browser(args)
+
+    conn = open_store(args.store)
+    try:
+        remaining = flagged_days(conn, args.stock, start=days[0][1], end=days[-1][1])
+    finally:
+        conn.close()
+    print(format_flagged_days(remaining))
+    # A failed browser run (e.g. a day errored or nothing was stored in --batch) fails the repair too
+    return status or (1 if remaining else 0)
+
+
+def run_watch(args):
+    from datetime import datetime
+    from stockbit_analyzer.watch import watch
+
+    symbols = [symbol.strip().upper() for symbol in args.stock.split(",") if symbol.strip()]
+    until = datetime.strptime(args.until, "%H:%M").time() if args.until else None
+    setup_logging(args)
+    watch(
+        symbols, interval=args.interval, store_path=args.store, manual_login=args.manual_login,
+        cdp_url=args.cdp_url, rounds=args.rounds, until=until
+    )
+
+
+def run_serve(args):
+    from stockbit_analyzer.daemon import serve
+
+    setup_logging(args)
+    serve(
+        host=args.host, port=args.port, manual_login=args.manual_login,
+        store_path=args.store, cdp_url=args.cdp_url
+    )
+
+
+def parse_args(argv=None):
+    """Parse a subcommand, or the older flag style when no subcommand is given"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser, commands = build_parser()
+    if argv and (argv[0] in commands or argv[0] in ("-h", "--help")):
+        return parser.parse_args(argv)
+    return parse_legacy_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        return args.handler(args) or 0
     except Exception as e:
         if args.debug:
             raise
@@ -50,4 +632,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
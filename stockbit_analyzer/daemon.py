@@ -0,0 +1,399 @@
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from playwright.sync_api import sync_playwright
+
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.metrics import CONTENT_TYPE, JOB_QUEUE_DEPTH, JOBS, REGISTRY
+from stockbit_analyzer.parsing import ISO_DATE_FORMAT, to_iso_date
+from stockbit_analyzer.pipeline import IngestPipeline
+from stockbit_analyzer.pool import pool_from_config
+from stockbit_analyzer.query import QUERY_KINDS, StoreQuery
+from stockbit_analyzer.retry import DEFAULT_BUDGET
+from stockbit_analyzer.runner import (
+    close_browser,
+    extract_broker_summary,
+    get_trading_dates,
+    load_config,
+    login_to_stockbit,
+    setup_browser,
+)
+from stockbit_analyzer.store import list_dates, load_rows, open_store
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs stay queryable for this long, and at most this many are kept
+JOB_TTL = 3600
+MAX_FINISHED_JOBS = 1000
+
+# Job modes: "cached" answers from the store when every date is already stored,
+# "refresh" always drives the browser
+MODES = ("cached", "refresh")
+
+log = get_logger(__name__)
+
+
+class JobQueue:
+    """Extraction jobs with de-duplication of identical in-flight requests
+
+    Finished jobs are dropped after `ttl` seconds, or oldest first beyond
+    `max_finished`, so a long-running daemon doesn't grow without bound.
+    """
+
+    def __init__(self, ttl=JOB_TTL, max_finished=MAX_FINISHED_JOBS):
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._jobs = {}
+        self._in_flight = {}
+
+    def _expire(self):
+        # Called with the lock held; dicts keep insertion order, so finished jobs come oldest first
+        finished = [job for job in self._jobs.values() if job["finished"] is not None]
+        cutoff = time.time() - self.ttl
+        excess = len(finished) - self.max_finished
+        for index, job in enumerate(finished):
+            if index < excess or job["finished"] < cutoff:
+                del self._jobs[job["id"]]
+
+    def submit(self, symbol, dates, mode):
+        """Queue a job, or return the identical queued/running one"""
+        key = (symbol, tuple(dates), mode)
+        with self._lock:
+            job_id = self._in_flight.get(key)
+            if job_id:
+                return self._jobs[job_id], False
+
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "symbol": symbol,
+                "dates": list(dates),
+                "mode": mode,
+                "status": QUEUED,
+                "error": None,
+                "stored_days": 0,
+                "created": time.time(),
+                "finished": None,
+                "_done": threading.Event(),
+            }
+            self._jobs[job["id"]] = job
+            self._in_flight[key] = job["id"]
+        self._pending.put(job["id"])
+        return job, True
+
+    def complete(self, job, status, error=None, stored_days=0):
+        with self._lock:
+            job["status"] = status
+            job["error"] = error
+            job["stored_days"] = stored_days
+            job["finished"] = time.time()
+            self._in_flight.pop((job["symbol"], tuple(job["dates"]), job["mode"]), None)
+            self._expire()
+        JOBS.inc(status=status)
+        job["_done"].set()
+
+    def mark_running(self, job):
+        with self._lock:
+            job["status"] = RUNNING
+
+    def next(self, timeout=1.0):
+        """Next queued job, or None after `timeout` seconds"""
+        try:
+            job_id = self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            return self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def public(self, job):
+        """Copy of a job's public fields, taken under the lock"""
+        with self._lock:
+            return public_job(job)
+
+    def depth(self):
+        return self._pending.qsize()
+
+
+def public_job(job):
+    return {key: value for key, value in job.items() if not key.startswith("_")}
+
+
+def stored_rows(store_path, symbol, dates):
+    """Stored rows for the given ISO dates, grouped by date"""
+    conn = open_store(store_path)
+    try:
+        rows = load_rows(conn, symbol, dates[0], dates[-1]) if dates else []
+    finally:
+        conn.close()
+
+    wanted = set(dates)
+    by_date = {}
+    for date, side, broker, value, lot, avg in rows:
+        if date in wanted:
+            by_date.setdefault(date, []).append(
+                {"side": side, "broker": broker, "value": value, "lot": lot, "avg": avg}
+            )
+    return by_date
+
+
+def run_query(queries, params):
+    """Answer a /query request from the cached store queries"""
+    def param(name):
+        return params.get(name, [None])[0]
+
+    kind = param("kind") or "summary"
+    symbol = param("symbol")
+    if kind not in QUERY_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(QUERY_KINDS)}")
+    if not symbol:
+        raise ValueError("symbol is required")
+    symbol = symbol.upper()
+    start, end = (param("date"), param("date")) if param("date") else (param("start"), param("end"))
+
+    if kind == "series":
+        if not param("broker"):
+            raise ValueError("broker is required for series")
+        return queries.series(symbol, param("broker").upper(), start, end)
+    if kind == "top":
+        return queries.top(symbol, start, end, int(param("limit") or 10), param("net_sell") in ("1", "true"))
+    return queries.summary(symbol, start, end)
+
+
+def parse_job(request):
+    """Validate a POST /jobs body; returns (symbol, ISO dates, mode)
+
+    Raises ValueError (or KeyError/TypeError/AttributeError for malformed
+    bodies) so the handler can answer 400 instead of queueing a job with no dates.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("body must be a JSON object")
+    symbol = request["symbol"].upper()
+    mode = request.get("mode", "cached")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if "dates" in request:
+        if not request["dates"]:
+            raise ValueError("dates must not be empty")
+        dates = sorted({to_iso_date(date) for date in request["dates"]})
+    else:
+        days = int(request.get("days", 1))
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        dates = [date.strftime(ISO_DATE_FORMAT) for date in get_trading_dates(days)]
+    if not dates:
+        raise ValueError("no trading dates selected")
+    return symbol, dates, mode
+
+
+def make_handler(jobs, store_path, queries):
+    """HTTP handler bound to a job queue, store and cached store queries"""
+
+    class JobHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, content_type="application/json"):
+            body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path == "/health":
+                self._send(200, {"status": "ok", "queued": jobs.depth()})
+                return
+
+            if url.path == "/metrics":
+                JOB_QUEUE_DEPTH.set(jobs.depth())
+                self._send(200, REGISTRY.render(), content_type=CONTENT_TYPE)
+                return
+
+            if url.path.startswith("/jobs/"):
+                job = jobs.get(url.path.split("/")[2])
+                if not job:
+                    self._send(404, {"error": "Unknown job"})
+                    return
+                try:
+                    wait = float(params.get("wait", ["0"])[0])
+                except ValueError:
+                    self._send(400, {"error": "wait must be a number of seconds"})
+                    return
+                if wait > 0:
+                    job["_done"].wait(timeout=min(wait, 300))
+                payload = jobs.public(job)
+                if payload["status"] == DONE:
+                    payload["data"] = stored_rows(store_path, job["symbol"], job["dates"])
+                self._send(200, payload)
+                return
+
+            if url.path == "/summary":
+                symbol = params.get("symbol", [None])[0]
+                date = params.get("date", [None])[0]
+                if not symbol or not date:
+                    self._send(400, {"error": "symbol and date are required"})
+                    return
+                try:
+                    iso_date = to_iso_date(date)
+                except ValueError as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                self._send(200, {"symbol": symbol, "data": stored_rows(store_path, symbol, [iso_date])})
+                return
+
+            if url.path == "/query":
+                try:
+                    results = run_query(queries, params)
+                except ValueError as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                self._send(200, {"results": results})
+                return
+
+            self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/jobs":
+                self._send(404, {"error": "Not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                symbol, dates, mode = parse_job(json.loads(self.rfile.read(length) or b"{}"))
+            except (KeyError, ValueError, AttributeError, TypeError, json.JSONDecodeError) as e:
+                self._send(400, {"error": f"Invalid job: {e}"})
+                return
+
+            if mode == "cached":
+                conn = open_store(store_path)
+                try:
+                    available = set(list_dates(conn, symbol))
+                finally:
+                    conn.close()
+                if available.issuperset(dates):
+                    self._send(200, {
+                        "symbol": symbol, "dates": dates, "mode": mode, "status": DONE,
+                        "cached": True, "data": stored_rows(store_path, symbol, dates),
+                    })
+                    return
+
+            job, created = jobs.submit(symbol, dates, mode)
+            self._send(202 if created else 200, dict(jobs.public(job), deduplicated=not created))
+
+    return JobHandler
+
+
+def run_job(pool, job, store_path, raw_dir=None, artifact_dir=None):
+    """Extract and store one job's dates on the warm page pool; returns (days stored, failed ISO dates)
+
+    Each job starts with a full retry budget. Circuit breakers carry over
+    between jobs and close through their own reset_after, so a symbol that
+    keeps failing is not retried from scratch on every job.
+    """
+    DEFAULT_BUDGET.reset()
+    dates = [datetime.strptime(date, ISO_DATE_FORMAT) for date in job["dates"]]
+    failed = []
+    with IngestPipeline(store_path) as pipeline:
+        extract_broker_summary(
+            pool.page, job["symbol"], dates=dates, pool=pool, raw_dir=raw_dir, on_day=pipeline.submit,
+            artifact_dir=artifact_dir, failed=failed
+        )
+    return pipeline.stored, failed
+
+
+def job_outcome(stored_days, failed):
+    """Final (status, error) of a job: FAILED when any day errored or nothing was stored"""
+    if failed:
+        return FAILED, f"{len(failed)} day(s) failed: {', '.join(sorted(failed))}"
+    if not stored_days:
+        return FAILED, "No day was stored"
+    return DONE, None
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, manual_login=False, store_path=None, cdp_url=None):
+    """Keep an authenticated browser warm and run extraction jobs posted to a local HTTP API
+
+    Playwright's sync API is bound to the thread that started it, so the
+    browser and job loop stay on this thread while requests are accepted on
+    server threads.
+    """
+    config = load_config()
+    if cdp_url:
+        config["cdp_url"] = cdp_url
+    jobs = JobQueue()
+    queries = StoreQuery(store_path)
+    server = ThreadingHTTPServer((host, port), make_handler(jobs, store_path, queries))
+    server.daemon_threads = True
+    serving = False
+
+    with sync_playwright() as playwright:
+        context, page = setup_browser(playwright, config, manual_login=manual_login)
+        pool = pool_from_config(context, page, config)
+        try:
+            if not login_to_stockbit(page, config, manual_login=manual_login):
+                raise Exception("Login failed; daemon not started")
+
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            serving = True
+            log.info(f"Serving extraction jobs on http://{host}:{port} (Ctrl+C to stop)")
+
+            while True:
+                job = jobs.next()
+                if not job:
+                    continue
+                jobs.mark_running(job)
+                started = time.monotonic()
+                try:
+                    log.info(f"Job {job['id']}: {job['symbol']} {job['dates'][0]}..{job['dates'][-1]} ({job['mode']})",
+                             extra={"symbol": job["symbol"], "phase": "job"})
+                    stored_days, failed = run_job(
+                        pool, job, store_path, raw_dir=config["raw_dir"] or None,
+                        artifact_dir=config["artifact_dir"] or None
+                    )
+                    status, error = job_outcome(stored_days, failed)
+                    jobs.complete(job, status, error=error, stored_days=stored_days)
+                    fields = {"symbol": job["symbol"], "phase": "job", "duration": time.monotonic() - started}
+                    if status == DONE:
+                        log.info(f"Job {job['id']} stored {stored_days} day(s)", extra=fields)
+                    else:
+                        log.error(f"Job {job['id']} failed after storing {stored_days} day(s): {error}", extra=fields)
+                except Exception as e:
+                    error_msg = str(e)
+                    log.error(f"Job {job['id']} failed: {error_msg}",
+                              extra={"symbol": job["symbol"], "phase": "job", "duration": time.monotonic() - started})
+                    # The session may have expired; log in again before the next job
+                    if "login" in pool.page.url.lower():
+                        login_to_stockbit(pool.page, config, manual_login=manual_login)
+                    jobs.complete(job, FAILED, error=error_msg)
+        except KeyboardInterrupt:
+            log.info("Stopping daemon")
+        finally:
+            if serving:
+                server.shutdown()
+            server.server_close()
+            queries.close()
+            pool.close()
+            close_browser(context, pool.page)
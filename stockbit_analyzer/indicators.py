@@ -0,0 +1,299 @@
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from stockbit_analyzer.analytics import compute_flow, rows_to_arrays
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import BUY, list_dates, load_rows
+
+
+WINDOWS = (5, 20, 60)
+SERIES = ("net_value", "net_lot")
+DEFAULT_CAPACITY = 128
+
+
+def get_indicator_root(store_path):
+    """Directory holding per-symbol indicator snapshots, next to the SQLite store"""
+    return Path(store_path).parent / "indicators"
+
+
+def net_by_broker(side_rows):
+    """Per-broker (net_value, net_lot) of one day's (side, broker, value, lot, ...) rows"""
+    net = {}
+    for side, broker, value, lot, *_ in side_rows:
+        sign = 1.0 if side == BUY else -1.0
+        net_value, net_lot = net.get(broker, (0.0, 0.0))
+        net[broker] = (
+            net_value + sign * np.nan_to_num(value),
+            net_lot + sign * np.nan_to_num(lot),
+        )
+    return net
+
+
+class RollingIndicators:
+    """Running per-broker window sums of net value/lot for one symbol
+
+    The last `max(windows)` days are kept in a ring buffer. Adding a day
+    subtracts the rows that fall out of each window and adds the new row,
+    so an update costs O(brokers) regardless of how much history exists.
+    """
+
+    def __init__(self, symbol, windows=WINDOWS):
+        self.symbol = symbol
+        self.windows = tuple(sorted(windows))
+        self.depth = self.windows[-1]
+        self.brokers = []
+        self.broker_slots = {}
+        self.dates = []
+        self.n_days = 0
+        self._allocate(DEFAULT_CAPACITY)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.ring = {name: np.zeros((self.depth, capacity)) for name in SERIES}
+        self.sums = {(name, window): np.zeros(capacity) for name in SERIES for window in self.windows}
+        self.counts = {window: np.zeros(capacity, dtype=np.int64) for window in self.windows}
+
+    def _grow(self, capacity):
+        pad = capacity - self.capacity
+        for name in SERIES:
+            self.ring[name] = np.pad(self.ring[name], ((0, 0), (0, pad)))
+        for key in self.sums:
+            self.sums[key] = np.pad(self.sums[key], (0, pad))
+        for window in self.windows:
+            self.counts[window] = np.pad(self.counts[window], (0, pad))
+        self.capacity = capacity
+
+    def _register(self, codes):
+        for code in codes:
+            if code not in self.broker_slots:
+                self.broker_slots[code] = len(self.brokers)
+                self.brokers.append(code)
+        if len(self.brokers) > self.capacity:
+            capacity = self.capacity
+            while capacity < len(self.brokers):
+                capacity *= 2
+            self._grow(capacity)
+
+    def _row(self, net):
+        row = {name: np.zeros(self.capacity) for name in SERIES}
+        for broker, (net_value, net_lot) in net.items():
+            slot = self.broker_slots[broker]
+            row["net_value"][slot] = net_value
+            row["net_lot"][slot] = net_lot
+        return row
+
+    def update(self, date, net):
+        """Add one trading day of {broker: (net_value, net_lot)}; re-adding the latest day replaces it"""
+        iso_date = to_iso_date(date)
+        if self.dates and iso_date < self.dates[-1]:
+            raise ValueError(
+                f"{self.symbol}: {iso_date} is older than the latest indicator day {self.dates[-1]}; rebuild instead"
+            )
+
+        self._register(net.keys())
+        row = self._row(net)
+
+        if self.dates and iso_date == self.dates[-1]:
+            self._replace_latest(row)
+            return
+
+        # Evict the day leaving each window before the ring slot is overwritten
+        for window in self.windows:
+            if self.n_days >= window:
+                old = (self.n_days - window) % self.depth
+                for name in SERIES:
+                    self.sums[(name, window)] -= self.ring[name][old]
+                self.counts[window] -= self.ring["net_value"][old] > 0
+
+        slot = self.n_days % self.depth
+        for name in SERIES:
+            self.ring[name][slot] = row[name]
+            for window in self.windows:
+                self.sums[(name, window)] += row[name]
+        for window in self.windows:
+            self.counts[window] += row["net_value"] > 0
+
+        self.n_days += 1
+        self.dates.append(iso_date)
+        del self.dates[:-self.depth]
+
+    def _replace_latest(self, row):
+        slot = (self.n_days - 1) % self.depth
+        for window in self.windows:
+            self.counts[window] += (row["net_value"] > 0).astype(np.int64) - (self.ring["net_value"][slot] > 0)
+        for name in SERIES:
+            delta = row[name] - self.ring[name][slot]
+            for window in self.windows:
+                self.sums[(name, window)] += delta
+            self.ring[name][slot] = row[name]
+
+    def values(self, window):
+        """Current window sums per broker: {'brokers', 'net_value', 'net_lot', 'accumulation_days', 'days'}"""
+        if window not in self.windows:
+            raise ValueError(f"Unknown window {window}; expected one of {self.windows}")
+        n_brokers = len(self.brokers)
+        return {
+            "brokers": np.array(self.brokers, dtype="<U4"),
+            "net_value": self.sums[("net_value", window)][:n_brokers],
+            "net_lot": self.sums[("net_lot", window)][:n_brokers],
+            "accumulation_days": self.counts[window][:n_brokers],
+            "days": min(self.n_days, window),
+        }
+
+    def save(self, path):
+        """Write an atomic snapshot of the engine state"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "symbol": self.symbol,
+            "windows": list(self.windows),
+            "brokers": self.brokers,
+            "dates": self.dates,
+            "n_days": self.n_days,
+        }
+        arrays = {"meta": np.array(json.dumps(meta))}
+        for name in SERIES:
+            arrays[f"ring_{name}"] = self.ring[name]
+            for window in self.windows:
+                arrays[f"sum_{name}_{window}"] = self.sums[(name, window)]
+        for window in self.windows:
+            arrays[f"count_{window}"] = self.counts[window]
+
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Restore an engine from a snapshot written by save()"""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            engine = cls(meta["symbol"], windows=meta["windows"])
+            engine.brokers = meta["brokers"]
+            engine.broker_slots = {code: slot for slot, code in enumerate(engine.brokers)}
+            engine.dates = meta["dates"]
+            engine.n_days = meta["n_days"]
+            engine.ring = {name: data[f"ring_{name}"] for name in SERIES}
+            engine.capacity = engine.ring["net_value"].shape[1]
+            engine.sums = {
+                (name, window): data[f"sum_{name}_{window}"]
+                for name in SERIES for window in engine.windows
+            }
+            engine.counts = {window: data[f"count_{window}"] for window in engine.windows}
+        return engine
+
+
+def snapshot_path(root, symbol):
+    return Path(root) / f"{symbol}.npz"
+
+
+def rebuild_from_store(conn, symbol, windows=WINDOWS):
+    """Build an engine by replaying only the last max(windows) stored days"""
+    engine = RollingIndicators(symbol, windows=windows)
+    dates = list_dates(conn, symbol, last=engine.depth)
+    if dates:
+        rows = load_rows(conn, symbol, dates[0], dates[-1])
+        by_date = {}
+        for date, side, broker, value, lot, avg in rows:
+            by_date.setdefault(date, []).append((side, broker, value, lot))
+        for date in dates:
+            engine.update(date, net_by_broker(by_date.get(date, [])))
+    return engine
+
+
+def load_indicators(root, conn, symbol, windows=WINDOWS):
+    """Recover an engine from its snapshot, catching up on days stored since; rebuild if inconsistent"""
+    path = snapshot_path(root, symbol)
+    if not path.exists():
+        return rebuild_from_store(conn, symbol, windows)
+
+    engine = RollingIndicators.load(path)
+    if engine.windows != tuple(sorted(windows)):
+        return rebuild_from_store(conn, symbol, windows)
+
+    # Only the snapshot's window and the days after it are read, so catching up stays O(window)
+    if engine.dates:
+        latest = engine.dates[-1]
+        # A window that isn't full yet must also start at the symbol's first stored day
+        known = list_dates(conn, symbol, end=latest, last=min(len(engine.dates) + 1, engine.depth))
+        if known != engine.dates:
+            # Backfilled or deleted days inside the window: replay instead of patching
+            return rebuild_from_store(conn, symbol, windows)
+        missing = [date for date in list_dates(conn, symbol, start=latest) if date > latest]
+    else:
+        missing = list_dates(conn, symbol, last=engine.depth)
+
+    for date in missing:
+        rows = load_rows(conn, symbol, date, date)
+        engine.update(date, net_by_broker([(side, broker, value, lot) for _, side, broker, value, lot, _ in rows]))
+    return engine
+
+
+def update_indicators(root, conn, symbol, date, side_rows, windows=WINDOWS):
+    """Bring a symbol's indicators up to date after `date` was stored, and persist the snapshot"""
+    # Catching up from the snapshot already applies `date` when it is a new latest day
+    engine = load_indicators(root, conn, symbol, windows)
+    iso_date = to_iso_date(date)
+    if engine.dates and iso_date == engine.dates[-1]:
+        # Re-extraction of the latest day replaces it in place
+        engine.update(iso_date, net_by_broker(side_rows))
+    elif engine.dates and engine.dates[0] <= iso_date < engine.dates[-1]:
+        # A re-extracted day inside the window changes past sums: replay the window
+        engine = rebuild_from_store(conn, symbol, windows)
+    engine.save(snapshot_path(root, symbol))
+    return engine
+
+
+def check_consistency(engine, conn, rtol=1e-9, atol=1e-6):
+    """Compare every window against a recompute of its days from the store; returns a list of mismatches"""
+    stored = list_dates(conn, engine.symbol, last=engine.depth)
+    mismatches = []
+    for window in engine.windows:
+        dates = stored[-window:]
+        expected = compute_flow(rows_to_arrays(load_rows(conn, engine.symbol, dates[0], dates[-1]))) if dates else None
+        current = engine.values(window)
+        slots = {code: i for i, code in enumerate(current["brokers"])}
+
+        expected_brokers = [] if expected is None else list(expected["brokers"])
+        for name in ("net_value", "net_lot", "accumulation_days"):
+            want = np.zeros(len(current["brokers"]))
+            for i, code in enumerate(expected_brokers):
+                if code not in slots:
+                    mismatches.append(f"window {window}: broker {code} missing from indicators")
+                    continue
+                want[slots[code]] = expected[name][i]
+            if not np.allclose(current[name], want, rtol=rtol, atol=atol):
+                worst = int(np.argmax(np.abs(current[name] - want)))
+                mismatches.append(
+                    f"window {window}: {name} differs for {current['brokers'][worst]} "
+                    f"({current[name][worst]:,.2f} vs {want[worst]:,.2f})"
+                )
+    return mismatches
+
+
+def format_rolling_table(engine, top=10):
+    """Top net accumulators of each window"""
+    lines = [f"Rolling net accumulation for {engine.symbol} (latest day: {engine.dates[-1] if engine.dates else 'N/A'})"]
+    for window in engine.windows:
+        values = engine.values(window)
+        order = np.argsort(-values["net_value"], kind="stable")[:top]
+        lines.extend([
+            "",
+            f"{window}-day window ({values['days']} days available)",
+            f"{'Broker':<7} {'Net val':>18} {'Net lot':>14} {'Days+':>6}",
+            "-" * 48,
+        ])
+        for i in order:
+            lines.append(
+                f"{values['brokers'][i]:<7} "
+                f"{values['net_value'][i]:>18,.0f} "
+                f"{values['net_lot'][i]:>14,.0f} "
+                f"{values['accumulation_days'][i]:>6}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,42 @@
+from stockbit_analyzer.indicators import get_indicator_root, update_indicators
+from stockbit_analyzer.matrix import BrokerMatrix, get_matrix_root
+from stockbit_analyzer.metrics import QUALITY_FLAGS
+from stockbit_analyzer.quality import save_quality, validate_day
+from stockbit_analyzer.store import get_store_path, save_day, split_sides
+
+
+def ingest_day(conn, symbol, date, rows, store_path=None, date_range=None, date_verified=None):
+    """Persist one extracted day to the store and every derived structure; returns its quality flags
+
+    Flagged days are stored too, so nothing extracted is lost; `repair`
+    re-fetches them (see quality.py).
+    """
+    side_rows = [(side, broker, value, lot, avg) for side, _, broker, value, lot, avg in split_sides(rows)]
+    quality = validate_day(conn, symbol, date, side_rows, date_range=date_range, date_verified=date_verified)
+    save_day(conn, symbol, date, rows)
+    save_quality(conn, symbol, date, quality)
+    for flag in quality["flags"]:
+        QUALITY_FLAGS.inc(flag=flag)
+
+    root = get_store_path(store_path)
+    matrix = BrokerMatrix(get_matrix_root(root), symbol)
+    matrix.append_day(date, side_rows)
+    update_indicators(get_indicator_root(root), conn, symbol, date, side_rows)
+    return quality["flags"]
+
+
+def ingest_extraction(conn, symbol, broker_data, store_path=None):
+    """Persist the result of extract_broker_summary (single or multi-day); returns days stored"""
+    if not broker_data:
+        return 0
+
+    days = broker_data.get("all_days") or [broker_data]
+    stored = 0
+    for day_data in days:
+        if day_data.get("rows") and day_data.get("date"):
+            ingest_day(
+                conn, symbol, day_data["date"], day_data["rows"], store_path=store_path,
+                date_range=day_data.get("dateRange"), date_verified=day_data.get("dateVerified"),
+            )
+            stored += 1
+    return stored
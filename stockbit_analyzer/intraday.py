@@ -0,0 +1,110 @@
+import math
+
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import BUY, SELL, split_sides
+
+
+TIME_FORMAT = "%H:%M:%S"
+
+
+def snapshot_map(rows):
+    """{(side, broker): (value, lot, avg)} of extracted table rows"""
+    return {(side, broker): (value, lot, avg) for side, _, broker, value, lot, avg in split_sides(rows)}
+
+
+def _missing(value):
+    return value is None or math.isnan(value)
+
+
+def _same(a, b):
+    # Empty cells ('-') parse to NaN, which never equals itself
+    return all(x == y or (_missing(x) and _missing(y)) for x, y in zip(a, b))
+
+
+def diff_snapshot(previous, current):
+    """(side, broker, value, lot, avg, removed) rows that differ between two snapshot maps"""
+    changes = [
+        (side, broker) + cells + (0,)
+        for (side, broker), cells in current.items()
+        if (side, broker) not in previous or not _same(previous[(side, broker)], cells)
+    ]
+    changes.extend(
+        (side, broker, None, None, None, 1)
+        for side, broker in previous
+        if (side, broker) not in current
+    )
+    return changes
+
+
+def save_snapshot(conn, symbol, date, ts, changes, total):
+    """Store one snapshot as its changed rows plus a (changed, total) marker"""
+    iso_date = to_iso_date(date)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO intraday_rows (symbol, date, side, broker, ts, value, lot, avg, removed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (symbol, iso_date, side, broker, ts, value, lot, avg, removed)
+                for side, broker, value, lot, avg, removed in changes
+            ],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO intraday_snapshots (symbol, date, ts, changed, total) VALUES (?, ?, ?, ?, ?)",
+            (symbol, iso_date, ts, len(changes), total),
+        )
+
+
+def load_snapshot(conn, symbol, date, at=None):
+    """Rebuild the snapshot map of a symbol's day as of time `at` (HH:MM:SS, default: latest)"""
+    query = "SELECT side, broker, value, lot, avg, removed FROM intraday_rows WHERE symbol = ? AND date = ?"
+    params = [symbol, to_iso_date(date)]
+    if at:
+        query += " AND ts <= ?"
+        params.append(at)
+    snapshot = {}
+    for side, broker, value, lot, avg, removed in conn.execute(query + " ORDER BY ts", params):
+        if removed:
+            snapshot.pop((side, broker), None)
+        else:
+            snapshot[(side, broker)] = (value, lot, avg)
+    return snapshot
+
+
+def list_snapshots(conn, symbol, date):
+    """(ts, changed, total) of every snapshot of a symbol's day, oldest first"""
+    return conn.execute(
+        "SELECT ts, changed, total FROM intraday_snapshots WHERE symbol = ? AND date = ? ORDER BY ts",
+        (symbol, to_iso_date(date)),
+    ).fetchall()
+
+
+def format_snapshot(symbol, date, snapshot, snapshots=()):
+    """Format a snapshot map as buy and sell sides ranked by value, after the snapshot log"""
+    lines = [f"📅 {symbol} intraday, {to_iso_date(date)}", ""]
+    if snapshots:
+        lines.append(f"{'Time':<9} {'Changed':>8} {'Rows':>6}")
+        lines.extend(f"{ts:<9} {changed:>8} {total:>6}" for ts, changed, total in snapshots)
+        lines.append("")
+    if not snapshot:
+        lines.append("No intraday rows stored")
+        return "\n".join(lines)
+
+    def ranked(side):
+        return sorted(
+            ((broker, cells) for (row_side, broker), cells in snapshot.items() if row_side == side),
+            key=lambda item: -(item[1][0] or 0),
+        )
+
+    buys, sells = ranked(BUY), ranked(SELL)
+    lines.append(f"{'BY':<6} {'B.val':>16} {'B.lot':>12} | {'SL':<6} {'S.val':>16} {'S.lot':>12}")
+    lines.append("-" * 76)
+    for index in range(max(len(buys), len(sells))):
+        left = right = f"{'':<6} {'':>16} {'':>12}"
+        if index < len(buys):
+            broker, (value, lot, _) = buys[index]
+            left = f"{broker:<6} {value or 0:>16,.0f} {lot or 0:>12,.0f}"
+        if index < len(sells):
+            broker, (value, lot, _) = sells[index]
+            right = f"{broker:<6} {value or 0:>16,.0f} {lot or 0:>12,.0f}"
+        lines.append(f"{left} | {right}")
+    return "\n".join(lines)
@@ -0,0 +1,137 @@
+import atexit
+import contextlib
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+
+
+LOGGER_NAME = "stockbit_analyzer"
+
+LOG_FORMATS = ("text", "json")
+
+# Structured fields callers pass through `extra=`; copied onto JSON records when set
+FIELDS = ("symbol", "date", "phase", "duration", "page", "attempt", "url", "rows", "error_class")
+
+_listener = None
+
+
+def get_logger(name=None):
+    """Logger under the package namespace (e.g. get_logger(__name__))"""
+    if not name or name == "__main__":
+        return logging.getLogger(LOGGER_NAME)
+    if name == LOGGER_NAME or name.startswith(LOGGER_NAME + "."):
+        return logging.getLogger(name)
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg and any structured fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = round(value, 3) if field == "duration" else value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class HumanFormatter(logging.Formatter):
+    """Terminal sink: the message, prefixed with the level when it isn't INFO"""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.levelno != logging.INFO:
+            message = f"[{record.levelname.lower()}] {message}"
+        duration = getattr(record, "duration", None)
+        if duration is not None:
+            message += f" ({duration:.1f}s)"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # The stock handler folds the traceback into msg; keep exc_info so each sink formats it
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(level="INFO", log_format="text", log_file=None, console=True, stream=None):
+    """Route package logs through a queue to the chosen sinks
+
+    Loggers only enqueue records; a listener thread formats and writes them,
+    so extraction and ingest workers never block on terminal or file I/O.
+    `console` writes to `stream` (stderr by default) as readable text or,
+    with log_format="json", JSON lines; `log_file` always gets JSON lines.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {log_format!r}; expected one of {', '.join(LOG_FORMATS)}")
+    shutdown_logging()
+
+    sinks = []
+    if console:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if log_format == "json" else HumanFormatter())
+        sinks.append(handler)
+    if log_file:
+        handler = logging.FileHandler(log_file, encoding="utf-8")
+        handler.setFormatter(JsonFormatter())
+        sinks.append(handler)
+    if not sinks:
+        sinks.append(logging.NullHandler())
+
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_QueueHandler(records))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, *sinks, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records to the sinks and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+@contextlib.contextmanager
+def timed(logger, phase, message, level=logging.INFO, **fields):
+    """Log `message` with phase and duration fields once the block finishes (or fails)"""
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception:
+        logger.warning(f"{message} failed", extra=dict(fields, phase=phase, duration=time.perf_counter() - start))
+        raise
+    logger.log(level, message, extra=dict(fields, phase=phase, duration=time.perf_counter() - start))
@@ -0,0 +1,261 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import BUY, SELL, list_dates, load_rows
+
+
+METRICS = (
+    "buy_value",
+    "sell_value",
+    "buy_lot",
+    "sell_lot",
+    "net_value",
+    "net_lot",
+    "buy_avg",
+    "sell_avg",
+)
+
+# Averages are undefined (NaN) where a broker didn't trade, as in aggregate_day
+AVG_METRICS = ("buy_avg", "sell_avg")
+
+DTYPE = np.float64
+DEFAULT_CAPACITY = 128  # IDX has roughly 100 active brokers; grows when exceeded
+
+
+def get_matrix_root(store_path):
+    """Directory holding per-symbol matrices, next to the SQLite store"""
+    return Path(store_path).parent / "matrix"
+
+
+def empty_rows(metric, n_days, width):
+    """Rows for brokers or days without activity: zeros, NaN for the averages"""
+    return np.full((n_days, width), np.nan if metric in AVG_METRICS else 0.0, dtype=DTYPE)
+
+
+def aggregate_day(side_rows, broker_slots):
+    """Aggregate one day's (side, broker, value, lot, avg) rows into per-slot metric vectors"""
+    width = len(broker_slots)
+    day = {metric: np.zeros(width, dtype=DTYPE) for metric in METRICS}
+    # Averages are weighted only by the lots of rows whose average is known
+    lot_x_avg = {BUY: np.zeros(width, dtype=DTYPE), SELL: np.zeros(width, dtype=DTYPE)}
+    known_lot = {BUY: np.zeros(width, dtype=DTYPE), SELL: np.zeros(width, dtype=DTYPE)}
+
+    for side, broker, value, lot, avg in side_rows:
+        slot = broker_slots[broker]
+        # Missing cells come back from SQLite as None; np.float64(None) is NaN
+        value = np.nan_to_num(np.float64(value))
+        lot = np.nan_to_num(np.float64(lot))
+        avg = np.float64(avg)
+        if side == BUY:
+            day["buy_value"][slot] += value
+            day["buy_lot"][slot] += lot
+        else:
+            day["sell_value"][slot] += value
+            day["sell_lot"][slot] += lot
+        if not np.isnan(avg):
+            lot_x_avg[side][slot] += lot * avg
+            known_lot[side][slot] += lot
+
+    day["net_value"] = day["buy_value"] - day["sell_value"]
+    day["net_lot"] = day["buy_lot"] - day["sell_lot"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        day["buy_avg"] = np.where(known_lot[BUY] > 0, lot_x_avg[BUY] / known_lot[BUY], np.nan)
+        day["sell_avg"] = np.where(known_lot[SELL] > 0, lot_x_avg[SELL] / known_lot[SELL], np.nan)
+    return day
+
+
+class BrokerMatrix:
+    """Dense broker x trading day matrices for one symbol, memory-mapped from disk
+
+    Each metric is a file of float64 rows laid out day-major (one row of
+    `capacity` broker slots per trading day) so that appending a day is an
+    append to the file. `view()` returns the brokers x days transpose, which
+    is a zero-copy view over the memmap.
+    """
+
+    def __init__(self, root, symbol):
+        self.symbol = symbol
+        self.path = Path(root) / symbol
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._maps = {}
+        self._load_meta()
+
+    def _meta_path(self):
+        return self.path / "meta.json"
+
+    def _metric_path(self, metric):
+        return self.path / f"{metric}.f64"
+
+    def _load_meta(self):
+        meta_path = self._meta_path()
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+        else:
+            meta = {"capacity": DEFAULT_CAPACITY, "brokers": [], "dates": []}
+        self.capacity = meta["capacity"]
+        self.brokers = meta["brokers"]
+        self.dates = meta["dates"]
+        self.broker_slots = {code: slot for slot, code in enumerate(self.brokers)}
+        self._maps = {}
+
+    def _write_meta(self):
+        # The metadata file is the commit point: rows past len(dates) are ignored
+        meta = {"capacity": self.capacity, "brokers": self.brokers, "dates": self.dates}
+        tmp_path = self._meta_path().with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self._meta_path())
+        self._maps = {}
+
+    def _replace_file(self, metric, array):
+        # Write to a new inode so existing memmap views of the old file stay valid
+        metric_path = self._metric_path(metric)
+        tmp_path = metric_path.with_suffix(".tmp")
+        array.astype(DTYPE, copy=False).tofile(tmp_path)
+        os.replace(tmp_path, metric_path)
+        self._maps.pop(metric, None)
+
+    def _row_bytes(self):
+        return self.capacity * np.dtype(DTYPE).itemsize
+
+    def _register_brokers(self, codes):
+        for code in codes:
+            if code not in self.broker_slots:
+                self.broker_slots[code] = len(self.brokers)
+                self.brokers.append(code)
+        if len(self.brokers) > self.capacity:
+            new_capacity = self.capacity
+            while new_capacity < len(self.brokers):
+                new_capacity *= 2
+            self._resize(new_capacity)
+
+    def _resize(self, new_capacity):
+        """Rewrite every metric file with a wider row (rare: only when new brokers appear)"""
+        n_days = len(self.dates)
+        for metric in METRICS:
+            widened = empty_rows(metric, n_days, new_capacity)
+            if n_days:
+                widened[:, :self.capacity] = self._open(metric)
+            self._replace_file(metric, widened)
+        # Record the new row width right away so meta never describes narrower files
+        self.capacity = new_capacity
+        self._write_meta()
+
+    def _open(self, metric):
+        """Read-only memmap of a metric, shape (days, capacity)"""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}")
+        if metric not in self._maps:
+            n_days = len(self.dates)
+            if n_days == 0:
+                self._maps[metric] = np.zeros((0, self.capacity), dtype=DTYPE)
+            else:
+                # A str path avoids pathlib.resolve() inside np.memmap (hot in bulk scans)
+                self._maps[metric] = np.memmap(
+                    str(self._metric_path(metric)), dtype=DTYPE, mode="r",
+                    shape=(n_days, self.capacity),
+                )
+        return self._maps[metric]
+
+    def _write_row(self, metric, day_index, vector):
+        row = empty_rows(metric, 1, self.capacity)[0]
+        row[:len(vector)] = vector
+        metric_path = self._metric_path(metric)
+        mode = "r+b" if metric_path.exists() else "w+b"
+        with open(metric_path, mode) as f:
+            f.seek(day_index * self._row_bytes())
+            f.write(row.tobytes())
+            f.truncate(len(self.dates) * self._row_bytes())
+
+    def append_day(self, date, side_rows):
+        """Add or overwrite one trading day from (side, broker, value, lot, avg) rows"""
+        iso_date = to_iso_date(date)
+        self._register_brokers(broker for _, broker, _, _, _ in side_rows)
+        day = aggregate_day(side_rows, self.broker_slots)
+
+        if iso_date in self.dates:
+            day_index = self.dates.index(iso_date)
+        elif not self.dates or iso_date > self.dates[-1]:
+            day_index = len(self.dates)
+            self.dates.append(iso_date)
+        else:
+            self._insert_day(iso_date, day)
+            return
+
+        self._maps = {}
+        for metric in METRICS:
+            self._write_row(metric, day_index, day[metric])
+        self._write_meta()
+
+    def _insert_day(self, iso_date, day):
+        """Insert a day older than the newest one (backfill); rewrites the metric files"""
+        position = int(np.searchsorted(np.asarray(self.dates), iso_date))
+        n_days = len(self.dates)
+        for metric in METRICS:
+            current = np.array(self._open(metric)) if n_days else np.zeros((0, self.capacity), dtype=DTYPE)
+            row = empty_rows(metric, 1, self.capacity)[0]
+            row[:len(day[metric])] = day[metric]
+            self._replace_file(metric, np.insert(current, position, row, axis=0))
+        self.dates.insert(position, iso_date)
+        self._write_meta()
+
+    def clear(self):
+        """Drop every stored day and broker"""
+        self.capacity = DEFAULT_CAPACITY
+        self.brokers = []
+        self.broker_slots = {}
+        self.dates = []
+        self._write_meta()
+        for metric in METRICS:
+            self._metric_path(metric).unlink(missing_ok=True)
+
+    def day_slice(self, start=None, end=None):
+        """Slice of day indices covering [start, end]"""
+        dates = np.asarray(self.dates)
+        lo = int(np.searchsorted(dates, to_iso_date(start), side="left")) if start else 0
+        hi = int(np.searchsorted(dates, to_iso_date(end), side="right")) if end else len(dates)
+        return slice(lo, hi)
+
+    def slice_days(self, metric, days):
+        """Zero-copy days x brokers slice of a metric for a slice of day indices"""
+        return self._open(metric)[days, :len(self.brokers)]
+
+    def read_days(self, metric, days):
+        """Copy of a days x brokers slice read with one positioned read
+
+        Cheaper than creating a memmap when scanning many symbols once.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}")
+        start, stop, _ = days.indices(len(self.dates))
+        n_days = max(stop - start, 0)
+        data = np.fromfile(
+            str(self._metric_path(metric)), dtype=DTYPE,
+            count=n_days * self.capacity, offset=start * self._row_bytes(),
+        )
+        return data.reshape(n_days, self.capacity)[:, :len(self.brokers)]
+
+    def view(self, metric, start=None, end=None):
+        """Zero-copy brokers x days view of a metric over [start, end]"""
+        return self.slice_days(metric, self.day_slice(start, end)).T
+
+    def series(self, broker, metric="net_lot", start=None, end=None):
+        """Zero-copy daily series of one broker; returns (dates, values)"""
+        days = self.day_slice(start, end)
+        slot = self.broker_slots.get(broker)
+        if slot is None:
+            return [], np.zeros(0, dtype=DTYPE)
+        return self.dates[days], self._open(metric)[days, slot]
+
+
+def build_matrix(conn, symbol, root):
+    """(Re)build a symbol's matrix from the SQLite store, dropping days and brokers no longer stored"""
+    matrix = BrokerMatrix(root, symbol)
+    matrix.clear()
+    for iso_date in list_dates(conn, symbol):
+        rows = load_rows(conn, symbol, iso_date, iso_date)
+        matrix.append_day(iso_date, [(side, broker, value, lot, avg) for _, side, broker, value, lot, avg in rows])
+    return matrix
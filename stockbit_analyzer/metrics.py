@@ -0,0 +1,197 @@
+import contextlib
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+
+# Latency buckets (seconds) sized for browser phases: clicks, picker cycles, page loads
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Current value per label set"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(self._key(labels), ([0] * len(self.buckets), 0.0))
+        return counts[-1]
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """The metrics of one process, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically write the metrics for node_exporter's textfile collector"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+
+REGISTRY = Registry()
+
+NAVIGATIONS = REGISTRY.counter(
+    "stockbit_navigations_total", "Page navigations by outcome", ("result",)
+)
+RETRIES = REGISTRY.counter(
+    "stockbit_retries_total", "Retries taken by the retry policy", ("phase", "error_class")
+)
+DATE_PICKS = REGISTRY.counter(
+    "stockbit_date_picker_attempts_total", "Date picker cell picks by picker and outcome", ("picker", "result")
+)
+EXTRACTIONS = REGISTRY.counter(
+    "stockbit_extractions_total", "Day extractions by outcome and failure reason", ("result", "reason")
+)
+ROWS_EXTRACTED = REGISTRY.counter(
+    "stockbit_rows_extracted_total", "Broker summary rows extracted"
+)
+PAGE_RECYCLES = REGISTRY.counter(
+    "stockbit_page_recycles_total", "Pooled pages replaced by a fresh one"
+)
+JOBS = REGISTRY.counter(
+    "stockbit_daemon_jobs_total", "Daemon jobs finished by status", ("status",)
+)
+JOB_QUEUE_DEPTH = REGISTRY.gauge(
+    "stockbit_daemon_queue_depth", "Daemon jobs waiting to run"
+)
+QUALITY_FLAGS = REGISTRY.counter(
+    "stockbit_day_quality_flags_total", "Quality flags raised on stored days", ("flag",)
+)
+PHASE_SECONDS = REGISTRY.histogram(
+    "stockbit_phase_seconds", "Latency of extraction phases", ("phase",)
+)
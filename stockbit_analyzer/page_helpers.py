@@ -0,0 +1,499 @@
+import json
+import os
+import weakref
+from pathlib import Path
+
+
+# Page-side helpers installed once per page as `window.__banmo`. Callers pass
+# arguments to evaluate() instead of interpolating them into fresh JS source,
+# so Chromium compiles these functions once and keeps them warm across days.
+HELPERS_VERSION = 4
+
+HELPERS_SCRIPT = """
+(() => {
+    if (window.__banmo && window.__banmo.version === %(version)d) {
+        return;
+    }
+
+    const isVisible = (element) => {
+        const style = window.getComputedStyle(element);
+        return style.display !== 'none' && style.visibility !== 'hidden';
+    };
+
+    const visibleDropdown = () =>
+        Array.from(document.querySelectorAll('div.ant-picker-dropdown')).find(isVisible) || null;
+
+    // Calendar body of the currently open date picker dropdown
+    const calendarBody = () => {
+        const dropdown = visibleDropdown();
+        return dropdown
+            ? dropdown.querySelector('div.ant-picker-body')
+            : document.querySelector('div.ant-picker-body');
+    };
+
+    const MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+    // Month shown by the open date panel as year * 12 + month index, or null if unreadable
+    const shownMonth = (dropdown) => {
+        const yearButton = dropdown.querySelector('.ant-picker-header-view .ant-picker-year-btn');
+        const monthButton = dropdown.querySelector('.ant-picker-header-view .ant-picker-month-btn');
+        if (!yearButton || !monthButton) {
+            return null;
+        }
+        const year = parseInt(yearButton.textContent, 10);
+        const monthText = monthButton.textContent.trim();
+        let month = MONTHS.findIndex(name => monthText.startsWith(name));
+        if (month === -1) {
+            month = parseInt(monthText, 10) - 1;
+        }
+        return Number.isNaN(year) || Number.isNaN(month) ? null : year * 12 + month;
+    };
+
+    // React re-renders the panel after the click handler returns
+    const nextFrame = () => new Promise(resolve => setTimeout(resolve, 0));
+
+    // Page the open calendar to target.year/target.month with the header buttons:
+    // super-prev/next to the nearest year, then prev/next for the remaining months
+    const showMonth = async (target) => {
+        const dropdown = visibleDropdown();
+        if (!dropdown) {
+            return { navigated: false, clicks: 0 };
+        }
+        const wanted = target.year * 12 + target.month - 1;
+        let clicks = 0;
+        while (clicks < 240) {
+            const shown = shownMonth(dropdown);
+            if (shown === null) {
+                return { navigated: false, clicks };
+            }
+            const diff = wanted - shown;
+            if (diff === 0) {
+                return { navigated: true, clicks };
+            }
+            // A year jump that overshoots by up to 6 months still saves clicks
+            const step = Math.abs(diff) > 6 ? 'super-' : '';
+            const button = dropdown.querySelector(`.ant-picker-header-${step}${diff > 0 ? 'next' : 'prev'}-btn`);
+            if (!button || button.disabled) {
+                return { navigated: false, clicks };
+            }
+            button.click();
+            clicks += 1;
+            for (let wait = 0; wait < 20 && shownMonth(dropdown) === shown; wait++) {
+                await nextFrame();
+            }
+        }
+        return { navigated: false, clicks };
+    };
+
+    const titleMatches = (cell, target) => {
+        const title = cell.getAttribute('title') || '';
+        return title === target.iso || title.includes(target.dateStr) ||
+            (title.includes(target.monthName) && title.includes(String(target.year)));
+    };
+
+    // Click the cell for `target` ({day, month, year, iso, dateStr, monthName}) in the open
+    // calendar, first paging it to the target month so deep history picks the right day.
+    // preferToday: take the "today" cell when its day matches (end of a range ending today).
+    // skipInRange: ignore cells already inside the selected range.
+    const pickDate = async (target) => {
+        const navigation = target.month ? await showMonth(target) : { navigated: false, clicks: 0 };
+        const body = calendarBody();
+        if (!body) {
+            return { error: 'Calendar body not found' };
+        }
+
+        const day = String(target.day);
+        const cells = Array.from(body.querySelectorAll('td.ant-picker-cell')).filter(cell =>
+            cell.textContent.trim() === day &&
+            !cell.classList.contains('ant-picker-cell-disabled') &&
+            !(target.skipInRange && cell.classList.contains('ant-picker-cell-in-range'))
+        );
+        const isToday = cell => cell.classList.contains('ant-picker-cell-today');
+
+        const inView = cell => cell.classList.contains('ant-picker-cell-in-view');
+
+        let targetCell = (target.preferToday && cells.find(isToday)) ||
+            cells.find(cell => titleMatches(cell, target));
+        if (!targetCell && navigation.navigated) {
+            // Panel shows the target month: its in-view cell is the target day
+            targetCell = cells.find(inView);
+        }
+        if (!targetCell && !navigation.navigated) {
+            // Fall back to the day number, but never a "today" cell from another month
+            targetCell = cells.find(cell => target.preferToday || !isToday(cell));
+        }
+
+        if (!targetCell) {
+            return {
+                error: `Date cell not found for day ${day}`,
+                availableCells: body.querySelectorAll('td.ant-picker-cell').length,
+                monthClicks: navigation.clicks
+            };
+        }
+        targetCell.click();
+        return {
+            success: true,
+            clicked: targetCell.textContent.trim(),
+            title: targetCell.getAttribute('title'),
+            isToday: isToday(targetCell),
+            monthClicks: navigation.clicks
+        };
+    };
+
+    const focusedInput = () => {
+        const active = document.activeElement;
+        if (active && active.tagName === 'INPUT') {
+            return { isInput: true, value: active.value };
+        }
+        return { isInput: false };
+    };
+
+    // First element whose own text is exactly `text` (XPath: no layout, unlike innerText)
+    const byText = (text, root) => document.evaluate(
+        `.//*[normalize-space(text())='${text}']`, root || document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+
+    const closest = (element, predicate) => {
+        for (let node = element; node && node !== document.body; node = node.parentElement) {
+            if (predicate(node)) {
+                return node;
+            }
+        }
+        return null;
+    };
+
+    const hasPickers = el => el.querySelectorAll('div.ant-picker').length >= 2;
+
+    // Lookup strategies per element, cheapest and most stable first; the
+    // innerText scan is the last resort because it forces layout on every div
+    const STRATEGIES = {
+        container: [
+            ['hashed-class', () => document.querySelector('div.sc-f10b1c12-0.jQepBs')],
+            ['class-prefix', () => Array.from(document.querySelectorAll('div[class*="sc-f10b1c12-0"]')).find(hasPickers)],
+            ['heading', () => {
+                const heading = byText('Broker Summary');
+                return heading && closest(heading, hasPickers);
+            }],
+            ['table-header', () => {
+                const header = byText('B.val');
+                return header && closest(header, hasPickers);
+            }],
+            ['innertext-scan', () => Array.from(document.querySelectorAll('div')).find(el =>
+                el.innerText && el.innerText.includes('Broker Summary') && el.innerText.includes('BY')
+            )],
+        ],
+        table: [
+            ['hashed-class', container => container.querySelector('div.sc-4858c0ef-27.fhVdvL')],
+            ['class-prefix', container => container.querySelector('div[class*="sc-4858c0ef-27"]')],
+            ['table-header', container => {
+                // Outermost block under the container holding the header row, and so the rows
+                const header = byText('B.val', container);
+                return header && closest(header, el => el.parentElement === container);
+            }],
+            ['aria-role', container => container.querySelector('[role="table"], [role="grid"], table')],
+            ['innertext-scan', container => Array.from(container.querySelectorAll('div')).find(el =>
+                el.innerText && el.innerText.includes('BY') &&
+                el.innerText.includes('B.val') && el.innerText.includes('B.lot')
+            )],
+        ],
+    };
+
+    // Elements already found in this document, reused while still attached
+    const found = {};
+
+    // Locate `kind` trying the `preferred` strategy first; returns [element, strategy name]
+    const locate = (kind, preferred, root) => {
+        const cached = found[kind];
+        if (cached && cached.element.isConnected && (!root || root.contains(cached.element))) {
+            return [cached.element, cached.strategy];
+        }
+        const strategies = STRATEGIES[kind];
+        const ordered = strategies.filter(([name]) => name === preferred)
+            .concat(strategies.filter(([name]) => name !== preferred));
+        for (const [name, strategy] of ordered) {
+            const element = strategy(root);
+            if (element) {
+                found[kind] = { element, strategy: name };
+                return [element, name];
+            }
+        }
+        return [null, null];
+    };
+
+    const siteBuild = () => (window.__NEXT_DATA__ && window.__NEXT_DATA__.buildId) || '';
+
+    // Tag the Broker Summary container so Playwright locators can target it
+    const markContainer = (prefer) => {
+        const [container, strategy] = locate('container', (prefer || {}).container);
+        if (container) {
+            container.setAttribute('data-banmo', 'broker-summary');
+        }
+        return { found: !!container, strategies: { container: strategy }, build: siteBuild() };
+    };
+
+    // options.raw: also return the table's full text (for --dump-raw archives)
+    // options.prefer: {container, table} strategy names that matched last time
+    const extractBrokerSummary = (options) => {
+        const prefer = (options && options.prefer) || {};
+        const [brokerSummary, containerStrategy] = locate('container', prefer.container);
+        const strategies = { container: containerStrategy };
+        const build = siteBuild();
+
+        if (!brokerSummary) {
+            return { error: 'Broker Summary container not found', strategies, build };
+        }
+
+        // Extract date range from date pickers
+        let dateRange = null;
+        const datePickers = brokerSummary.querySelectorAll('div.ant-picker, .ant-picker-input input');
+        if (datePickers.length >= 2) {
+            const startDateInput = datePickers[0].querySelector('input') || datePickers[0];
+            const endDateInput = datePickers[1].querySelector('input') || datePickers[1];
+
+            const startDate = startDateInput.value || startDateInput.getAttribute('value') || startDateInput.textContent || '';
+            const endDate = endDateInput.value || endDateInput.getAttribute('value') || endDateInput.textContent || '';
+
+            if (startDate && endDate) {
+                dateRange = {
+                    start: startDate.trim(),
+                    end: endDate.trim()
+                };
+            }
+        }
+
+        // Also try to find date range in text format
+        if (!dateRange) {
+            const dateText = brokerSummary.innerText;
+            const dateMatch = dateText.match(/(\\d{1,2}[\\s/\\-]\\w{3}[\\s/\\-]\\d{2,4}|\\w{3}[\\s/\\-]\\d{1,2}[\\s/\\-]\\d{2,4})/gi);
+            if (dateMatch && dateMatch.length >= 2) {
+                dateRange = {
+                    start: dateMatch[0].trim(),
+                    end: dateMatch[1].trim()
+                };
+            }
+        }
+
+        // Find the data table inside the container
+        const [dataTable, tableStrategy] = locate('table', prefer.table, brokerSummary);
+        strategies.table = tableStrategy;
+
+        if (!dataTable) {
+            return {
+                error: 'Data table not found',
+                containerText: brokerSummary.innerText.substring(0, 500),
+                dateRange: dateRange,
+                strategies,
+                build
+            };
+        }
+
+        // Extract all text content
+        const fullText = dataTable.innerText;
+        const raw = options && options.raw ? { rawText: fullText } : {};
+
+        // Parse the text - split by whitespace and filter empty strings
+        const tokens = fullText.split(/\\s+/).filter(t => t.trim().length > 0);
+
+        // Find header row
+        let headerStart = -1;
+        for (let i = 0; i < tokens.length - 7; i++) {
+            if (tokens[i] === 'BY' && tokens[i+1] === 'B.val' && tokens[i+2] === 'B.lot' &&
+                tokens[i+3] === 'B.avg' && tokens[i+4] === 'SL' && tokens[i+5] === 'S.val' &&
+                tokens[i+6] === 'S.lot' && tokens[i+7] === 'S.avg') {
+                headerStart = i;
+                break;
+            }
+        }
+
+        if (headerStart === -1) {
+            return {
+                ...raw,
+                success: true,
+                rows: [],
+                rawExcerpt: fullText.substring(0, 500),
+                error: 'Could not find header row',
+                strategies,
+                build
+            };
+        }
+
+        // Parse data rows (start after header which is 8 tokens); each row is
+        // [buyBroker, buyValue, buyLot, buyAvg, sellBroker, sellValue, sellLot, sellAvg]
+        const rows = [];
+        let i = headerStart + 8;
+
+        while (i < tokens.length) {
+            // Look for broker code pattern (2 uppercase letters)
+            if (/^[A-Z]{2}$/.test(tokens[i]) && i + 7 < tokens.length) {
+                // Validate - sell broker should also be 2 letters
+                if (/^[A-Z]{2}$/.test(tokens[i + 4])) {
+                    rows.push(tokens.slice(i, i + 8));
+                    i += 8;
+                    continue;
+                }
+            }
+            i++;
+        }
+
+        return {
+            ...raw,
+            success: true,
+            rows: rows,
+            rawExcerpt: rows.length ? '' : fullText.substring(0, 500),
+            dateRange: dateRange,
+            strategies,
+            build
+        };
+    };
+
+    window.__banmo = {
+        version: %(version)d,
+        calendarBody,
+        pickDate,
+        focusedInput,
+        markContainer,
+        extractBrokerSummary,
+    };
+})();
+""" % {"version": HELPERS_VERSION}
+
+
+# Order of the cells in each row returned by __banmo.extractBrokerSummary()
+ROW_FIELDS = ("buyBroker", "buyValue", "buyLot", "buyAvg", "sellBroker", "sellValue", "sellLot", "sellAvg")
+
+SELECTOR_CACHE_PATH = Path.home() / ".stockbit_data" / "selector_cache.json"
+
+# Attribute __banmo.markContainer() sets on the Broker Summary container
+BROKER_SUMMARY_LOCATOR = '[data-banmo="broker-summary"]'
+
+
+class SelectorCache:
+    """Lookup strategy that last matched each page element, kept per site build across runs
+
+    The page helpers try the remembered strategy first, so the slow
+    innerText fallback only runs again after a deploy changes the markup.
+    """
+
+    def __init__(self, path=SELECTOR_CACHE_PATH):
+        self.path = Path(path)
+        self.build = None
+        self.strategies = {}
+        self._loaded = False
+
+    def _load(self):
+        self._loaded = True
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        self.build = data.get("build")
+        self.strategies = data.get("strategies", {})
+
+    def preferred(self):
+        """{element: strategy} to try first"""
+        if not self._loaded:
+            self._load()
+        return dict(self.strategies)
+
+    def record(self, result):
+        """Remember the strategies reported by a helper result; persist when they change"""
+        if not self._loaded:
+            self._load()
+        matched = {kind: name for kind, name in (result.get("strategies") or {}).items() if name}
+        build = result.get("build") or ""
+        if build != self.build:
+            # New deploy: earlier matches say nothing about the new markup
+            self.build = build
+            self.strategies = {}
+        elif all(self.strategies.get(kind) == name for kind, name in matched.items()):
+            return
+        self.strategies.update(matched)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"build": self.build, "strategies": self.strategies}, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+SELECTOR_CACHE = SelectorCache()
+
+# Last value each page's helpers returned, kept for failure artifacts
+_LAST_RESULTS = weakref.WeakKeyDictionary()
+
+
+def install_helpers(page):
+    """Install `window.__banmo` on every document the page loads, and on the current one"""
+    page.add_init_script(HELPERS_SCRIPT)
+    try:
+        page.evaluate(HELPERS_SCRIPT)
+    except Exception:
+        # Page is mid-navigation; the init script covers the next document
+        pass
+
+
+def call_helper(page, name, arg=None):
+    """Call `window.__banmo.<name>(arg)`, installing the helpers first if the page lacks them"""
+    expression = f"arg => window.__banmo.{name}(arg)"
+    try:
+        result = page.evaluate(expression, arg)
+    except Exception as e:
+        if "__banmo" not in str(e):
+            raise
+        # Document loaded before install_helpers (e.g. an adopted CDP page)
+        page.evaluate(HELPERS_SCRIPT)
+        result = page.evaluate(expression, arg)
+    _remember(page, name, result)
+    return result
+
+
+def _remember(page, name, result):
+    try:
+        _LAST_RESULTS[page] = {"helper": name, "result": result}
+    except TypeError:
+        pass
+
+
+def last_helper_result(page):
+    """{'helper', 'result'} of the last helper call on a page, or None"""
+    try:
+        return _LAST_RESULTS.get(page)
+    except TypeError:
+        return None
+
+
+def date_target(target_date, prefer_today=False, skip_in_range=False):
+    """pickDate() argument for a datetime"""
+    return {
+        "day": target_date.day,
+        "month": target_date.month,
+        "iso": target_date.strftime("%Y-%m-%d"),
+        "dateStr": target_date.strftime("%b %d, %Y"),
+        "monthName": target_date.strftime("%b"),
+        "year": target_date.year,
+        "preferToday": prefer_today,
+        "skipInRange": skip_in_range,
+    }
+
+
+def rows_from_cells(cells):
+    """Row dicts (buyBroker, buyValue, ...) from the compact cell lists sent over CDP"""
+    return [dict(zip(ROW_FIELDS, row)) for row in cells]
+
+
+def locate_broker_summary(page, cache=SELECTOR_CACHE):
+    """Locator for the Broker Summary container, found through the cached strategy registry"""
+    result = call_helper(page, "markContainer", cache.preferred())
+    if result.get("found"):
+        cache.record(result)
+    return page.locator(BROKER_SUMMARY_LOCATOR).first
+
+
+def extract_summary_data(page, raw=False, cache=SELECTOR_CACHE):
+    """Run __banmo.extractBrokerSummary with the cached strategies and remember what matched"""
+    result = call_helper(page, "extractBrokerSummary", {"raw": raw, "prefer": cache.preferred()})
+    if result.get("success") and result.get("rows"):
+        cache.record(result)
+    return result
@@ -0,0 +1,83 @@
+import math
+import re
+from datetime import datetime
+
+
+# Suffixes Stockbit uses to abbreviate values and lots in the broker summary
+NUMBER_SUFFIXES = {
+    "K": 1e3,
+    "M": 1e6,
+    "B": 1e9,
+    "T": 1e12,
+}
+
+DISPLAY_DATE_FORMAT = "%b %d, %Y"
+ISO_DATE_FORMAT = "%Y-%m-%d"
+
+BROKER_CODE = re.compile(r"^[A-Z]{2}$")
+
+
+def parse_number(text):
+    """Parse a broker summary cell such as '1.2B', '12,345' or '-3.4M' into a float"""
+    if text is None:
+        return math.nan
+    if isinstance(text, (int, float)):
+        return float(text)
+
+    cleaned = str(text).strip().replace(",", "")
+    if not cleaned or cleaned == "-":
+        return math.nan
+
+    multiplier = 1.0
+    suffix = cleaned[-1].upper()
+    if suffix in NUMBER_SUFFIXES:
+        multiplier = NUMBER_SUFFIXES[suffix]
+        cleaned = cleaned[:-1]
+
+    try:
+        return float(cleaned) * multiplier
+    except ValueError:
+        return math.nan
+
+
+def to_iso_date(value):
+    """Normalize a date/datetime, 'YYYY-MM-DD' or 'Jan 20, 2026' string to 'YYYY-MM-DD'"""
+    if hasattr(value, "strftime"):
+        return value.strftime(ISO_DATE_FORMAT)
+
+    text = str(value).strip()
+    for fmt in (ISO_DATE_FORMAT, DISPLAY_DATE_FORMAT):
+        try:
+            return datetime.strptime(text, fmt).strftime(ISO_DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+
+# Header tokens of the Broker Summary table, in column order
+TABLE_HEADER = ("BY", "B.val", "B.lot", "B.avg", "SL", "S.val", "S.lot", "S.avg")
+
+
+def parse_broker_table(text):
+    """Row cells from Broker Summary table text, offline twin of __banmo.extractBrokerSummary
+
+    Returns a list of 8-cell lists, or None when the header row is missing.
+    """
+    tokens = text.split()
+    header = list(TABLE_HEADER)
+    for start in range(len(tokens) - len(header) + 1):
+        if tokens[start:start + len(header)] == header:
+            break
+    else:
+        return None
+
+    rows = []
+    i = start + len(header)
+    while i < len(tokens):
+        # A row starts with a 2-letter buy broker and has a 2-letter sell broker 4 cells later
+        if BROKER_CODE.match(tokens[i]) and i + 7 < len(tokens) and BROKER_CODE.match(tokens[i + 4]):
+            rows.append(tokens[i:i + 8])
+            i += 8
+            continue
+        i += 1
+    return rows
@@ -0,0 +1,126 @@
+import queue
+import threading
+
+from stockbit_analyzer.ingest import ingest_day
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.store import open_store
+
+
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE_SIZE = 4
+
+_STOP = object()
+
+log = get_logger(__name__)
+
+
+class PipelineError(Exception):
+    """Raised to the producer once a worker has failed to store a day"""
+
+
+class IngestPipeline:
+    """Store extracted days on worker threads while the browser moves on to the next day
+
+    The browser loop stays the only producer: it hands each day to
+    `submit()` and goes straight back to driving the page. Workers parse,
+    validate and write the day to the store, matrix and indicators, each
+    on its own SQLite connection; `flagged` counts stored days that raised
+    quality flags. The queue is bounded, so a slow disk makes `submit()`
+    wait instead of piling days up in memory. Writes for one symbol are
+    serialized, and with one worker (the default) days are stored in the
+    order they were extracted.
+
+    Use as a context manager; leaving the block waits for queued days.
+    If a worker fails, the next `submit()` raises PipelineError and the
+    remaining queued days are dropped.
+    """
+
+    def __init__(self, store_path=None, workers=DEFAULT_WORKERS, maxsize=DEFAULT_QUEUE_SIZE):
+        self.store_path = store_path
+        self.stored = 0
+        self.skipped = 0
+        self.flagged = 0
+        self.error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"ingest-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if self.error and exc_type is None:
+            raise PipelineError(f"Storing extracted days failed: {self.error}") from self.error
+        return False
+
+    def submit(self, symbol, day_data):
+        """Queue one extracted day (a dict with 'rows' and 'date'); blocks while the queue is full"""
+        while True:
+            if self.error:
+                raise PipelineError(f"Storing extracted days failed: {self.error}") from self.error
+            try:
+                self._queue.put((symbol, day_data), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _work(self):
+        conn = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                if self.error:
+                    # Drain without storing so close() doesn't block
+                    continue
+                symbol, day_data = item
+                if not day_data or not day_data.get("rows") or not day_data.get("date"):
+                    with self._lock:
+                        self.skipped += 1
+                    continue
+                try:
+                    if conn is None:
+                        conn = open_store(self.store_path)
+                    with self._symbol_lock(symbol):
+                        flags = ingest_day(
+                            conn, symbol, day_data["date"], day_data["rows"], store_path=self.store_path,
+                            date_range=day_data.get("dateRange"), date_verified=day_data.get("dateVerified"),
+                        )
+                    with self._lock:
+                        self.stored += 1
+                        self.flagged += bool(flags)
+                    if flags:
+                        log.warning(f"Stored {symbol} {day_data['date']} flagged: {', '.join(flags)}",
+                                    extra={"symbol": symbol, "date": day_data["date"], "phase": "quality"})
+                except Exception as e:
+                    log.error(f"Failed to store {symbol} {day_data.get('date')}: {e}",
+                              extra={"symbol": symbol, "date": day_data.get("date"), "phase": "store"})
+                    with self._lock:
+                        self.error = self.error or e
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """Wait for queued days to be stored and stop the workers; returns days stored"""
+        if self._closed:
+            return self.stored
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        return self.stored
@@ -0,0 +1,224 @@
+import time
+
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.metrics import PAGE_RECYCLES
+from stockbit_analyzer.navigation import STEALTH_INIT_SCRIPT, open_symbol_page
+from stockbit_analyzer.page_helpers import install_helpers
+
+
+# Error fragments that mean the renderer or page is gone rather than a page-level failure
+CRASH_MARKERS = (
+    "target crashed",
+    "page crashed",
+    "target page, context or browser has been closed",
+    "target closed",
+    "session closed",
+)
+
+DEFAULT_MAX_NAVIGATIONS = 40
+DEFAULT_MAX_UNITS = 150
+DEFAULT_MAX_HEAP_MB = 512
+DEFAULT_CHECK_EVERY = 10
+
+log = get_logger(__name__)
+
+
+def is_crash_error(error):
+    """Whether an exception means the page must be replaced"""
+    message = str(error).lower()
+    return any(marker in message for marker in CRASH_MARKERS)
+
+
+class PooledPage:
+    """A page plus the counters used to decide when to recycle it"""
+
+    def __init__(self, page):
+        self.page = page
+        self.navigations = 0
+        self.units = 0
+        self.crashed = False
+        self.symbol = None
+        self.created = time.time()
+        self.cdp = None
+        page.on("crash", self._on_crash)
+
+    def _on_crash(self, *args):
+        self.crashed = True
+
+    def heap_mb(self):
+        """Used JS heap of the page in MB via CDP Performance.getMetrics; None if unavailable"""
+        try:
+            if self.cdp is None:
+                self.cdp = self.page.context.new_cdp_session(self.page)
+                self.cdp.send("Performance.enable")
+            metrics = self.cdp.send("Performance.getMetrics")["metrics"]
+        except Exception:
+            return None
+        for metric in metrics:
+            if metric["name"] == "JSHeapUsedSize":
+                return metric["value"] / (1024 * 1024)
+        return None
+
+
+def pool_from_config(context, page, config, size=1):
+    """PagePool adopting `page`, with thresholds from load_config()"""
+    return PagePool(
+        context,
+        pages=[page],
+        size=size,
+        max_navigations=config.get("page_max_navigations", DEFAULT_MAX_NAVIGATIONS),
+        max_units=config.get("page_max_units", DEFAULT_MAX_UNITS),
+        max_heap_mb=config.get("page_max_heap_mb", DEFAULT_MAX_HEAP_MB),
+    )
+
+
+class PagePool:
+    """Pages of one browser context, recycled after navigation/work/heap thresholds
+
+    Long batch runs drive hundreds of date-picker cycles through the same
+    renderer. The pool replaces a page once it exceeds `max_navigations`,
+    `max_units` or `max_heap_mb` (checked every `check_every` units), and
+    transparently retries a unit of work on a fresh page when the renderer
+    crashes mid-unit.
+    """
+
+    def __init__(self, context, pages=None, size=1,
+                 max_navigations=DEFAULT_MAX_NAVIGATIONS,
+                 max_units=DEFAULT_MAX_UNITS,
+                 max_heap_mb=DEFAULT_MAX_HEAP_MB,
+                 check_every=DEFAULT_CHECK_EVERY):
+        self.context = context
+        self.max_navigations = max_navigations
+        self.max_units = max_units
+        self.max_heap_mb = max_heap_mb
+        self.check_every = check_every
+        self.recycled = 0
+
+        self.slots = [PooledPage(page) for page in (pages or [])]
+        while len(self.slots) < size:
+            self.slots.append(PooledPage(self._new_page()))
+
+    @property
+    def page(self):
+        return self.slots[0].page
+
+    def _new_page(self):
+        page = self.context.new_page()
+        page.add_init_script(STEALTH_INIT_SCRIPT)
+        install_helpers(page)
+        return page
+
+    def open_symbol(self, stock_symbol, index=0):
+        """Navigate a pooled page to a symbol page, remembering it for recycling"""
+        slot = self.slots[index]
+        reason = self._needs_recycle(slot, check_heap=True)
+        if reason:
+            # About to leave the old symbol anyway, so don't re-open it on the fresh page
+            slot.symbol = None
+            slot = self.recycle(index, reason)
+        open_symbol_page(slot.page, stock_symbol)
+        slot.navigations += 1
+        slot.symbol = stock_symbol
+
+    def _needs_recycle(self, slot, check_heap=False):
+        if slot.crashed or slot.page.is_closed():
+            return "crashed"
+        if slot.navigations >= self.max_navigations:
+            return f"{slot.navigations} navigations"
+        if slot.units >= self.max_units:
+            return f"{slot.units} units of work"
+        if check_heap and self.max_heap_mb:
+            heap_mb = slot.heap_mb()
+            if heap_mb is not None and heap_mb >= self.max_heap_mb:
+                return f"JS heap {heap_mb:.0f}MB"
+        return None
+
+    def recycle(self, index=0, reason=None):
+        """Replace a page with a fresh one and return it to the symbol it was on"""
+        slot = self.slots[index]
+        log.info(f"Recycling page {index}" + (f" ({reason})" if reason else ""),
+                 extra={"phase": "recycle", "page": index, "symbol": slot.symbol})
+        try:
+            if not slot.page.is_closed():
+                slot.page.close()
+        except Exception:
+            pass
+
+        fresh = PooledPage(self._new_page())
+        self.slots[index] = fresh
+        self.recycled += 1
+        PAGE_RECYCLES.inc()
+        if slot.symbol:
+            open_symbol_page(fresh.page, slot.symbol)
+            fresh.navigations += 1
+            fresh.symbol = slot.symbol
+        return fresh
+
+    def run(self, unit, index=0, retries=1):
+        """Run `unit(page)` on a pooled page; recycle and retry it if the renderer crashes"""
+        slot = self.slots[index]
+        check_heap = self.check_every and slot.units and slot.units % self.check_every == 0
+        reason = self._needs_recycle(slot, check_heap=check_heap)
+        if reason:
+            slot = self.recycle(index, reason)
+
+        for attempt in range(retries + 1):
+            try:
+                result = unit(slot.page)
+                # Helpers swallow page errors and return None; the crash event tells us why
+                if not (slot.crashed or slot.page.is_closed()):
+                    slot.units += 1
+                    return result
+                error = Exception("Target crashed")
+            except Exception as e:
+                if not is_crash_error(e) and not slot.crashed:
+                    raise
+                error = e
+
+            if attempt < retries:
+                slot = self.recycle(index, f"crash: {error}")
+            else:
+                raise error
+
+    def ensure_size(self, size):
+        """Grow the pool to at least `size` pages"""
+        while len(self.slots) < size:
+            self.slots.append(PooledPage(self._new_page()))
+
+    def run_steps(self, make_steps, index=0, retries=1):
+        """Step generator version of run(): delegates to `make_steps(page)`, passing its waits through
+
+        Lets one thread interleave units of work on several pooled pages;
+        a crashed unit is recycled and restarted like in run().
+        """
+        slot = self.slots[index]
+        check_heap = self.check_every and slot.units and slot.units % self.check_every == 0
+        reason = self._needs_recycle(slot, check_heap=check_heap)
+        if reason:
+            slot = self.recycle(index, reason)
+
+        for attempt in range(retries + 1):
+            try:
+                result = yield from make_steps(slot.page)
+                if not (slot.crashed or slot.page.is_closed()):
+                    slot.units += 1
+                    return result
+                error = Exception("Target crashed")
+            except Exception as e:
+                if not is_crash_error(e) and not slot.crashed:
+                    raise
+                error = e
+
+            if attempt < retries:
+                slot = self.recycle(index, f"crash: {error}")
+            else:
+                raise error
+
+    def close(self):
+        """Close every page the pool opened"""
+        for slot in self.slots:
+            try:
+                if not slot.page.is_closed():
+                    slot.page.close()
+            except Exception:
+                pass
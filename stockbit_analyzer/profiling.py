@@ -0,0 +1,192 @@
+import base64
+import contextlib
+import cProfile
+import json
+import os
+import time
+from pathlib import Path
+
+from stockbit_analyzer.logs import get_logger
+
+
+# Chrome trace categories: page JS, forced layout/style, user timing marks and V8 samples
+TRACE_CATEGORIES = (
+    "toplevel",
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "disabled-by-default-devtools.timeline.frame",
+    "blink.user_timing",
+    "blink.console",
+    "loading",
+    "latencyInfo",
+    "v8.execute",
+    "disabled-by-default-v8.cpu_profiler",
+)
+
+CHROME_TRACE_FILE = "chrome_trace.json"
+PYTHON_PROFILE_FILE = "python.prof"
+PHASES_FILE = "phases_trace.json"
+
+# Marks are named like "banmo:<phase>" so they group in the DevTools Timings track
+MARK_PREFIX = "banmo:"
+
+log = get_logger(__name__)
+
+_active = None
+
+
+class Profiler:
+    """Chrome DevTools trace of a page plus a cProfile of this process, with phase markers
+
+    Writes to `out_dir`:
+    - chrome_trace.json: CDP Tracing output; open in the DevTools Performance
+      panel or ui.perfetto.dev. Each phase shows as a `banmo:<phase>`
+      measure in the Timings track.
+    - python.prof: cProfile stats of the driving thread; open with
+      `python -m pstats` or snakeviz.
+    - phases_trace.json: the same phases as seen from Python, in the Chrome
+      trace event format, one track per page.
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.page = None
+        self._cdp = None
+        self._stream = None
+        self._profile = None
+        self._events = []
+        self._tracks = {}
+        self._origin = time.perf_counter()
+
+    def start(self, page):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.page = page
+        try:
+            self._cdp = page.context.new_cdp_session(page)
+            self._cdp.on("Tracing.tracingComplete", self._on_complete)
+            self._cdp.send("Tracing.start", {
+                "transferMode": "ReturnAsStream",
+                "traceConfig": {"includedCategories": list(TRACE_CATEGORIES), "recordMode": "recordContinuously"},
+            })
+        except Exception as e:
+            log.warning(f"Chrome tracing unavailable, profiling Python only: {e}", extra={"phase": "profile"})
+            self._cdp = None
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        log.info(f"Profiling to {self.out_dir}", extra={"phase": "profile"})
+
+    def _on_complete(self, event):
+        self._stream = event.get("stream") or ""
+
+    def begin(self, page, phase):
+        """Open a phase span; pass the result to end()"""
+        track = self._tracks.setdefault(id(page), len(self._tracks))
+        if page is not None:
+            try:
+                page.evaluate("name => performance.mark(name + ':start')", MARK_PREFIX + phase)
+            except Exception:
+                pass
+        return (page, phase, track, time.perf_counter())
+
+    def end(self, span, **args):
+        page, phase, track, started = span
+        finished = time.perf_counter()
+        self._events.append({
+            "name": phase,
+            "ph": "X",
+            "ts": (started - self._origin) * 1e6,
+            "dur": (finished - started) * 1e6,
+            "pid": os.getpid(),
+            "tid": track,
+            "args": {key: str(value) for key, value in args.items()},
+        })
+        if page is not None:
+            try:
+                page.evaluate(
+                    "name => performance.measure(name, name + ':start')", MARK_PREFIX + phase
+                )
+            except Exception:
+                pass
+
+    def stop(self):
+        """Stop both profilers and write their files; returns the paths written"""
+        written = []
+        if self._profile:
+            self._profile.disable()
+            path = self.out_dir / PYTHON_PROFILE_FILE
+            self._profile.dump_stats(str(path))
+            written.append(path)
+
+        path = self.out_dir / PHASES_FILE
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": track, "args": {"name": f"page {track}"}}
+            for track in self._tracks.values()
+        ]
+        path.write_text(json.dumps({"traceEvents": metadata + self._events}), encoding="utf-8")
+        written.append(path)
+
+        if self._cdp:
+            try:
+                written.append(self._save_chrome_trace())
+            except Exception as e:
+                log.warning(f"Could not save Chrome trace: {e}", extra={"phase": "profile"})
+        for path in written:
+            log.info(f"Profile written to {path}", extra={"phase": "profile"})
+        return written
+
+    def _save_chrome_trace(self, timeout=60):
+        self._cdp.send("Tracing.end")
+        deadline = time.monotonic() + timeout
+        # Sync Playwright only dispatches CDP events while it is called into
+        while self._stream is None and time.monotonic() < deadline:
+            self.page.wait_for_timeout(100)
+        if not self._stream:
+            raise TimeoutError("Tracing.tracingComplete never arrived")
+
+        path = self.out_dir / CHROME_TRACE_FILE
+        with open(path, "wb") as out:
+            while True:
+                chunk = self._cdp.send("IO.read", {"handle": self._stream, "size": 1 << 20})
+                data = chunk.get("data", "")
+                out.write(base64.b64decode(data) if chunk.get("base64Encoded") else data.encode("utf-8"))
+                if chunk.get("eof"):
+                    break
+        self._cdp.send("IO.close", {"handle": self._stream})
+        return path
+
+
+@contextlib.contextmanager
+def profiled(page, out_dir):
+    """Profile the block when `out_dir` is set (see Profiler); otherwise do nothing"""
+    global _active
+    if not out_dir:
+        yield None
+        return
+    profiler = Profiler(out_dir)
+    profiler.start(page)
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.stop()
+
+
+def begin_phase(page, phase):
+    """Mark the start of a phase on the active profiler; None when not profiling"""
+    return _active.begin(page, phase) if _active else None
+
+
+def end_phase(span, **args):
+    if span and _active:
+        _active.end(span, **args)
+
+
+@contextlib.contextmanager
+def phase(page, name, **args):
+    """Span a phase in the active profile (no-op when not profiling)"""
+    span = begin_phase(page, name)
+    try:
+        yield
+    finally:
+        end_phase(span, **args)
@@ -0,0 +1,195 @@
+import hashlib
+import math
+import statistics
+from datetime import datetime
+
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import BUY, list_dates
+
+
+DATE_MISMATCH = "date_mismatch"
+NO_DATE_RANGE = "no_date_range"
+PICKER_MISMATCH = "picker_mismatch"
+UNBALANCED_TOTALS = "unbalanced_totals"
+FEW_ROWS = "few_rows"
+SAME_AS_PREVIOUS = "same_as_previous"
+
+# Flags only the extraction can see; re-checking stored rows keeps them
+EXTRACTION_FLAGS = (DATE_MISMATCH, NO_DATE_RANGE, PICKER_MISMATCH)
+
+# Every lot bought is a lot sold, but the totals add up abbreviated cells ('1.2B')
+TOTALS_TOLERANCE = 0.05
+
+# Fewer side rows than this (or than MIN_ROW_RATIO of the recent median) looks half-rendered
+MIN_SIDE_ROWS = 4
+MIN_ROW_RATIO = 0.5
+ROW_HISTORY_DAYS = 20
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _cell(value):
+    return "" if _missing(value) else repr(float(value))
+
+
+def content_hash(side_rows):
+    """Order-independent hash of (side, broker, value, lot, avg) rows"""
+    lines = sorted(
+        f"{side}|{broker}|{_cell(value)}|{_cell(lot)}|{_cell(avg)}"
+        for side, broker, value, lot, avg in side_rows
+    )
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def totals_balanced(side_rows, tolerance=TOTALS_TOLERANCE):
+    """Whether buy and sell value and lot totals agree within `tolerance`"""
+    totals = {"value": [0.0, 0.0], "lot": [0.0, 0.0]}
+    for side, _, value, lot, _ in side_rows:
+        index = 0 if side == BUY else 1
+        totals["value"][index] += 0.0 if _missing(value) else value
+        totals["lot"][index] += 0.0 if _missing(lot) else lot
+    for buy, sell in totals.values():
+        if abs(buy - sell) > tolerance * max(abs(buy), abs(sell)):
+            return False
+    return True
+
+
+def date_range_matches(date_range, iso_date):
+    """Whether the picker range shown with the table is exactly `iso_date`"""
+    try:
+        return to_iso_date(date_range["start"]) == iso_date and to_iso_date(date_range["end"]) == iso_date
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def day_flags(side_rows, iso_date, date_range=None, date_verified=None, previous_hash=None, median_rows=None):
+    """Quality flags of one day's (side, broker, value, lot, avg) rows; empty when it looks right
+
+    `date_range` is the range shown with the table and `date_verified` what
+    set_single_date_range reported (None when no range was set); both are
+    skipped when re-checking stored rows. `previous_hash` is the content
+    hash of the previous stored day and `median_rows` its recent row count.
+    """
+    flags = []
+    if date_verified is False:
+        flags.append(PICKER_MISMATCH)
+    if date_verified is not None:
+        if not date_range:
+            flags.append(NO_DATE_RANGE)
+        elif not date_range_matches(date_range, iso_date):
+            flags.append(DATE_MISMATCH)
+    if not totals_balanced(side_rows):
+        flags.append(UNBALANCED_TOTALS)
+    if len(side_rows) < max(MIN_SIDE_ROWS, MIN_ROW_RATIO * (median_rows or 0)):
+        flags.append(FEW_ROWS)
+    if previous_hash and content_hash(side_rows) == previous_hash:
+        flags.append(SAME_AS_PREVIOUS)
+    return flags
+
+
+def stored_side_rows(conn, symbol, iso_date):
+    """(side, broker, value, lot, avg) rows stored for one symbol and day"""
+    return conn.execute(
+        "SELECT side, broker, value, lot, avg FROM broker_rows WHERE symbol = ? AND date = ? ORDER BY side, rank",
+        (symbol, iso_date),
+    ).fetchall()
+
+
+def previous_day(conn, symbol, iso_date):
+    return conn.execute(
+        "SELECT MAX(date) FROM broker_rows WHERE symbol = ? AND date < ?", (symbol, iso_date)
+    ).fetchone()[0]
+
+
+def median_row_count(conn, symbol, iso_date, days=ROW_HISTORY_DAYS):
+    """Median side-row count of the symbol's `days` stored days before `iso_date`; None without history"""
+    counts = [
+        row[0] for row in conn.execute(
+            "SELECT COUNT(*) FROM broker_rows WHERE symbol = ? AND date < ? GROUP BY date ORDER BY date DESC LIMIT ?",
+            (symbol, iso_date, days),
+        )
+    ]
+    return statistics.median(counts) if counts else None
+
+
+def validate_day(conn, symbol, date, side_rows, date_range=None, date_verified=None):
+    """Check a day against the store before it is saved; returns {'flags', 'content_hash', 'row_count'}"""
+    iso_date = to_iso_date(date)
+    previous = previous_day(conn, symbol, iso_date)
+    previous_hash = content_hash(stored_side_rows(conn, symbol, previous)) if previous else None
+    return {
+        "flags": day_flags(
+            side_rows, iso_date, date_range=date_range, date_verified=date_verified,
+            previous_hash=previous_hash, median_rows=median_row_count(conn, symbol, iso_date),
+        ),
+        "content_hash": content_hash(side_rows),
+        "row_count": len(side_rows),
+    }
+
+
+def save_quality(conn, symbol, date, quality):
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO day_quality (symbol, date, flags, content_hash, row_count, checked) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                symbol, to_iso_date(date), ",".join(quality["flags"]), quality["content_hash"],
+                quality["row_count"], datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+
+
+def recheck_symbol(conn, symbol):
+    """Re-validate every stored day of a symbol from its rows; returns the number of flagged days
+
+    Date checks need the live page, so flags recorded at extraction time
+    are kept; days stored before validation existed get a record too.
+    """
+    recorded = {
+        date: flags.split(",") if flags else []
+        for date, flags in conn.execute("SELECT date, flags FROM day_quality WHERE symbol = ?", (symbol,))
+    }
+    flagged = 0
+    previous_hash = None
+    history = []
+    for iso_date in list_dates(conn, symbol):
+        side_rows = stored_side_rows(conn, symbol, iso_date)
+        median_rows = statistics.median(history[-ROW_HISTORY_DAYS:]) if history else None
+        flags = [flag for flag in recorded.get(iso_date, []) if flag in EXTRACTION_FLAGS]
+        flags += day_flags(side_rows, iso_date, previous_hash=previous_hash, median_rows=median_rows)
+        previous_hash = content_hash(side_rows)
+        history.append(len(side_rows))
+        save_quality(conn, symbol, iso_date, {"flags": flags, "content_hash": previous_hash, "row_count": len(side_rows)})
+        flagged += bool(flags)
+    return flagged
+
+
+def flagged_days(conn, symbol=None, start=None, end=None):
+    """(symbol, date, flags) of stored days whose last check raised flags, oldest first"""
+    query = "SELECT symbol, date, flags FROM day_quality WHERE flags != ''"
+    params = []
+    if symbol:
+        query += " AND symbol = ?"
+        params.append(symbol)
+    if start:
+        query += " AND date >= ?"
+        params.append(to_iso_date(start))
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    query += " ORDER BY symbol, date"
+    return [(symbol, date, flags.split(",")) for symbol, date, flags in conn.execute(query, params)]
+
+
+def format_flagged_days(days):
+    """Format flagged_days results as a table"""
+    if not days:
+        return "✅ No flagged days"
+
+    lines = [f"{'Symbol':<8} {'Date':<10}  Flags", "-" * 60]
+    for symbol, date, flags in days:
+        lines.append(f"{symbol:<8} {date:<10}  {', '.join(flags)}")
+    lines.append(f"\n{len(days)} flagged day(s); re-fetch them with `repair --stock <SYMBOL>`")
+    return "\n".join(lines)
@@ -0,0 +1,213 @@
+import threading
+from collections import OrderedDict
+
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import open_store_readonly
+
+
+DEFAULT_CACHE_SIZE = 256
+
+QUERY_KINDS = ("summary", "series", "top")
+
+BROKER_TOTALS_SQL = """
+    SELECT broker, SUM(net_value) AS net_value, SUM(net_lot), SUM(buy_value), SUM(sell_value), COUNT(*)
+    FROM broker_activity
+    WHERE symbol = ? AND date >= ? AND date <= ?
+    GROUP BY broker
+"""
+
+
+def latest_date(conn, symbol, end=None):
+    """The most recent indexed date of a symbol up to `end`; None when nothing is stored"""
+    query = "SELECT MAX(date) FROM broker_activity WHERE symbol = ?"
+    params = [symbol]
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    return conn.execute(query, params).fetchone()[0]
+
+
+def query_window(conn, symbol, start=None, end=None):
+    """ISO (start, end) of a query, clipped to stored days; start defaults to the latest one"""
+    last = latest_date(conn, symbol, end=end)
+    if not last:
+        return None, None
+    return (to_iso_date(start) if start else last), last
+
+
+def _broker_totals(rows, start, end):
+    return [
+        {
+            "broker": broker,
+            "net_value": net_value,
+            "net_lot": net_lot,
+            "buy_value": buy_value,
+            "sell_value": sell_value,
+            "days": days,
+            "start": start,
+            "end": end,
+        }
+        for broker, net_value, net_lot, buy_value, sell_value, days in rows
+    ]
+
+
+def broker_summary(conn, symbol, start=None, end=None):
+    """Per-broker buy, sell and net totals of a symbol over [start, end], largest net buyer first
+
+    Without `start` this is the broker summary of the latest stored day (up
+    to `end`); pass the same date as start and end for one given day.
+    """
+    start, end = query_window(conn, symbol, start, end)
+    if not start or start > end:
+        return []
+    rows = conn.execute(
+        BROKER_TOTALS_SQL + " ORDER BY net_value DESC, broker", (symbol, start, end)
+    ).fetchall()
+    return _broker_totals(rows, start, end)
+
+
+def top_brokers(conn, symbol, start=None, end=None, limit=10, net_sell=False):
+    """The `limit` brokers that net-bought (or net-sold) a symbol most over [start, end]"""
+    start, end = query_window(conn, symbol, start, end)
+    if not start or start > end:
+        return []
+    rows = conn.execute(
+        BROKER_TOTALS_SQL
+        + f" HAVING SUM(net_value) {'<' if net_sell else '>'} 0"
+        + f" ORDER BY net_value {'ASC' if net_sell else 'DESC'}, broker LIMIT ?",
+        (symbol, start, end, limit),
+    ).fetchall()
+    return _broker_totals(rows, start, end)
+
+
+def broker_series(conn, symbol, broker, start=None, end=None):
+    """One broker's daily activity on a symbol, oldest first"""
+    query = """
+        SELECT date, net_value, net_lot, buy_value, sell_value
+        FROM broker_activity
+        WHERE broker = ? AND symbol = ?
+    """
+    params = [broker, symbol]
+    if start:
+        query += " AND date >= ?"
+        params.append(to_iso_date(start))
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    query += " ORDER BY date"
+    return [
+        {
+            "date": date,
+            "net_value": net_value,
+            "net_lot": net_lot,
+            "buy_value": buy_value,
+            "sell_value": sell_value,
+        }
+        for date, net_value, net_lot, buy_value, sell_value in conn.execute(query, params)
+    ]
+
+
+class StoreQuery:
+    """Read-only store connection that keeps recent query results in an LRU cache
+
+    Meant for long-lived processes (the daemon, notebooks, dashboards) that
+    ask the same questions repeatedly. The cache is dropped as soon as any
+    other connection commits to the store, detected through SQLite's
+    data_version, so results are never staler than the last stored day.
+    Results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, path=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.conn = open_store_readonly(path)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _cached(self, func, *args):
+        key = (func.__name__,) + args
+        with self._lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+
+            self.misses += 1
+            result = func(self.conn, *args)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def summary(self, symbol, start=None, end=None):
+        return self._cached(broker_summary, symbol, start, end)
+
+    def series(self, symbol, broker, start=None, end=None):
+        return self._cached(broker_series, symbol, broker, start, end)
+
+    def top(self, symbol, start=None, end=None, limit=10, net_sell=False):
+        return self._cached(top_brokers, symbol, start, end, limit, net_sell)
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_broker_totals(symbol, results):
+    """Format broker_summary / top_brokers results as a table"""
+    if not results:
+        return f"No stored activity for {symbol}"
+
+    start, end = results[0]["start"], results[0]["end"]
+    period = start if start == end else f"{start} to {end}"
+    lines = [
+        f"📅 {symbol} brokers, {period}",
+        "",
+        f"{'Broker':<7} {'Net val':>18} {'Net lot':>14} {'B.val':>18} {'S.val':>18} {'Days':>5}",
+        "-" * 85,
+    ]
+    for result in results:
+        lines.append(
+            f"{result['broker']:<7} "
+            f"{result['net_value']:>18,.0f} "
+            f"{result['net_lot']:>14,.0f} "
+            f"{result['buy_value']:>18,.0f} "
+            f"{result['sell_value']:>18,.0f} "
+            f"{result['days']:>5}"
+        )
+    return "\n".join(lines)
+
+
+def format_broker_series(symbol, broker, results):
+    """Format broker_series results as a table"""
+    if not results:
+        return f"No stored activity for broker {broker} on {symbol}"
+
+    lines = [
+        f"📅 {broker} on {symbol}",
+        "",
+        f"{'Date':<10} {'Net val':>18} {'Net lot':>14} {'B.val':>18} {'S.val':>18}",
+        "-" * 82,
+    ]
+    for result in results:
+        lines.append(
+            f"{result['date']:<10} "
+            f"{result['net_value']:>18,.0f} "
+            f"{result['net_lot']:>14,.0f} "
+            f"{result['buy_value']:>18,.0f} "
+            f"{result['sell_value']:>18,.0f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.metrics import RETRIES
+
+
+# Error classes used to decide whether (and how) to retry
+TIMEOUT = "timeout"
+CLOSED_TARGET = "closed_target"
+MISSING_SELECTOR = "missing_selector"
+PROFILE_LOCKED = "profile_locked"
+NAVIGATION = "navigation"
+OTHER = "other"
+
+log = get_logger(__name__)
+
+ERROR_MARKERS = (
+    (PROFILE_LOCKED, ("already in use", "processsingleton", "profile appears to be in use")),
+    (CLOSED_TARGET, ("target page, context or browser has been closed", "target closed",
+                     "target crashed", "page crashed", "browser has been closed")),
+    (TIMEOUT, ("timeout", "timed out")),
+    (MISSING_SELECTOR, ("not found", "no element", "waiting for selector", "could not find")),
+    (NAVIGATION, ("net::err", "navigation", "landed on")),
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of running a phase whose circuit breaker is open"""
+
+
+class RetryableError(Exception):
+    """An outcome that should be retried even though nothing raised (e.g. wrong page)"""
+
+
+def classify_error(error):
+    """Map an exception to TIMEOUT, CLOSED_TARGET, MISSING_SELECTOR, PROFILE_LOCKED, NAVIGATION or OTHER"""
+    if type(error).__name__ == "TimeoutError":
+        return TIMEOUT
+    message = str(error).lower()
+    for error_class, markers in ERROR_MARKERS:
+        if any(marker in message for marker in markers):
+            return error_class
+    return OTHER
+
+
+class RetryBudget:
+    """Token bucket capping the retries spent across a run
+
+    Holds up to `max_retries` retries; one is given back every
+    `refill_every` seconds, so long-running processes (serve, watch)
+    recover from a bad stretch instead of never retrying again.
+    """
+
+    def __init__(self, max_retries=200, refill_every=15.0):
+        self.max_retries = max_retries
+        self.refill_every = refill_every
+        self.spent = 0
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        if not self.refill_every:
+            return
+        now = time.monotonic()
+        refills = int((now - self._refilled_at) / self.refill_every)
+        if refills:
+            self.spent = max(0, self.spent - refills)
+            self._refilled_at = now if self.spent == 0 else self._refilled_at + refills * self.refill_every
+
+    def consume(self):
+        with self._lock:
+            self._refill()
+            if self.max_retries is not None and self.spent >= self.max_retries:
+                return False
+            self.spent += 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self.spent = 0
+            self._refilled_at = time.monotonic()
+
+
+class CircuitBreaker:
+    """Per-(key, phase) breaker that opens after consecutive failures
+
+    While open, `allow()` is False, so callers skip the phase for that key
+    (typically a symbol). After `reset_after` seconds one trial call is let
+    through; success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=300):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = {}
+        self._opened_at = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key, phase):
+        with self._lock:
+            opened_at = self._opened_at.get((key, phase))
+            if opened_at is None:
+                return True
+            if time.time() - opened_at >= self.reset_after:
+                # Half-open: allow one trial and restart the timer
+                self._opened_at[(key, phase)] = time.time()
+                return True
+            return False
+
+    def check(self, key, phase):
+        if not self.allow(key, phase):
+            raise CircuitOpenError(f"Circuit open for {key} during {phase}; skipping")
+
+    def record_success(self, key, phase):
+        with self._lock:
+            self._failures.pop((key, phase), None)
+            self._opened_at.pop((key, phase), None)
+
+    def record_failure(self, key, phase):
+        with self._lock:
+            failures = self._failures.get((key, phase), 0) + 1
+            self._failures[(key, phase)] = failures
+            if failures >= self.failure_threshold:
+                if (key, phase) not in self._opened_at:
+                    log.error(f"Circuit opened for {key} during {phase} after {failures} consecutive failures",
+                              extra={"symbol": key, "phase": phase})
+                self._opened_at[(key, phase)] = time.time()
+
+    def is_open(self, key, phase):
+        """Whether the breaker is open and not yet due for a trial; unlike allow() it changes nothing"""
+        with self._lock:
+            opened_at = self._opened_at.get((key, phase))
+            return opened_at is not None and time.time() - opened_at < self.reset_after
+
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, limited by attempts and a shared retry budget"""
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=15.0, multiplier=2.0,
+                 jitter=True, retry_on=(TIMEOUT, CLOSED_TARGET, MISSING_SELECTOR, PROFILE_LOCKED, NAVIGATION, OTHER),
+                 budget=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_on = set(retry_on)
+        self.budget = budget
+
+    def with_attempts(self, max_attempts):
+        """Copy of this policy with a different attempt limit (sharing the budget)"""
+        return RetryPolicy(
+            max_attempts=max_attempts, base_delay=self.base_delay, max_delay=self.max_delay,
+            multiplier=self.multiplier, jitter=self.jitter, retry_on=self.retry_on, budget=self.budget,
+        )
+
+    def delay(self, attempt):
+        """Backoff before retry number `attempt` (1-based)"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+    def _may_retry(self, attempt, error_class):
+        if attempt >= self.max_attempts or error_class not in self.retry_on:
+            return False
+        if self.budget is not None and not self.budget.consume():
+            log.warning("Retry budget exhausted; not retrying")
+            return False
+        return True
+
+    def call(self, fn, *args, key=None, phase=None, breaker=None, on_retry=None, **kwargs):
+        """Call `fn` with retries; records outcomes on `breaker` under (key, phase)"""
+        if breaker is not None:
+            breaker.check(key, phase)
+
+        attempt = 1
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                error_class = classify_error(e)
+                if not self._may_retry(attempt, error_class):
+                    if breaker is not None:
+                        breaker.record_failure(key, phase)
+                    raise
+                delay = self.delay(attempt)
+                label = f"{phase} " if phase else ""
+                log.warning(f"Retrying {label}after {error_class} error (attempt {attempt + 1}/{self.max_attempts}, "
+                            f"waiting {delay:.1f}s): {e}",
+                            extra={"symbol": key, "phase": phase, "attempt": attempt + 1, "error_class": error_class})
+                RETRIES.inc(phase=phase or "", error_class=error_class)
+                if on_retry:
+                    on_retry(e, error_class)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if breaker is not None:
+                breaker.record_success(key, phase)
+            return result
+
+
+# Shared across a process so one run's retries draw from the same budget;
+# reset_run_state() starts each run afresh, daemon jobs only refill the budget
+DEFAULT_BUDGET = RetryBudget()
+DEFAULT_POLICY = RetryPolicy(budget=DEFAULT_BUDGET)
+BREAKER = CircuitBreaker()
+
+# Date-picker verification has its own attempt count and doesn't spend the run's budget
+DATE_VERIFY_POLICY = RetryPolicy(max_attempts=3)
+
+# Browser launches only retry when the profile is held by another process
+LAUNCH_POLICY = RetryPolicy(max_attempts=3, base_delay=2.0, retry_on=(PROFILE_LOCKED, CLOSED_TARGET), budget=DEFAULT_BUDGET)
+
+
+def reset_run_state():
+    """Refill the shared retry budget and close every circuit breaker, e.g. before a one-off run"""
+    DEFAULT_BUDGET.reset()
+    BREAKER.reset()
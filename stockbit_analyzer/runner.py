@@ -1,10 +1,35 @@
+import json
 import os
+import subprocess
 import time
 import random
+import sys
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from stockbit_analyzer.artifacts import capture_failure, get_artifact_root
+from stockbit_analyzer.page_helpers import (
+    call_helper, date_target, extract_summary_data, install_helpers, locate_broker_summary, rows_from_cells,
+)
+from stockbit_analyzer.logs import configure_logging, get_logger, timed
+from stockbit_analyzer.metrics import DATE_PICKS, EXTRACTIONS, PHASE_SECONDS, REGISTRY, ROWS_EXTRACTED
+from stockbit_analyzer.navigation import STEALTH_INIT_SCRIPT, navigate_with_retry, open_symbol_page
+from stockbit_analyzer.pipeline import IngestPipeline
+from stockbit_analyzer.pool import pool_from_config
+from stockbit_analyzer import profiling
+from stockbit_analyzer.retry import (
+    BREAKER, DATE_VERIFY_POLICY, LAUNCH_POLICY, reset_run_state,
+)
+from stockbit_analyzer.summary import day_record, format_broker_summary_table
+
+
+log = get_logger(__name__)
+
+# Output formats of main(): formatted tables, or one JSON line per extracted day
+OUTPUT_FORMATS = ("text", "ndjson")
+
 
 
 def load_config():
@@ -14,314 +39,119 @@ def load_config():
         "username": os.getenv("STOCKBIT_USERNAME", ""),
         "password": os.getenv("STOCKBIT_PASSWORD", ""),
         "headless": os.getenv("HEADLESS_MODE", "false").lower() == "true",
+        "cdp_url": os.getenv("STOCKBIT_CDP_URL", ""),
+        "raw_dir": os.getenv("STOCKBIT_RAW_DIR", ""),
+        "artifact_dir": os.getenv("STOCKBIT_ARTIFACT_DIR", ""),
+        "metrics_file": os.getenv("STOCKBIT_METRICS_FILE", ""),
+        "page_max_navigations": int(os.getenv("STOCKBIT_PAGE_MAX_NAVIGATIONS", "40")),
+        "page_max_units": int(os.getenv("STOCKBIT_PAGE_MAX_UNITS", "150")),
+        "page_max_heap_mb": int(os.getenv("STOCKBIT_PAGE_MAX_HEAP_MB", "512")),
     }
 
 
+def attach_browser(playwright, cdp_url):
+    """Attach to an already-running Chromium over CDP and open a page in its existing context
+
+    The shared browser keeps its profile and login cookies; this run only
+    owns the new page, so several short-lived jobs can share one browser.
+    """
+    log.info(f"Attaching to running browser at {cdp_url}", extra={"phase": "launch", "url": cdp_url})
+    browser = playwright.chromium.connect_over_cdp(cdp_url)
+    context = browser.contexts[0] if browser.contexts else browser.new_context(
+        viewport={"width": 1920, "height": 1080},
+        ignore_https_errors=True,
+    )
+    context.set_default_timeout(60000)
+    context.set_default_navigation_timeout(60000)
+    
+    page = context.new_page()
+    page.add_init_script(STEALTH_INIT_SCRIPT)
+    install_helpers(page)
+    return context, page
+
+
+def close_browser(context, page):
+    """Close what this run owns: its page on a shared CDP browser, otherwise the whole context"""
+    if context.browser is not None:
+        # Attached over CDP: leave the shared browser and its context running
+        page.close()
+    else:
+        context.close()
+
+
 def setup_browser(playwright, config, manual_login=False):
-    """Initialize and configure browser with persistent context"""
+    """Initialize and configure browser with persistent context, or attach to one over CDP"""
+    if config.get("cdp_url"):
+        return attach_browser(playwright, config["cdp_url"])
+    
     user_data_dir = Path.home() / ".stockbit_browser_profile"
     user_data_dir.mkdir(exist_ok=True)
     
     headless_mode = config["headless"] and not manual_login
     
-    # Try to launch persistent context, with retry logic for locked profiles
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            context = playwright.chromium.launch_persistent_context(
-                user_data_dir=str(user_data_dir),
-                headless=headless_mode,
-                viewport={"width": 1920, "height": 1080},
-                ignore_https_errors=True,
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-dev-shm-usage",
-                    "--disable-web-security",
-                    "--disable-features=IsolateOrigins,site-per-process",
-                    "--disable-infobars",
-                    "--disable-save-password-bubble",
-                    "--disable-single-click-autofill",
-                    "--disable-translate",
-                    "--disable-component-extensions-with-background-pages",
-                    "--disable-default-apps",
-                    "--disable-extensions-file-access-check",
-                    "--disable-extensions-http-throttling",
-                    "--disable-ipc-flooding-protection",
-                    "--no-first-run",
-                    "--no-default-browser-check",
-                    "--no-pings",
-                    "--password-store=basic",
-                    "--use-mock-keychain",
-                    "--enable-automation=false",
-                    "--exclude-switches=enable-automation",
-                    "--disable-background-timer-throttling",
-                    "--disable-backgrounding-occluded-windows",
-                    "--disable-renderer-backgrounding",
-                    "--disable-features=TranslateUI",
-                    "--disable-features=BlinkGenPropertyTrees",
-                ],
-                extra_http_headers={
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-User": "?1",
-                    "Cache-Control": "max-age=0",
-                }
-            )
-            break
-        except Exception as e:
-            if attempt < max_retries - 1:
-                error_msg = str(e)
-                if "Target page, context or browser has been closed" in error_msg or "already in use" in error_msg.lower():
-                    print(f"Browser profile is locked (attempt {attempt + 1}/{max_retries}). Waiting 2 seconds...")
-                    time.sleep(2)
-                    # Try to kill any existing browser processes using this profile
-                    import subprocess
-                    try:
-                        subprocess.run(["pkill", "-f", "stockbit_browser_profile"], check=False)
-                        time.sleep(1)
-                    except:
-                        pass
-                    continue
-                else:
-                    raise
-            else:
-                raise
+    def launch():
+        return playwright.chromium.launch_persistent_context(
+            user_data_dir=str(user_data_dir),
+            headless=headless_mode,
+            viewport={"width": 1920, "height": 1080},
+            ignore_https_errors=True,
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                "--disable-dev-shm-usage",
+                "--disable-web-security",
+                "--disable-features=IsolateOrigins,site-per-process",
+                "--disable-infobars",
+                "--disable-save-password-bubble",
+                "--disable-single-click-autofill",
+                "--disable-translate",
+                "--disable-component-extensions-with-background-pages",
+                "--disable-default-apps",
+                "--disable-extensions-file-access-check",
+                "--disable-extensions-http-throttling",
+                "--disable-ipc-flooding-protection",
+                "--no-first-run",
+                "--no-default-browser-check",
+                "--no-pings",
+                "--password-store=basic",
+                "--use-mock-keychain",
+                "--enable-automation=false",
+                "--exclude-switches=enable-automation",
+                "--disable-background-timer-throttling",
+                "--disable-backgrounding-occluded-windows",
+                "--disable-renderer-backgrounding",
+                "--disable-features=TranslateUI",
+                "--disable-features=BlinkGenPropertyTrees",
+            ],
+            extra_http_headers={
+                "Accept-Language": "en-US,en;q=0.9",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+                "Accept-Encoding": "gzip, deflate, br",
+                "Connection": "keep-alive",
+                "Upgrade-Insecure-Requests": "1",
+                "Sec-Fetch-Dest": "document",
+                "Sec-Fetch-Mode": "navigate",
+                "Sec-Fetch-Site": "none",
+                "Sec-Fetch-User": "?1",
+                "Cache-Control": "max-age=0",
+            }
+        )
+
+    def release_profile(error, error_class):
+        # Try to kill any existing browser processes using this profile
+        log.warning("Browser profile is locked; killing stale browser processes", extra={"phase": "launch"})
+        subprocess.run(["pkill", "-f", "stockbit_browser_profile"], check=False)
+    
+    # Try to launch persistent context, retrying with backoff for locked profiles
+    context = LAUNCH_POLICY.call(launch, phase="launch", on_retry=release_profile)
     
     context.set_default_timeout(60000)
     context.set_default_navigation_timeout(60000)
     
     page = context.pages[0] if context.pages else context.new_page()
     
-    # Enhanced stealth scripts for reCAPTCHA v3 bypass
-    page.add_init_script("""
-        // Remove webdriver property
-        Object.defineProperty(navigator, 'webdriver', {
-            get: () => undefined
-        });
-        
-        // Override plugins with realistic data
-        Object.defineProperty(navigator, 'plugins', {
-            get: () => {
-                const plugins = [
-                    {
-                        0: {type: "application/x-google-chrome-pdf", suffixes: "pdf", description: "Portable Document Format"},
-                        description: "Portable Document Format",
-                        filename: "internal-pdf-viewer",
-                        length: 1,
-                        name: "Chrome PDF Plugin"
-                    },
-                    {
-                        0: {type: "application/pdf", suffixes: "pdf", description: ""},
-                        description: "",
-                        filename: "mhjfbmdgcfjbbpaeojofohoefgiehjai",
-                        length: 1,
-                        name: "Chrome PDF Viewer"
-                    },
-                    {
-                        0: {type: "application/x-nacl", suffixes: "", description: "Native Client Executable"},
-                        1: {type: "application/x-pnacl", suffixes: "", description: "Portable Native Client Executable"},
-                        description: "",
-                        filename: "internal-nacl-plugin",
-                        length: 2,
-                        name: "Native Client"
-                    }
-                ];
-                plugins.item = function(index) { return this[index]; };
-                plugins.namedItem = function(name) {
-                    for (let i = 0; i < this.length; i++) {
-                        if (this[i].name === name) return this[i];
-                    }
-                    return null;
-                };
-                return plugins;
-            }
-        });
-        
-        // Override languages
-        Object.defineProperty(navigator, 'languages', {
-            get: () => ['en-US', 'en']
-        });
-        
-        // Override permissions
-        const originalQuery = window.navigator.permissions.query;
-        window.navigator.permissions.query = (parameters) => (
-            parameters.name === 'notifications' ?
-                Promise.resolve({ state: Notification.permission }) :
-                originalQuery(parameters)
-        );
-        
-        // Enhanced chrome object
-        window.chrome = {
-            runtime: {},
-            loadTimes: function() {},
-            csi: function() {},
-            app: {}
-        };
-        
-        // Override WebGL vendor/renderer
-        const getParameter = WebGLRenderingContext.prototype.getParameter;
-        WebGLRenderingContext.prototype.getParameter = function(parameter) {
-            if (parameter === 37445) {
-                return 'Intel Inc.';
-            }
-            if (parameter === 37446) {
-                return 'Intel Iris OpenGL Engine';
-            }
-            return getParameter.call(this, parameter);
-        };
-        
-        // Override WebGL2
-        const getParameter2 = WebGL2RenderingContext.prototype.getParameter;
-        WebGL2RenderingContext.prototype.getParameter = function(parameter) {
-            if (parameter === 37445) {
-                return 'Intel Inc.';
-            }
-            if (parameter === 37446) {
-                return 'Intel Iris OpenGL Engine';
-            }
-            return getParameter2.call(this, parameter);
-        };
-        
-        // Canvas fingerprint randomization
-        const originalToDataURL = HTMLCanvasElement.prototype.toDataURL;
-        HTMLCanvasElement.prototype.toDataURL = function(type) {
-            const context = this.getContext('2d');
-            if (context) {
-                const imageData = context.getImageData(0, 0, this.width, this.height);
-                for (let i = 0; i < imageData.data.length; i += 4) {
-                    imageData.data[i] = imageData.data[i] ^ 1;
-                }
-                context.putImageData(imageData, 0, 0);
-            }
-            return originalToDataURL.apply(this, arguments);
-        };
-        
-        // AudioContext fingerprint spoofing
-        const AudioContext = window.AudioContext || window.webkitAudioContext;
-        if (AudioContext) {
-            const originalCreateAnalyser = AudioContext.prototype.createAnalyser;
-            AudioContext.prototype.createAnalyser = function() {
-                const analyser = originalCreateAnalyser.apply(this, arguments);
-                const originalGetFloatFrequencyData = analyser.getFloatFrequencyData;
-                analyser.getFloatFrequencyData = function(array) {
-                    originalGetFloatFrequencyData.apply(this, arguments);
-                    for (let i = 0; i < array.length; i++) {
-                        array[i] += Math.random() * 0.0001 - 0.00005;
-                    }
-                };
-                return analyser;
-            };
-        }
-        
-        // Override toString methods to hide automation
-        const originalToString = Function.prototype.toString;
-        Function.prototype.toString = function() {
-            if (this === navigator.webdriver || this === window.chrome || this === window.navigator.plugins) {
-                return 'function () { [native code] }';
-            }
-            return originalToString.apply(this, arguments);
-        };
-        
-        // Hide automation indicators
-        Object.defineProperty(navigator, 'hardwareConcurrency', {
-            get: () => 8
-        });
-        
-        Object.defineProperty(navigator, 'deviceMemory', {
-            get: () => 8
-        });
-        
-        // Override getBattery if it exists
-        if (navigator.getBattery) {
-            navigator.getBattery = () => Promise.resolve({
-                charging: true,
-                chargingTime: 0,
-                dischargingTime: Infinity,
-                level: 1
-            });
-        }
-        
-        // Override connection property
-        Object.defineProperty(navigator, 'connection', {
-            get: () => ({
-                effectiveType: '4g',
-                rtt: 50,
-                downlink: 10,
-                saveData: false
-            })
-        });
-        
-        // Override platform
-        Object.defineProperty(navigator, 'platform', {
-            get: () => 'MacIntel'
-        });
-        
-        // Override vendor
-        Object.defineProperty(navigator, 'vendor', {
-            get: () => 'Google Inc.'
-        });
-        
-        // Hide iframe detection
-        Object.defineProperty(window, 'outerHeight', {
-            get: () => window.innerHeight
-        });
-        
-        Object.defineProperty(window, 'outerWidth', {
-            get: () => window.innerWidth
-        });
-        
-        // Override Notification permission
-        const originalNotification = window.Notification;
-        window.Notification = function(title, options) {
-            return new originalNotification(title, options);
-        };
-        Object.defineProperty(Notification, 'permission', {
-            get: () => 'default'
-        });
-        
-        // Override MediaDevices
-        if (navigator.mediaDevices) {
-            Object.defineProperty(navigator.mediaDevices, 'enumerateDevices', {
-                value: () => Promise.resolve([])
-            });
-        }
-        
-        // Prevent detection via iframe
-        Object.defineProperty(window, 'frameElement', {
-            get: () => null
-        });
-        
-        // Override document properties
-        Object.defineProperty(document, 'hidden', {
-            get: () => false
-        });
-        
-        Object.defineProperty(document, 'visibilityState', {
-            get: () => 'visible'
-        });
-        
-        // Add realistic timing
-        const originalNow = Date.now;
-        let timeOffset = 0;
-        Date.now = function() {
-            return originalNow() + timeOffset;
-        };
-        
-        // Override performance timing
-        if (window.performance && window.performance.timing) {
-            const timing = window.performance.timing;
-            Object.defineProperty(timing, 'navigationStart', {
-                get: () => Date.now() - Math.random() * 1000
-            });
-        }
-    """)
+    page.add_init_script(STEALTH_INIT_SCRIPT)
+    install_helpers(page)
     
     return context, page
 
@@ -355,57 +185,16 @@ def simulate_human_behavior(page):
         time.sleep(random.uniform(0.5, 1.0))
         
     except Exception as e:
-        print(f"Note: Could not simulate human behavior: {e}")
-
-
-def navigate_with_retry(page, url, max_retries=3):
-    """Navigate to URL with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            print(f"Attempting to navigate to {url} (attempt {attempt + 1}/{max_retries})...")
-            page.goto(url, wait_until="networkidle", timeout=60000)
-            current_url = page.url
-            
-            # Check if navigation succeeded (either exact match or redirected)
-            url_base = url.split('?')[0].split('#')[0].rstrip('/')
-            current_base = current_url.split('?')[0].split('#')[0].rstrip('/')
-            
-            # Success if we reached the target URL or were redirected (which is OK for login page)
-            if url_base in current_url or current_url.startswith(url_base) or current_url.startswith(url.split('?')[0]):
-                print(f"Successfully navigated to: {current_url}")
-                return True
-            
-            # If trying to go to login page but redirected away, that's also OK (already authenticated)
-            if "login" in url.lower() and "login" not in current_url.lower():
-                print(f"Redirected away from login page (likely already authenticated): {current_url}")
-                return True
-                
-        except PlaywrightTimeoutError as e:
-            print(f"Navigation timeout on attempt {attempt + 1}, retrying...")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            else:
-                raise
-        except Exception as e:
-            print(f"Navigation error: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            else:
-                raise
-    
-    print("All navigation attempts failed")
-    return False
+        log.debug(f"Could not simulate human behavior: {e}")
 
 
 def login_to_stockbit(page, config, manual_login=False):
     """Handle Stockbit login - either manual or automated"""
-    print("Navigating to Stockbit login page...")
+    log.info("Navigating to Stockbit login page", extra={"phase": "login"})
     if not navigate_with_retry(page, "https://stockbit.com/login"):
         raise Exception("Failed to navigate to login page after multiple attempts")
     
-    print("Waiting for page to fully load and reCAPTCHA to initialize...")
+    log.info("Waiting for page to fully load and reCAPTCHA to initialize", extra={"phase": "login"})
     time.sleep(3)
     
     # Check if already authenticated (redirected away from login page)
@@ -413,22 +202,16 @@ def login_to_stockbit(page, config, manual_login=False):
     is_login_page = "login" in current_url.lower() or current_url.endswith("/login")
     
     if not is_login_page:
-        print(f"\n✅ Already authenticated! Current URL: {current_url}")
-        print("Skipping login process...")
+        log.info(f"Already authenticated, skipping login: {current_url}", extra={"phase": "login", "url": current_url})
         return True
     
     if manual_login:
-        print("\n" + "="*70)
-        print("MANUAL LOGIN MODE")
-        print("="*70)
-        print("Please log in manually in the browser window.")
-        print("The script will wait for you to complete the login process.")
-        print("\nTips for better reCAPTCHA v3 score:")
-        print("- Wait a few seconds after the page loads before typing")
-        print("- Type naturally with some pauses")
-        print("- Move your mouse around the page a bit")
-        print("- Don't rush - take your time")
-        print("="*70 + "\n")
+        log.info(
+            "Manual login: log in in the browser window; waiting for the login to complete. "
+            "For a better reCAPTCHA v3 score, wait a few seconds before typing, type naturally "
+            "with pauses and move the mouse around the page",
+            extra={"phase": "login"},
+        )
         
         time.sleep(2)
         simulate_human_behavior(page)
@@ -444,14 +227,14 @@ def login_to_stockbit(page, config, manual_login=False):
             while elapsed_time < max_wait_time:
                 try:
                     if page.is_closed():
-                        print("\n⚠️  Browser page was closed. Please check the browser window.")
+                        log.warning("Browser page was closed; check the browser window", extra={"phase": "login"})
                         return False
                     
                     try:
                         # Force evaluation of current URL using JavaScript to get real-time URL
                         current_url = page.evaluate("() => window.location.href") or page.url
                     except Exception as e:
-                        print(f"Error getting URL: {e}")
+                        log.debug(f"Error getting URL: {e}", extra={"phase": "login"})
                         time.sleep(check_interval)
                         elapsed_time += check_interval
                         continue
@@ -465,49 +248,48 @@ def login_to_stockbit(page, config, manual_login=False):
                     
                     # Debug output every 30 seconds
                     if elapsed_time % 30 == 0:
-                        print(f"Waiting for login... ({elapsed_time}s/{max_wait_time}s)")
-                        print(f"Current URL: {current_url}")
-                        print(f"Initial URL: {initial_url}")
-                        print(f"URL changed: {url_changed}, Is login page: {is_login_page}")
+                        log.info(f"Waiting for login ({elapsed_time}s/{max_wait_time}s)", extra={"phase": "login", "url": current_url})
+                        log.debug(f"Initial URL: {initial_url}; URL changed: {url_changed}, is login page: {is_login_page}",
+                                  extra={"phase": "login"})
                     
                     # Also check if we're on stream page or any non-login page
                     if url_changed and not is_login_page:
-                        print(f"\n✅ Login detected! URL changed from login page.")
-                        print(f"Current URL: {current_url}")
-                        print(f"Proceeding with login completion...")
+                        log.info(f"Login detected: URL changed from login page to {current_url}",
+                                 extra={"phase": "login", "url": current_url})
                         
                         if "new-device" in current_url.lower():
-                            print("\nNew device verification required. Please complete verification...")
+                            log.info("New device verification required; complete it in the browser", extra={"phase": "login"})
                             verification_elapsed = 0
                             verification_max = 300
                             
                             while verification_elapsed < verification_max:
                                 try:
                                     if page.is_closed():
-                                        print("\n⚠️  Browser page was closed during verification.")
+                                        log.warning("Browser page was closed during verification", extra={"phase": "login"})
                                         return False
                                     
                                     current_url = page.evaluate("() => window.location.href") or page.url
                                     if "new-device" not in current_url.lower():
-                                        print(f"✅ Verification completed! Redirected to: {current_url}")
+                                        log.info(f"Verification completed, redirected to {current_url}",
+                                                 extra={"phase": "login", "url": current_url})
                                         return True
                                     
                                     time.sleep(check_interval)
                                     verification_elapsed += check_interval
                                     
                                     if verification_elapsed % 30 == 0:
-                                        print(f"Still waiting for verification... ({verification_elapsed}s/{verification_max}s)")
+                                        log.info(f"Still waiting for verification ({verification_elapsed}s/{verification_max}s)",
+                                                 extra={"phase": "login"})
                                         
                                 except Exception as e:
-                                    print(f"Error checking verification status: {e}")
+                                    log.debug(f"Error checking verification status: {e}", extra={"phase": "login"})
                                     time.sleep(check_interval)
                                     verification_elapsed += check_interval
                             
-                            print(f"\n⚠️  Verification timeout after {verification_max} seconds.")
-                            print(f"Current URL: {page.url}")
+                            log.warning(f"Verification timed out after {verification_max} seconds",
+                                        extra={"phase": "login", "url": page.url})
                             return False
                         
-                        print("Login completed successfully, returning True...")
                         return True
                     
                     time.sleep(check_interval)
@@ -516,18 +298,17 @@ def login_to_stockbit(page, config, manual_login=False):
                 except Exception as e:
                     error_msg = str(e)
                     if "Target page, context or browser has been closed" in error_msg:
-                        print("\n⚠️  Browser was closed. Please check the browser window.")
+                        log.warning("Browser was closed; check the browser window", extra={"phase": "login"})
                         return False
-                    print(f"Error checking login status: {error_msg}")
+                    log.debug(f"Error checking login status: {error_msg}", extra={"phase": "login"})
                     time.sleep(check_interval)
                     elapsed_time += check_interval
             
-            print(f"\n⚠️  Login timeout after {max_wait_time} seconds.")
-            print(f"Final URL: {page.url}")
+            log.warning(f"Login timed out after {max_wait_time} seconds", extra={"phase": "login", "url": page.url})
             return False
             
         except Exception as e:
-            print(f"Error during login: {str(e)}")
+            log.error(f"Error during login: {e}", extra={"phase": "login"})
             return False
     else:
         try:
@@ -538,7 +319,7 @@ def login_to_stockbit(page, config, manual_login=False):
             password_field = page.wait_for_selector("#password", timeout=10000)
             login_button = page.wait_for_selector("#email-login-button", timeout=10000, state="visible")
             
-            print("Filling in credentials...")
+            log.info("Filling in credentials", extra={"phase": "login"})
             # Type with human-like delays
             username_field.click()
             time.sleep(0.5)
@@ -550,7 +331,7 @@ def login_to_stockbit(page, config, manual_login=False):
             password_field.fill(config["password"])
             time.sleep(1)
             
-            print("Clicking login button...")
+            log.info("Clicking login button", extra={"phase": "login"})
             login_button.click()
             time.sleep(2)
             
@@ -561,9 +342,8 @@ def login_to_stockbit(page, config, manual_login=False):
                 time.sleep(30)
                 current_url = page.url
                 if "login" in current_url.lower():
-                    print("\n⚠️  reCAPTCHA detected or login failed!")
-                    print("Current URL:", current_url)
-                    print("\nConsider using --manual-login flag to bypass reCAPTCHA manually.")
+                    log.warning("reCAPTCHA detected or login failed; consider --manual-login to solve it manually",
+                                extra={"phase": "login", "url": current_url})
                     return False
             
             page.wait_for_function(
@@ -571,15 +351,13 @@ def login_to_stockbit(page, config, manual_login=False):
                 timeout=30000
             )
             current_url = page.url
-            print(f"Login successful! Current URL: {current_url}")
+            log.info(f"Login successful: {current_url}", extra={"phase": "login", "url": current_url})
             
             if "new-device" in current_url.lower():
-                print("NEW DEVICE VERIFICATION REQUIRED")
-                print("="*70)
-                print("A verification code has been sent to your email.")
-                print("Please enter the code in the browser window.")
-                print("Waiting for you to complete verification...")
-                print("="*70 + "\n")
+                log.info(
+                    "New device verification required: enter the code sent to your email in the browser window",
+                    extra={"phase": "login"},
+                )
                 
                 try:
                     page.wait_for_function(
@@ -587,18 +365,16 @@ def login_to_stockbit(page, config, manual_login=False):
                         timeout=300000
                     )
                     final_url = page.url
-                    print(f"\nVerification completed! Redirected to: {final_url}")
+                    log.info(f"Verification completed, redirected to {final_url}", extra={"phase": "login", "url": final_url})
                 except PlaywrightTimeoutError as e:
                     error_msg = str(e) if str(e) else type(e).__name__
-                    print(f"\nTimeout waiting for verification. Current URL: {page.url}")
-                    print(f"Error details: {error_msg}")
+                    log.error(f"Timed out waiting for verification: {error_msg}", extra={"phase": "login", "url": page.url})
                     raise Exception(f"Verification timeout - please complete verification manually and try again. Error: {error_msg}")
             
             return True
         except Exception as e:
             error_msg = str(e) if str(e) else f"{type(e).__name__} (no message)"
-            print(f"Login failed: {error_msg}")
-            print(f"Current URL: {page.url}")
+            log.error(f"Login failed: {error_msg}", extra={"phase": "login", "url": page.url})
             return False
 
 
@@ -613,23 +389,23 @@ def set_date_range(page, days):
         start_date_str = start_date.strftime("%b %d, %Y")
         end_date_str = end_date.strftime("%b %d, %Y")
         
-        print(f"Setting date range: {start_date_str} to {end_date_str}")
-        
-        # Find date picker inputs within broker summary
-        broker_summary_locator = page.locator('div.sc-f10b1c12-0.jQepBs').first
+        log.info(f"Setting date range: {start_date_str} to {end_date_str}", extra={"phase": "date_range"})
         
         # Wait for date pickers to be visible
         time.sleep(2)
         
+        # Find date picker inputs within broker summary
+        broker_summary_locator = locate_broker_summary(page)
+        
         # Get date picker containers first, then get inputs from each
         date_pickers = broker_summary_locator.locator('div.ant-picker').all()
         
         if len(date_pickers) < 2:
-            print(f"⚠️  Warning: Found {len(date_pickers)} date picker containers, trying alternative selector...")
-            date_pickers = page.locator('div.sc-f10b1c12-0.jQepBs div.ant-picker').all()
+            log.warning(f"Found {len(date_pickers)} date picker containers, locating the container again", extra={"phase": "date_range"})
+            date_pickers = locate_broker_summary(page).locator('div.ant-picker').all()
         
         if len(date_pickers) < 2:
-            print(f"⚠️  Warning: Could not find date pickers. Found {len(date_pickers)} containers")
+            log.warning(f"Could not find date pickers; found {len(date_pickers)} containers", extra={"phase": "date_range"})
             return
         
         # Get inputs from each picker container
@@ -643,80 +419,23 @@ def set_date_range(page, days):
         try:
             start_value_before = start_input.input_value()
             end_value_before = end_input.input_value()
-            print(f"Initial values - Start: {start_value_before}, End: {end_value_before}")
+            log.debug(f"Initial values - Start: {start_value_before}, End: {end_value_before}", extra={"phase": "date_range"})
         except:
             pass
         
         # Set start date
-        print(f"Clicking start date input (first input) to open calendar...")
+        log.debug("Clicking start date input (first input) to open calendar", extra={"phase": "date_range"})
         start_input.click()
         time.sleep(2)  # Wait for calendar to fully open
         
-        # Wait for calendar to appear and click the start date
-        start_day = start_date.day
-        start_month = start_date.month
-        start_year = start_date.year
-        
-        # Use JavaScript to find and click the date cell
+        # Click the start date cell with the preinstalled page helper
         start_day = start_date.day
-        start_month = start_date.month
-        start_year = start_date.year
-        
-        result = page.evaluate(f"""
-            () => {{
-                const calendarBody = document.querySelector('div.ant-picker-body');
-                if (!calendarBody) {{
-                    return {{ error: 'Calendar body not found' }};
-                }}
-                
-                // Find all date cells (td elements with class ant-picker-cell)
-                const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                let targetCell = null;
-                
-                // Target date: day {start_day}
-                for (const cell of cells) {{
-                    const cellText = cell.textContent.trim();
-                    const cellTitle = cell.getAttribute('title') || '';
-                    
-                    // Check if this cell matches our target day number
-                    // Also check title attribute which often contains full date
-                    if (cellText === '{start_day}' && 
-                        (cellTitle.includes('{start_date_str}') || cellTitle.includes('{start_month}') || cellTitle.includes('{start_year}'))) {{
-                        // Make sure it's not disabled and is in-range
-                        if (!cell.classList.contains('ant-picker-cell-disabled') && 
-                            !cell.classList.contains('ant-picker-cell-in-range')) {{
-                            targetCell = cell;
-                            break;
-                        }}
-                    }}
-                }}
-                
-                // If not found by title, try just by day number (might be in current month view)
-                if (!targetCell) {{
-                    for (const cell of cells) {{
-                        const cellText = cell.textContent.trim();
-                        if (cellText === '{start_day}' && 
-                            !cell.classList.contains('ant-picker-cell-disabled') &&
-                            !cell.classList.contains('ant-picker-cell-in-range')) {{
-                            targetCell = cell;
-                            break;
-                        }}
-                    }}
-                }}
-                
-                if (targetCell) {{
-                    targetCell.click();
-                    return {{ success: true, clicked: targetCell.textContent.trim(), title: targetCell.getAttribute('title') }};
-                }} else {{
-                    return {{ error: 'Date cell not found for day {start_day}', availableCells: cells.length }};
-                }}
-            }}
-        """)
+        result = call_helper(page, "pickDate", date_target(start_date, skip_in_range=True))
         
         if result.get('error'):
-            print(f"⚠️  Warning: Could not click start date: {result.get('error')}")
+            log.warning(f"Could not click start date: {result.get('error')}", extra={"phase": "date_range"})
         else:
-            print(f"✅ Start date clicked: {result.get('clicked')}")
+            log.info(f"Start date clicked: {result.get('clicked')}", extra={"phase": "date_range"})
         
         # Wait for calendar to close and start date to be set
         time.sleep(2)
@@ -724,11 +443,11 @@ def set_date_range(page, days):
         # Verify start date was set correctly before proceeding
         try:
             start_date_value = start_input.input_value()
-            print(f"Start date after selection: {start_date_value}")
+            log.debug(f"Start date after selection: {start_date_value}", extra={"phase": "date_range"})
             
             # If start date is wrong, something went wrong
             if start_date_str not in start_date_value and str(start_day) not in start_date_value:
-                print(f"⚠️  Warning: Start date not set correctly. Expected {start_date_str}, got {start_date_value}")
+                log.warning(f"Start date not set correctly: expected {start_date_str}, got {start_date_value}", extra={"phase": "date_range"})
         except:
             pass
         
@@ -739,27 +458,13 @@ def set_date_range(page, days):
         # Double-check that start date is still set correctly
         try:
             start_check = start_input.input_value()
-            print(f"Start date before end date selection: {start_check}")
+            log.debug(f"Start date before end date selection: {start_check}", extra={"phase": "date_range"})
             if start_date_str not in start_check and str(start_day) not in start_check:
-                print(f"⚠️  Start date was lost! Re-setting...")
+                log.warning("Start date was lost; setting it again", extra={"phase": "date_range"})
                 start_input.click()
                 time.sleep(1.5)
                 # Re-click start date
-                page.evaluate(f"""
-                    () => {{
-                        const calendarBody = document.querySelector('div.ant-picker-body');
-                        if (calendarBody) {{
-                            const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                            for (const cell of cells) {{
-                                if (cell.textContent.trim() === '{start_day}' && 
-                                    !cell.classList.contains('ant-picker-cell-disabled')) {{
-                                    cell.click();
-                                    break;
-                                }}
-                            }}
-                        }}
-                    }}
-                """)
+                call_helper(page, "pickDate", date_target(start_date))
                 time.sleep(1)
                 page.keyboard.press('Escape')
                 time.sleep(0.5)
@@ -767,96 +472,21 @@ def set_date_range(page, days):
             pass
         
         # Set end date - click the END picker container's input
-        print(f"Clicking end date input (second picker) to open calendar...")
+        log.debug("Clicking end date input (second picker) to open calendar", extra={"phase": "date_range"})
         end_input.click()
         time.sleep(2)  # Wait for calendar to fully open
         
         # Verify we're clicking the end date input by checking which input is focused
-        focused_input = page.evaluate("""
-            () => {
-                const active = document.activeElement;
-                if (active && active.tagName === 'INPUT') {
-                    return { isInput: true, value: active.value };
-                }
-                return { isInput: false };
-            }
-        """)
-        print(f"Focused element after clicking end date: {focused_input}")
+        focused_input = call_helper(page, "focusedInput")
+        log.debug(f"Focused element after clicking end date: {focused_input}", extra={"phase": "date_range"})
         
         # Click the end date in the calendar
-        end_day = end_date.day
-        end_month = end_date.month
-        end_year = end_date.year
-        
-        result = page.evaluate(f"""
-            () => {{
-                // Find the calendar that's associated with the end date picker
-                // Look for the calendar dropdown that's currently visible
-                const calendarBody = document.querySelector('div.ant-picker-dropdown:not([style*="display: none"]) div.ant-picker-body') ||
-                                     document.querySelector('div.ant-picker-body');
-                if (!calendarBody) {{
-                    return {{ error: 'Calendar body not found' }};
-                }}
-                
-                // Find all date cells (td elements with class ant-picker-cell)
-                const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                let targetCell = null;
-                
-                // Target date: day {end_day} - make sure we're selecting the END date
-                // Prefer cells marked as "today" to ensure we're setting end date correctly
-                for (const cell of cells) {{
-                    const cellText = cell.textContent.trim();
-                    const cellTitle = cell.getAttribute('title') || '';
-                    
-                    // Check if this cell matches our target day number
-                    if (cellText === '{end_day}') {{
-                        // Make sure it's not disabled
-                        if (!cell.classList.contains('ant-picker-cell-disabled')) {{
-                            // Strongly prefer today's cell (which should be day {end_day})
-                            if (cell.classList.contains('ant-picker-cell-today')) {{
-                                targetCell = cell;
-                                break;
-                            }}
-                            // Also check title for exact match
-                            if ((cellTitle.includes('{end_date_str}') || cellTitle.includes('{end_month}') || cellTitle.includes('{end_year}')) && !targetCell) {{
-                                targetCell = cell;
-                            }}
-                        }}
-                    }}
-                }}
-                
-                // If not found by title, try just by day number - prefer today
-                if (!targetCell) {{
-                    for (const cell of cells) {{
-                        const cellText = cell.textContent.trim();
-                        if (cellText === '{end_day}' && 
-                            !cell.classList.contains('ant-picker-cell-disabled')) {{
-                            // Prefer today's cell
-                            if (cell.classList.contains('ant-picker-cell-today')) {{
-                                targetCell = cell;
-                                break;
-                            }}
-                            if (!targetCell) {{
-                                targetCell = cell;
-                            }}
-                        }}
-                    }}
-                }}
-                
-                if (targetCell) {{
-                    // Double-click or ensure we're setting end date
-                    targetCell.click();
-                    return {{ success: true, clicked: targetCell.textContent.trim(), title: targetCell.getAttribute('title'), isToday: targetCell.classList.contains('ant-picker-cell-today') }};
-                }} else {{
-                    return {{ error: 'Date cell not found for day {end_day}', availableCells: cells.length }};
-                }}
-            }}
-        """)
+        result = call_helper(page, "pickDate", date_target(end_date, prefer_today=True))
         
         if result.get('error'):
-            print(f"⚠️  Warning: Could not click end date: {result.get('error')}")
+            log.warning(f"Could not click end date: {result.get('error')}", extra={"phase": "date_range"})
         else:
-            print(f"✅ End date clicked: {result.get('clicked')}")
+            log.info(f"End date clicked: {result.get('clicked')}", extra={"phase": "date_range"})
         
         # Wait for calendar to close
         time.sleep(1)
@@ -867,166 +497,245 @@ def set_date_range(page, days):
         try:
             final_start = start_input.input_value()
             final_end = end_input.input_value()
-            print(f"Final date range - Start: {final_start}, End: {final_end}")
+            log.debug(f"Final date range - Start: {final_start}, End: {final_end}", extra={"phase": "date_range"})
             
             # Check if start date was incorrectly changed
             if start_date_str not in final_start and str(start_day) not in final_start:
-                print(f"❌ ERROR: Start date was changed incorrectly!")
-                print(f"   Expected: {start_date_str} (day {start_day})")
-                print(f"   Got: {final_start}")
-                print(f"   Attempting to fix...")
+                log.error(f"Start date was changed incorrectly: expected {start_date_str} (day {start_day}), "
+                          f"got {final_start}; attempting to fix", extra={"phase": "date_range"})
                 
                 # Try to re-set the start date
                 start_input.click()
                 time.sleep(1.5)
-                page.evaluate(f"""
-                    () => {{
-                        const calendarBody = document.querySelector('div.ant-picker-body');
-                        if (calendarBody) {{
-                            const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                            for (const cell of cells) {{
-                                const cellText = cell.textContent.trim();
-                                const cellTitle = cell.getAttribute('title') || '';
-                                if (cellText === '{start_day}' && 
-                                    !cell.classList.contains('ant-picker-cell-disabled') &&
-                                    (cellTitle.includes('{start_date_str}') || cellTitle.includes('{start_month}'))) {{
-                                    cell.click();
-                                    break;
-                                }}
-                            }}
-                        }}
-                    }}
-                """)
+                call_helper(page, "pickDate", date_target(start_date))
                 time.sleep(1)
                 page.keyboard.press('Escape')
                 time.sleep(1)
                 
                 # Re-check
                 final_start = start_input.input_value()
-                print(f"After fix - Start: {final_start}, End: {final_end}")
+                log.info(f"After fix - Start: {final_start}, End: {final_end}", extra={"phase": "date_range"})
             
             if start_date_str in final_start and end_date_str in final_end:
-                print(f"✅ Date range set successfully")
+                log.info("Date range set successfully", extra={"phase": "date_range"})
             else:
-                print(f"⚠️  Warning: Date range mismatch.")
-                print(f"   Expected Start: {start_date_str}, Got: {final_start}")
-                print(f"   Expected End: {end_date_str}, Got: {final_end}")
+                log.warning(f"Date range mismatch: expected {start_date_str} to {end_date_str}, "
+                            f"got {final_start} to {final_end}", extra={"phase": "date_range"})
         except Exception as e:
-            print(f"⚠️  Could not verify date range: {e}")
+            log.warning(f"Could not verify date range: {e}", extra={"phase": "date_range"})
         
         time.sleep(2)  # Extra wait for table to update
         
     except Exception as e:
-        print(f"⚠️  Warning: Error setting date range: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("Continuing with default date range...")
+        log.warning(f"Error setting date range, continuing with the default range: {e}", exc_info=True, extra={"phase": "date_range"})
 
 
-def format_broker_summary_table(rows, date_range=None):
-    """Format broker summary rows into a nicely formatted table"""
-    formatted_rows = []
-    
-    # Add date range header if available
-    if date_range:
-        start_date = date_range.get('start', 'N/A')
-        end_date = date_range.get('end', 'N/A')
-        formatted_rows.append(f"📅 Date Range: {start_date} to {end_date}")
-        formatted_rows.append("")
+def get_trading_dates(days, end_date=None):
+    """Last `days` weekdays up to `end_date` (default: today), oldest first"""
+    trading_dates = []
+    current_date = end_date or datetime.now()
+    day_offset = 0
     
-    # Table header
-    header = f"{'BY':<6} {'B.val':<12} {'B.lot':<10} {'B.avg':<8} | {'SL':<6} {'S.val':<12} {'S.lot':<10} {'S.avg':<8}"
-    separator = "-" * 100
-    
-    formatted_rows.extend([header, separator])
+    while len(trading_dates) < days:
+        check_date = current_date - timedelta(days=day_offset)
+        weekday = check_date.weekday()  # Monday=0, Sunday=6
+        
+        # Skip weekends (Saturday=5, Sunday=6)
+        if weekday < 5:  # Monday through Friday
+            trading_dates.append(check_date)
+        
+        day_offset += 1
+        
+        # Safety check to prevent infinite loop
+        if day_offset > days * 2:
+            log.warning(f"Could not find {days} trading days within {day_offset} calendar days")
+            break
     
-    # Format each row
-    for row in rows:
-        formatted_row = (
-            f"{row['buyBroker']:<6} "
-            f"{row['buyValue']:<12} "
-            f"{row['buyLot']:<10} "
-            f"{row['buyAvg']:<8} | "
-            f"{row['sellBroker']:<6} "
-            f"{row['sellValue']:<12} "
-            f"{row['sellLot']:<10} "
-            f"{row['sellAvg']:<8}"
-        )
-        formatted_rows.append(formatted_row)
+    # Sort dates from oldest to newest
+    trading_dates.sort()
+    return trading_dates
+
+
+def extract_day(page, target_date, raw_path=None):
+    """Set the date picker to one trading day and extract its broker summary"""
+    return run_steps(extract_day_steps(page, target_date, raw_path))
+
+
+def extract_day_steps(page, target_date, raw_path=None):
+    """Step generator version of extract_day (yields waits, returns the day's data)"""
+    day_data, _ = yield from extract_day_result_steps(page, target_date, raw_path)
+    return day_data
+
+
+def extract_day_result_steps(page, target_date, raw_path=None):
+    """extract_day_steps that returns (day data or None, failure reason or "")"""
+    # Set date range to single day (start = end = target_date)
+    verified = yield from single_date_range_steps(page, target_date)
+    log.debug("Waiting for table to update", extra={"phase": "extract_day", "date": target_date.strftime('%Y-%m-%d')})
+    yield 3
     
-    return "\n".join(formatted_rows)
+    day_data, reason = extract_day_result(page, target_date, raw_path=raw_path)
+    if day_data:
+        # Checked with the day's other quality flags when it is stored
+        day_data['dateVerified'] = verified
+    return day_data, reason
+
+
+def iter_interleaved(tasks):
+    """Drive step generators on one thread, always advancing the one whose wait ends first
+
+    Each task yields the seconds it needs to wait; while one page waits on
+    the date picker or the table, the others make progress. Yields after
+    every step so the caller can act between them, and returns each task's
+    result in task order.
+    """
+    results = [None] * len(tasks)
+    due = {index: 0.0 for index in range(len(tasks))}
+    while due:
+        index = min(due, key=due.get)
+        delay = due[index] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            due[index] = time.monotonic() + next(tasks[index])
+        except StopIteration as done:
+            results[index] = done.value
+            del due[index]
+        yield
+    return results
 
 
-def extract_broker_summary(page, stock_symbol="BUMI", days=1):
-    """Extract Broker Summary table data from Stockbit stock page"""
-    print(f"\nNavigating to stock page for {stock_symbol}...")
-    url = f"https://stockbit.com/symbol/{stock_symbol}"
+def interleave(tasks):
+    """Run iter_interleaved() to completion; returns each task's result"""
+    steps = iter_interleaved(tasks)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def iter_days(page, stock_symbol, trading_dates, pool=None, pages=1, raw_dir=None, artifact_dir=None, failed=None):
+    """Yield each trading day's result in date order, dealing the dates round-robin across `pages` pooled pages
+
+    Every page sets its own date range, and their waits are interleaved, so
+    K pages take roughly 1/K of the time. A day is yielded as soon as it
+    and every earlier day are done; days without data are skipped (and
+    captured under `artifact_dir` when given). The ISO dates of days whose
+    page errored, or that the circuit breaker skipped, are appended to
+    `failed`.
+    """
+    if failed is None:
+        failed = []
+    days = len(trading_dates)
+    if pages > 1:
+        if not pool:
+            raise ValueError("Extracting on several pages requires a PagePool")
+        pages = min(pages, days)
+        pool.ensure_size(pages)
+        for index in range(1, pages):
+            pool.open_symbol(stock_symbol, index)
+        log.info(f"Splitting {days} day(s) across {pages} pages", extra={"symbol": stock_symbol})
     
-    if not navigate_with_retry(page, url):
-        raise Exception(f"Failed to navigate to {url}")
+    finished = {}
+    ready = deque()
+    next_position = 0
     
-    print("Waiting for Broker Summary table to load...")
-    time.sleep(3)
+    def release(final=False):
+        # Hand over finished days in date order; at the end, whatever is left
+        nonlocal next_position
+        while next_position < days and (next_position in finished or final):
+            day_data = finished.pop(next_position, None)
+            next_position += 1
+            if day_data:
+                ready.append(day_data)
     
-    # If days > 1, extract data for each individual day
-    if days > 1:
-        print(f"\nExtracting broker summary for each of the last {days} trading days (skipping weekends)...")
-        all_results = []
-        
-        # Collect trading days (skip weekends: Saturday=5, Sunday=6)
-        trading_dates = []
-        current_date = datetime.now()
-        day_offset = 0
-        
-        while len(trading_dates) < days:
-            check_date = current_date - timedelta(days=day_offset)
-            weekday = check_date.weekday()  # Monday=0, Sunday=6
-            
-            # Skip weekends (Saturday=5, Sunday=6)
-            if weekday < 5:  # Monday through Friday
-                trading_dates.append(check_date)
-            
-            day_offset += 1
-            
-            # Safety check to prevent infinite loop
-            if day_offset > days * 2:
-                print(f"⚠️  Warning: Could not find {days} trading days within {day_offset} calendar days")
-                break
-        
-        # Sort dates from oldest to newest
-        trading_dates.sort()
-        
-        # Extract data for each trading day
-        for idx, target_date in enumerate(trading_dates, 1):
-            day_number = idx
+    def page_task(index):
+        for position in range(index, days, pages):
+            target_date = trading_dates[position]
+            day_number = position + 1
             day_name = target_date.strftime('%A')
             
-            print(f"\n{'='*70}")
-            print(f"Day {day_number}/{days} ({day_name}): {target_date.strftime('%b %d, %Y')}")
-            print(f"{'='*70}")
+            # Stop burning the batch window on a symbol whose page keeps failing
+            if not BREAKER.allow(stock_symbol, "extract_day"):
+                log.error(f"Skipping remaining day(s) of {stock_symbol} on page {index}: too many consecutive failures",
+                          extra={"symbol": stock_symbol, "phase": "extract_day", "page": index})
+                failed.extend(trading_dates[skipped].strftime('%Y-%m-%d') for skipped in range(position, days, pages))
+                return
             
-            # Set date range to single day (start = end = target_date)
-            set_single_date_range(page, target_date)
-            print("Waiting for table to update...")
-            time.sleep(3)
+            fields = {"symbol": stock_symbol, "date": target_date.strftime('%Y-%m-%d'), "phase": "extract_day", "page": index}
+            log.info(f"Day {day_number}/{days} ({day_name}): {target_date.strftime('%b %d, %Y')}"
+                     + (f" [page {index}]" if pages > 1 else ""), extra=fields)
+            started = time.monotonic()
             
-            # Extract data for this day
-            day_data = extract_single_day_data(page, target_date)
+            raw_path = raw_dump_path(raw_dir, stock_symbol, target_date) if raw_dir else None
+            if pool:
+                day_data, reason = yield from pool.run_steps(
+                    lambda pooled_page: extract_day_result_steps(pooled_page, target_date, raw_path), index
+                )
+            else:
+                day_data, reason = yield from extract_day_result_steps(page, target_date, raw_path)
             if day_data:
+                BREAKER.record_success(stock_symbol, "extract_day")
                 day_data['day'] = day_number
                 day_data['date'] = target_date.strftime('%b %d, %Y')
-                all_results.append(day_data)
-                print(f"✅ Extracted {len(day_data.get('rows', []))} rows for {target_date.strftime('%b %d, %Y')}")
+                day_data['symbol'] = stock_symbol
+                log.info(f"Extracted {len(day_data.get('rows', []))} rows for {target_date.strftime('%b %d, %Y')}",
+                         extra=dict(fields, rows=len(day_data.get('rows', [])), duration=time.monotonic() - started))
             else:
-                print(f"⚠️  No data found for {target_date.strftime('%b %d, %Y')}")
+                # An empty table is a holiday or a day without trades, not a failing page
+                if reason in BREAKER_FAILURES:
+                    BREAKER.record_failure(stock_symbol, "extract_day")
+                    failed.append(fields["date"])
+                log.warning(f"No data found for {target_date.strftime('%b %d, %Y')}",
+                            extra=dict(fields, duration=time.monotonic() - started))
+                if artifact_dir:
+                    capture_failure(
+                        pool.slots[index].page if pool else page, artifact_dir, stock_symbol,
+                        "no data extracted", target_date
+                    )
+            finished[position] = day_data
+            release()
             
-            time.sleep(1)  # Small delay between days
-        
-        return {
-            'all_days': all_results,
-            'total_days': len(all_results),
-            'summary': f"Extracted data for {len(all_results)} trading days"
-        }
+            yield 1  # Small delay between days
+    
+    for _ in iter_interleaved([page_task(index) for index in range(pages)]):
+        while ready:
+            yield ready.popleft()
+    release(final=True)
+    while ready:
+        yield ready.popleft()
+
+
+def iter_broker_summary(page, stock_symbol="BUMI", dates=None, days=1, pool=None, pages=1, raw_dir=None,
+                        artifact_dir=None, failed=None):
+    """Yield each extracted day of a symbol as soon as it is done, oldest first
+
+    Each item is a day dict ('symbol', 'date', 'day', 'rows', 'dateRange',
+    'dateVerified'; day_record() gives its typed form). Arguments are as for
+    extract_broker_summary; without `dates` and with days=1 the single
+    latest trading day is extracted.
+    """
+    if pool:
+        pool.open_symbol(stock_symbol)
+    else:
+        open_symbol_page(page, stock_symbol)
+    
+    # If days > 1 (or explicit dates are given), extract data for each individual day
+    if days > 1 or dates:
+        if dates:
+            trading_dates = sorted(dates)
+            log.info(f"Extracting broker summary for {len(trading_dates)} requested trading day(s)",
+                     extra={"symbol": stock_symbol})
+        else:
+            log.info(f"Extracting broker summary for each of the last {days} trading days (skipping weekends)",
+                     extra={"symbol": stock_symbol})
+            trading_dates = get_trading_dates(days)
+        yield from iter_days(
+            page, stock_symbol, trading_dates, pool=pool, pages=pages, raw_dir=raw_dir, artifact_dir=artifact_dir,
+            failed=failed
+        )
+        return
     
     # Single day extraction (original behavior)
     # If today is a weekend, use the last trading day instead
@@ -1037,36 +746,122 @@ def extract_broker_summary(page, stock_symbol="BUMI", days=1):
         # Go back to find the last Friday
         days_back = weekday - 4  # Saturday: 1 day back, Sunday: 2 days back
         target_date = today - timedelta(days=days_back)
-        print(f"⚠️  Today is {today.strftime('%A')}, using last trading day: {target_date.strftime('%b %d, %Y')}")
+        log.info(f"Today is {today.strftime('%A')}, using last trading day: {target_date.strftime('%b %d, %Y')}",
+                 extra={"symbol": stock_symbol})
     else:
         target_date = today
     
-    return extract_single_day_data(page, target_date)
+    raw_path = raw_dump_path(raw_dir, stock_symbol, target_date) if raw_dir else None
+    if pool:
+        day_data, reason = pool.run(lambda pooled_page: extract_day_result(pooled_page, target_date, raw_path))
+    else:
+        day_data, reason = extract_day_result(page, target_date, raw_path)
+    if day_data:
+        day_data['symbol'] = stock_symbol
+        yield day_data
+        return
+    if reason in BREAKER_FAILURES and failed is not None:
+        failed.append(target_date.strftime('%Y-%m-%d'))
+    if artifact_dir:
+        capture_failure(pool.page if pool else page, artifact_dir, stock_symbol, "no data extracted", target_date)
+
+
+def extract_broker_summary(page, stock_symbol="BUMI", days=1, dates=None, pool=None, raw_dir=None, on_day=None,
+                           pages=1, artifact_dir=None, failed=None):
+    """Extract Broker Summary table data from Stockbit stock page
+
+    `dates` (datetimes) selects explicit trading days; otherwise the last
+    `days` weekdays are used. With a PagePool, each day runs as a unit of
+    work that is retried on a recycled page if the renderer crashes, and
+    `pages` > 1 splits the days across that many pages of the pool.
+    `raw_dir` archives each day's raw table text as <raw_dir>/<symbol>/<date>.txt,
+    and `artifact_dir` keeps failure artifacts of days that yield no data.
+    `failed` (a list) collects the ISO dates of days whose page errored.
+    `on_day(symbol, day_data)` is called as soon as each day is extracted,
+    e.g. IngestPipeline.submit to store it while the next day loads.
+    Use iter_broker_summary() to consume days while the run continues.
+    """
+    all_results = []
+    for day_data in iter_broker_summary(
+        page, stock_symbol, dates=dates, days=days, pool=pool, pages=pages, raw_dir=raw_dir,
+        artifact_dir=artifact_dir, failed=failed
+    ):
+        all_results.append(day_data)
+        if on_day:
+            on_day(stock_symbol, day_data)
+    
+    if days > 1 or dates:
+        return {
+            'all_days': all_results,
+            'total_days': len(all_results),
+            'summary': f"Extracted data for {len(all_results)} trading days"
+        }
+    # A single day is returned as the day itself
+    return all_results[0] if all_results else None
+
+
+def month_note(result):
+    """Log suffix for how many months pickDate paged the calendar"""
+    clicks = result.get('monthClicks')
+    return f" after {clicks} month/year click(s)" if clicks else ""
+
+
+def type_date(page, date_input, target_date):
+    """Type a date into a picker input, for when its calendar cell can't be clicked
+
+    Give the picker a second to apply it afterwards.
+    """
+    date_input.click()
+    date_input.fill(target_date.strftime("%b %d, %Y"))
+    date_input.press("Enter")
+
+
+def run_steps(steps):
+    """Run a step generator to completion, sleeping for each delay it yields; returns its result"""
+    try:
+        while True:
+            time.sleep(next(steps))
+    except StopIteration as done:
+        return done.value
 
 
 def set_single_date_range(page, target_date):
-    """Set the date range picker to a single specific date (start = end = target_date)"""
+    """Set the date range picker to a single specific date (start = end = target_date)
+
+    Returns whether the pickers were verified to show that date.
+    """
+    return run_steps(single_date_range_steps(page, target_date))
+
+
+def single_date_range_steps(page, target_date):
+    """Generator behind set_single_date_range that yields its waits (seconds) instead of sleeping
+
+    Lets a scheduler drive other pages while this one waits for the picker.
+    Returns whether both pickers were verified to show the target date.
+    """
+    started = time.perf_counter()
+    span = profiling.begin_phase(page, "set_single_date_range")
+    verified = False
     try:
         date_str = target_date.strftime("%b %d, %Y")
         day = target_date.day
-        target_month = target_date.month
-        target_year = target_date.year
-        target_month_name = target_date.strftime("%b")
+        fields = {"phase": "date_range", "date": target_date.strftime('%Y-%m-%d')}
         
-        print(f"Setting date range to: {date_str} (single day)")
+        log.debug(f"Setting date range to: {date_str} (single day)", extra=fields)
         
         # Find date picker inputs within broker summary
-        broker_summary_locator = page.locator('div.sc-f10b1c12-0.jQepBs').first
-        time.sleep(1)
+        yield 1
+        broker_summary_locator = locate_broker_summary(page)
         
         # Get date picker containers
         date_pickers = broker_summary_locator.locator('div.ant-picker').all()
         if len(date_pickers) < 2:
-            date_pickers = page.locator('div.sc-f10b1c12-0.jQepBs div.ant-picker').all()
+            # The container may have re-rendered since it was tagged
+            date_pickers = locate_broker_summary(page).locator('div.ant-picker').all()
         
         if len(date_pickers) < 2:
-            print(f"⚠️  Warning: Could not find date pickers")
-            return
+            log.warning("Could not find date pickers", extra=fields)
+            return verified
         
         start_picker_container = date_pickers[0]
         end_picker_container = date_pickers[1]
@@ -1075,200 +870,54 @@ def set_single_date_range(page, target_date):
         end_input = end_picker_container.locator('div.ant-picker-input > input').first
         
         # Set start date
-        print(f"Setting start date to {date_str}...")
+        log.debug(f"Setting start date to {date_str}", extra=fields)
         start_input.click()
-        time.sleep(2)
+        yield 2
         
-        result = page.evaluate(f"""
-            () => {{
-                // Find the currently visible calendar dropdown (for start date picker)
-                const visibleDropdown = Array.from(document.querySelectorAll('div.ant-picker-dropdown')).find(
-                    dropdown => {{
-                        const style = window.getComputedStyle(dropdown);
-                        return style.display !== 'none' && style.visibility !== 'hidden';
-                    }}
-                );
-                
-                const calendarBody = visibleDropdown 
-                    ? visibleDropdown.querySelector('div.ant-picker-body')
-                    : document.querySelector('div.ant-picker-body');
-                    
-                if (!calendarBody) {{
-                    return {{ error: 'Calendar body not found' }};
-                }}
-                
-                const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                let targetCell = null;
-                let exactMatch = null;
-                
-                // First pass: Look for exact date match via title attribute
-                for (const cell of cells) {{
-                    const cellText = cell.textContent.trim();
-                    const cellTitle = cell.getAttribute('title') || '';
-                    
-                    if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                        // Prioritize exact date match in title
-                        if (cellTitle.includes('{date_str}') || 
-                            (cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                            exactMatch = cell;
-                            break;
-                        }}
-                    }}
-                }}
-                
-                // If exact match found, use it
-                if (exactMatch) {{
-                    targetCell = exactMatch;
-                }} else {{
-                    // Second pass: Find by day number, but avoid "today" if it's not our target date
-                    for (const cell of cells) {{
-                        const cellText = cell.textContent.trim();
-                        const cellTitle = cell.getAttribute('title') || '';
-                        
-                        if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                            // Only use "today" if the title matches our target date
-                            if (cell.classList.contains('ant-picker-cell-today')) {{
-                                if (cellTitle.includes('{date_str}') || 
-                                    (cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                                    targetCell = cell;
-                                    break;
-                                }}
-                                // Skip "today" if it doesn't match our target date
-                                continue;
-                            }}
-                            
-                            // Use first matching cell that's not today
-                            if (!targetCell) {{
-                                targetCell = cell;
-                            }}
-                        }}
-                    }}
-                }}
-                
-                if (targetCell) {{
-                    targetCell.click();
-                    return {{ 
-                        success: true, 
-                        clicked: targetCell.textContent.trim(),
-                        title: targetCell.getAttribute('title'),
-                        isToday: targetCell.classList.contains('ant-picker-cell-today')
-                    }};
-                }} else {{
-                    return {{ error: 'Date cell not found for day {day}', availableCells: cells.length }};
-                }}
-            }}
-        """)
+        result = call_helper(page, "pickDate", date_target(target_date))
         
+        DATE_PICKS.inc(picker="start", result="typed" if result.get('error') else "clicked")
         if result.get('error'):
-            print(f"⚠️  Warning: Could not click start date: {result.get('error')}")
+            log.warning(f"Could not click start date: {result.get('error')}; typing it instead", extra=fields)
+            type_date(page, start_input, target_date)
+            yield 1
         else:
             clicked_day = result.get('clicked')
             clicked_title = result.get('title', '')
-            print(f"✅ Start date clicked: {clicked_day} (title: {clicked_title})")
+            log.debug(f"Start date clicked: {clicked_day} (title: {clicked_title}){month_note(result)}", extra=fields)
         
-        time.sleep(2)
+        yield 2
         page.keyboard.press('Escape')
-        time.sleep(1)
+        yield 1
         
         # Set end date to the same date
-        print(f"Setting end date to {date_str}...")
+        log.debug(f"Setting end date to {date_str}", extra=fields)
         end_input.click()
-        time.sleep(2)
+        yield 2
         
-        result = page.evaluate(f"""
-            () => {{
-                // Find the currently visible calendar dropdown (for end date picker)
-                const visibleDropdown = Array.from(document.querySelectorAll('div.ant-picker-dropdown')).find(
-                    dropdown => {{
-                        const style = window.getComputedStyle(dropdown);
-                        return style.display !== 'none' && style.visibility !== 'hidden';
-                    }}
-                );
-                
-                const calendarBody = visibleDropdown 
-                    ? visibleDropdown.querySelector('div.ant-picker-body')
-                    : document.querySelector('div.ant-picker-body');
-                    
-                if (!calendarBody) {{
-                    return {{ error: 'Calendar body not found' }};
-                }}
-                
-                const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                let targetCell = null;
-                let exactMatch = null;
-                
-                // First pass: Look for exact date match via title attribute
-                for (const cell of cells) {{
-                    const cellText = cell.textContent.trim();
-                    const cellTitle = cell.getAttribute('title') || '';
-                    
-                    if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                        // Prioritize exact date match in title
-                        if (cellTitle.includes('{date_str}') || 
-                            (cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                            exactMatch = cell;
-                            break;
-                        }}
-                    }}
-                }}
-                
-                // If exact match found, use it
-                if (exactMatch) {{
-                    targetCell = exactMatch;
-                }} else {{
-                    // Second pass: Find by day number, but avoid "today" if it's not our target date
-                    for (const cell of cells) {{
-                        const cellText = cell.textContent.trim();
-                        const cellTitle = cell.getAttribute('title') || '';
-                        
-                        if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                            // Only use "today" if the title matches our target date
-                            if (cell.classList.contains('ant-picker-cell-today')) {{
-                                if (cellTitle.includes('{date_str}') || 
-                                    (cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                                    targetCell = cell;
-                                    break;
-                                }}
-                                // Skip "today" if it doesn't match our target date
-                                continue;
-                            }}
-                            
-                            // Use first matching cell that's not today
-                            if (!targetCell) {{
-                                targetCell = cell;
-                            }}
-                        }}
-                    }}
-                }}
-                
-                if (targetCell) {{
-                    targetCell.click();
-                    return {{ 
-                        success: true, 
-                        clicked: targetCell.textContent.trim(),
-                        title: targetCell.getAttribute('title'),
-                        isToday: targetCell.classList.contains('ant-picker-cell-today')
-                    }};
-                }} else {{
-                    return {{ error: 'Date cell not found for day {day}', availableCells: cells.length }};
-                }}
-            }}
-        """)
+        result = call_helper(page, "pickDate", date_target(target_date))
         
+        DATE_PICKS.inc(picker="end", result="typed" if result.get('error') else "clicked")
         if result.get('error'):
-            print(f"⚠️  Warning: Could not click end date: {result.get('error')}")
+            log.warning(f"Could not click end date: {result.get('error')}; typing it instead", extra=fields)
+            type_date(page, end_input, target_date)
+            yield 1
         else:
             clicked_day = result.get('clicked')
             clicked_title = result.get('title', '')
-            print(f"✅ End date clicked: {clicked_day} (title: {clicked_title})")
+            log.debug(f"End date clicked: {clicked_day} (title: {clicked_title}){month_note(result)}", extra=fields)
         
-        time.sleep(2)  # Wait for date picker to update
+        yield 2  # Wait for date picker to update
         page.keyboard.press('Escape')
-        time.sleep(1)
-        
-        # Verify dates are set correctly with retry logic
-        max_retries = 3
-        for retry in range(max_retries):
+        yield 1
+        
+        # Verify dates are set correctly, yielding the backoff between attempts so other pages keep going
+        policy = DATE_VERIFY_POLICY
+        max_retries = policy.max_attempts
+        for attempt in range(1, max_retries + 1):
+            if attempt > 1:
+                yield policy.delay(attempt - 1)
+            retry = attempt - 1
             try:
                 final_start = start_input.input_value()
                 final_end = end_input.input_value()
@@ -1276,303 +925,257 @@ def set_single_date_range(page, target_date):
                 # Check if end date matches our target
                 if date_str in final_end or str(day) in final_end:
                     if date_str in final_start and date_str in final_end:
-                        print(f"✅ Date range verified: Start={final_start}, End={final_end}")
+                        log.info(f"Date range verified: Start={final_start}, End={final_end}", extra=fields)
+                        verified = True
                         break
                     elif date_str in final_start:
-                        print(f"⚠️  Date verification: Start={final_start}, End={final_end} (end date mismatch, retrying...)")
+                        log.warning(f"Date verification: Start={final_start}, End={final_end} (end date mismatch, retrying)",
+                                    extra=fields)
                     else:
-                        print(f"⚠️  Date verification: Start={final_start}, End={final_end} (both dates mismatch)")
+                        log.warning(f"Date verification: Start={final_start}, End={final_end} (both dates mismatch)",
+                                    extra=fields)
                 else:
-                    print(f"⚠️  Date verification: Start={final_start}, End={final_end} (end date is wrong, retrying...)")
+                    log.warning(f"Date verification: Start={final_start}, End={final_end} (end date is wrong, retrying)",
+                                extra=fields)
                 
                 # If end date is wrong, try to fix it
                 if retry < max_retries - 1 and (date_str not in final_end and str(day) not in final_end):
-                    print(f"Retrying end date selection (attempt {retry + 2}/{max_retries})...")
+                    log.info(f"Retrying end date selection (attempt {retry + 2}/{max_retries})",
+                             extra=dict(fields, attempt=retry + 2))
                     end_input.click()
-                    time.sleep(2)
+                    yield 2
                     
                     # Re-select the end date with more precision
-                    retry_result = page.evaluate(f"""
-                        () => {{
-                            const visibleDropdown = Array.from(document.querySelectorAll('div.ant-picker-dropdown')).find(
-                                dropdown => {{
-                                    const style = window.getComputedStyle(dropdown);
-                                    return style.display !== 'none' && style.visibility !== 'hidden';
-                                }}
-                            );
-                            
-                            const calendarBody = visibleDropdown 
-                                ? visibleDropdown.querySelector('div.ant-picker-body')
-                                : document.querySelector('div.ant-picker-body');
-                                
-                            if (!calendarBody) {{
-                                return {{ error: 'Calendar body not found' }};
-                            }}
-                            
-                            const cells = calendarBody.querySelectorAll('td.ant-picker-cell');
-                            let targetCell = null;
-                            
-                            // Find cell with exact date match
-                            for (const cell of cells) {{
-                                const cellText = cell.textContent.trim();
-                                const cellTitle = cell.getAttribute('title') || '';
-                                
-                                if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                                    // Require exact date match in title
-                                    if (cellTitle.includes('{date_str}') || 
-                                        (cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                                        targetCell = cell;
-                                        break;
-                                    }}
-                                }}
-                            }}
-                            
-                            // If still not found, try without title requirement but skip "today" if it's wrong
-                            if (!targetCell) {{
-                                for (const cell of cells) {{
-                                    const cellText = cell.textContent.trim();
-                                    const cellTitle = cell.getAttribute('title') || '';
-                                    
-                                    if (cellText === '{day}' && !cell.classList.contains('ant-picker-cell-disabled')) {{
-                                        // Skip "today" if it doesn't match our date
-                                        if (cell.classList.contains('ant-picker-cell-today')) {{
-                                            if (!cellTitle.includes('{date_str}') && 
-                                                !(cellTitle.includes('{target_month_name}') && cellTitle.includes('{target_year}'))) {{
-                                                continue;
-                                            }}
-                                        }}
-                                        targetCell = cell;
-                                        break;
-                                    }}
-                                }}
-                            }}
-                            
-                            if (targetCell) {{
-                                targetCell.click();
-                                return {{ success: true, clicked: targetCell.textContent.trim(), title: targetCell.getAttribute('title') }};
-                            }} else {{
-                                return {{ error: 'Date cell not found for day {day}' }};
-                            }}
-                        }}
-                    """)
+                    retry_result = call_helper(page, "pickDate", date_target(target_date))
                     
+                    DATE_PICKS.inc(picker="end_retry", result="failed" if retry_result.get('error') else "clicked")
                     if retry_result.get('error'):
-                        print(f"⚠️  Retry failed: {retry_result.get('error')}")
+                        log.warning(f"Retry failed: {retry_result.get('error')}", extra=fields)
                     else:
-                        print(f"✅ Retry clicked: {retry_result.get('clicked')} (title: {retry_result.get('title', '')})")
+                        log.debug(f"Retry clicked: {retry_result.get('clicked')} (title: {retry_result.get('title', '')})",
+                                  extra=fields)
                     
-                    time.sleep(2)
+                    yield 2
                     page.keyboard.press('Escape')
-                    time.sleep(1)
+                    yield 1
                     
             except Exception as e:
-                print(f"⚠️  Error verifying dates: {e}")
-                if retry < max_retries - 1:
-                    time.sleep(1)
+                log.warning(f"Error verifying dates: {e}", extra=fields)
+        
+        if not verified:
+            log.warning(f"Date range not verified as {date_str} after {max_retries} attempts", extra=fields)
+        return verified
         
     except Exception as e:
-        print(f"⚠️  Warning: Error setting single date: {str(e)}")
+        log.warning(f"Error setting single date: {e}", extra={"phase": "date_range", "date": target_date.strftime('%Y-%m-%d')})
+        return False
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - started, phase="set_single_date_range")
+        profiling.end_phase(span, date=target_date.strftime('%Y-%m-%d'))
+
 
+def raw_dump_path(raw_dir, stock_symbol, target_date):
+    """Where --dump-raw archives the table text of one symbol and day"""
+    return Path(raw_dir) / stock_symbol / f"{target_date.strftime('%Y-%m-%d')}.txt"
 
-def extract_single_day_data(page, target_date=None):
-    """Extract broker summary data for a single day"""
+
+def extract_single_day_data(page, target_date=None, raw_path=None):
+    """Extract broker summary data for a single day
+
+    Only the parsed row cells cross CDP. With `raw_path`, the table's full
+    text is also fetched and written there instead of being kept in memory.
+    """
+    return extract_day_result(page, target_date, raw_path=raw_path)[0]
+
+
+def extract_day_result(page, target_date=None, raw_path=None):
+    """extract_single_day_data that returns (day data or None, failure reason or "")"""
     if target_date is None:
         target_date = datetime.now()
+    fields = {"phase": "extract", "date": target_date.strftime('%Y-%m-%d')}
     
+    with PHASE_SECONDS.time(phase="extract_single_day_data"), \
+            profiling.phase(page, "extract_single_day_data", date=fields["date"]):
+        day_data, reason = _extract_day_data(page, target_date, raw_path, fields)
+    EXTRACTIONS.inc(result="success" if day_data else "failure", reason=reason)
+    if day_data:
+        ROWS_EXTRACTED.inc(len(day_data['rows']))
+    return day_data, reason
+
+
+# Failure reasons of stockbit_extractions_total, by __banmo.extractBrokerSummary error
+EXTRACTION_FAILURES = {
+    'Broker Summary container not found': "container_not_found",
+    'Data table not found': "table_not_found",
+    'Could not find header row': "no_header",
+}
+
+# Failure reasons that mean the page itself is broken (errors, timeouts, closed targets,
+# missing container) and count towards the extract_day circuit breaker
+BREAKER_FAILURES = ("exception", "container_not_found")
+
+
+def _extract_day_data(page, target_date, raw_path, fields):
+    """extract_single_day_data's body; returns (day data or None, failure reason or "")"""
     try:
-        broker_summary_data = page.evaluate("""
-            () => {
-                // Find the Broker Summary container
-                const brokerSummary = document.querySelector('div.sc-f10b1c12-0.jQepBs') || 
-                                     Array.from(document.querySelectorAll('div')).find(el => 
-                                         el.innerText && el.innerText.includes('Broker Summary') && 
-                                         el.innerText.includes('BY')
-                                     );
-                
-                if (!brokerSummary) {
-                    return { error: 'Broker Summary container not found' };
-                }
-                
-                // Extract date range from date pickers
-                let dateRange = null;
-                const datePickers = brokerSummary.querySelectorAll('div.ant-picker, .ant-picker-input input');
-                if (datePickers.length >= 2) {
-                    const startDateInput = datePickers[0].querySelector('input') || datePickers[0];
-                    const endDateInput = datePickers[1].querySelector('input') || datePickers[1];
-                    
-                    const startDate = startDateInput.value || startDateInput.getAttribute('value') || startDateInput.textContent || '';
-                    const endDate = endDateInput.value || endDateInput.getAttribute('value') || endDateInput.textContent || '';
-                    
-                    if (startDate && endDate) {
-                        dateRange = {
-                            start: startDate.trim(),
-                            end: endDate.trim()
-                        };
-                    }
-                }
-                
-                // Also try to find date range in text format
-                if (!dateRange) {
-                    const dateText = brokerSummary.innerText;
-                    const dateMatch = dateText.match(/(\\d{1,2}[\\s/\\-]\\w{3}[\\s/\\-]\\d{2,4}|\\w{3}[\\s/\\-]\\d{1,2}[\\s/\\-]\\d{2,4})/gi);
-                    if (dateMatch && dateMatch.length >= 2) {
-                        dateRange = {
-                            start: dateMatch[0].trim(),
-                            end: dateMatch[1].trim()
-                        };
-                    }
-                }
-                
-                // Find the data table with class sc-4858c0ef-27
-                const dataTable = brokerSummary.querySelector('div.sc-4858c0ef-27.fhVdvL') ||
-                                  brokerSummary.querySelector('div[class*="sc-4858c0ef-27"]') ||
-                                  Array.from(brokerSummary.querySelectorAll('div')).find(el => 
-                                      el.innerText && el.innerText.includes('BY') && 
-                                      el.innerText.includes('B.val') && el.innerText.includes('B.lot')
-                                  );
-                
-                if (!dataTable) {
-                    return { 
-                        error: 'Data table not found',
-                        containerText: brokerSummary.innerText.substring(0, 500),
-                        dateRange: dateRange
-                    };
-                }
-                
-                // Extract all text content
-                const fullText = dataTable.innerText;
-                
-                // Parse the text - split by whitespace and filter empty strings
-                const tokens = fullText.split(/\\s+/).filter(t => t.trim().length > 0);
-                
-                // Find header row
-                let headerStart = -1;
-                for (let i = 0; i < tokens.length - 7; i++) {
-                    if (tokens[i] === 'BY' && tokens[i+1] === 'B.val' && tokens[i+2] === 'B.lot' && 
-                        tokens[i+3] === 'B.avg' && tokens[i+4] === 'SL' && tokens[i+5] === 'S.val' &&
-                        tokens[i+6] === 'S.lot' && tokens[i+7] === 'S.avg') {
-                        headerStart = i;
-                        break;
-                    }
-                }
-                
-                if (headerStart === -1) {
-                    return {
-                        success: true,
-                        rawText: fullText,
-                        tokens: tokens,
-                        error: 'Could not find header row'
-                    };
-                }
-                
-                // Parse data rows (start after header which is 8 tokens)
-                const rows = [];
-                let i = headerStart + 8;
-                
-                while (i < tokens.length) {
-                    // Look for broker code pattern (2 uppercase letters)
-                    if (/^[A-Z]{2}$/.test(tokens[i])) {
-                        const buyBroker = tokens[i];
-                        
-                        // Check if we have enough tokens for a complete row (7 more)
-                        if (i + 7 < tokens.length) {
-                            const buyValue = tokens[i + 1];
-                            const buyLot = tokens[i + 2];
-                            const buyAvg = tokens[i + 3];
-                            const sellBroker = tokens[i + 4];
-                            const sellValue = tokens[i + 5];
-                            const sellLot = tokens[i + 6];
-                            const sellAvg = tokens[i + 7];
-                            
-                            // Validate - sell broker should also be 2 letters
-                            if (/^[A-Z]{2}$/.test(sellBroker)) {
-                                rows.push({
-                                    buyBroker: buyBroker,
-                                    buyValue: buyValue,
-                                    buyLot: buyLot,
-                                    buyAvg: buyAvg,
-                                    sellBroker: sellBroker,
-                                    sellValue: sellValue,
-                                    sellLot: sellLot,
-                                    sellAvg: sellAvg
-                                });
-                                i += 8;
-                                continue;
-                            }
-                        }
-                    }
-                    i++;
-                }
-                
-                return {
-                    success: true,
-                    rawText: fullText,
-                    tokens: tokens,
-                    rows: rows,
-                    headerStart: headerStart,
-                    dateRange: dateRange
-                };
-            }
-        """)
+        broker_summary_data = extract_summary_data(page, raw=bool(raw_path))
+        
+        if raw_path and broker_summary_data.get('rawText') is not None:
+            raw_path = Path(raw_path)
+            raw_path.parent.mkdir(parents=True, exist_ok=True)
+            raw_path.write_text(broker_summary_data['rawText'], encoding="utf-8")
+            log.debug(f"Raw table text saved to {raw_path}", extra=fields)
         
         if broker_summary_data.get('error'):
-            print(f"Error: {broker_summary_data['error']}")
+            log.warning(f"Extraction failed: {broker_summary_data['error']}", extra=fields)
             if 'containerText' in broker_summary_data:
-                print(f"Container text: {broker_summary_data['containerText']}")
-            return None
+                log.debug(f"Container text: {broker_summary_data['containerText']}", extra=fields)
+            elif broker_summary_data.get('rawExcerpt'):
+                log.debug(f"Raw text: {broker_summary_data['rawExcerpt']}", extra=fields)
+            return None, EXTRACTION_FAILURES.get(broker_summary_data['error'], "helper_error")
         
         if not broker_summary_data.get('success'):
-            print("Failed to extract data")
-            return None
+            log.warning("Failed to extract data", extra=fields)
+            return None, "helper_error"
         
-        rows = broker_summary_data.get('rows', [])
+        rows = rows_from_cells(broker_summary_data.get('rows', []))
         if not rows:
-            print("No data rows found")
-            print(f"Raw text: {broker_summary_data.get('rawText', '')[:500]}")
-            return None
-        
-        print(f"✅ Successfully extracted {len(rows)} broker summary rows!")
+            log.warning("No data rows found", extra=fields)
+            log.debug(f"Raw text: {broker_summary_data.get('rawExcerpt', '')}", extra=fields)
+            return None, "no_rows"
         
         date_range = broker_summary_data.get('dateRange')
         if date_range:
-            print(f"📅 Date Range: {date_range.get('start', 'N/A')} to {date_range.get('end', 'N/A')}")
+            log.debug(f"Date range shown: {date_range.get('start', 'N/A')} to {date_range.get('end', 'N/A')}", extra=fields)
         
         return {
             'rows': rows,
-            'rawText': broker_summary_data.get('rawText', ''),
-            'dateRange': date_range
-        }
+            'dateRange': date_range,
+            'date': target_date.strftime('%b %d, %Y')
+        }, ""
         
     except Exception as e:
-        print(f"Error extracting broker summary: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
+        log.error(f"Error extracting broker summary: {e}", exc_info=True, extra=fields)
+        return None, "exception"
+
+
+def warn_flagged(pipeline, stock_symbol):
+    """Point at `repair` when stored days failed validation"""
+    if pipeline.flagged:
+        log.warning(f"{pipeline.flagged} stored day(s) of {stock_symbol} were flagged by validation; "
+                    f"re-fetch them with `repair --stock {stock_symbol}`",
+                    extra={"symbol": stock_symbol, "phase": "quality"})
 
 
-def main(manual_login=False, stock_symbol=None, extract_data=False, days=1):
-    """Main entry point"""
+def extraction_status(batch, stock_symbol, stored_days, failed):
+    """Exit status of an extraction: in batch mode 1 when nothing was stored or any day errored"""
+    if not batch:
+        return 0
+    if failed:
+        log.error(f"{len(failed)} day(s) of {stock_symbol} failed: {', '.join(sorted(failed))}",
+                  extra={"symbol": stock_symbol, "phase": "extract_day"})
+        return 1
+    if not stored_days:
+        log.error(f"No day of {stock_symbol} was stored", extra={"symbol": stock_symbol, "phase": "store"})
+        return 1
+    return 0
+
+
+def dwell(batch, seconds, message):
+    """Keep the browser open for a human to look at; never in batch mode"""
+    if batch:
+        return
+    log.info(message)
+    time.sleep(seconds)
+
+
+def main(manual_login=False, stock_symbol=None, extract_data=False, days=1, store_path=None, cdp_url=None,
+         raw_dir=None, pages=1, output_format="text", batch=False, artifact_dir=None, metrics_file=None,
+         profile_dir=None, dates=None):
+    """Main entry point
+
+    Progress goes to the package logger (see logs.configure_logging); stdout
+    only carries results. output_format="ndjson" writes one JSON line per
+    extracted day to stdout as soon as it is done.
+
+    batch=True is for unattended runs: the browser is never held open,
+    failures are captured under `artifact_dir` (default
+    ~/.stockbit_data/artifacts) and raised instead of printed. Returns 1
+    when a batch extraction stored no day or any day's page errored, else 0.
+
+    `metrics_file` receives the run's metrics in Prometheus text format
+    when the run ends, for node_exporter's textfile collector.
+
+    `profile_dir` records a Chrome trace and a cProfile of the extraction
+    (see profiling.Profiler).
+
+    `dates` (datetimes) extracts exactly those trading days instead of the
+    last `days`, e.g. the flagged days a repair run re-fetches.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(OUTPUT_FORMATS)}")
+    records = sys.stdout
+    reset_run_state()
+    failed = []
+    status = 0
+    
     config = load_config()
+    if cdp_url:
+        config["cdp_url"] = cdp_url
+    if raw_dir:
+        config["raw_dir"] = raw_dir
+    if artifact_dir:
+        config["artifact_dir"] = artifact_dir
+    if metrics_file:
+        config["metrics_file"] = metrics_file
+    if batch and not config["artifact_dir"]:
+        config["artifact_dir"] = str(get_artifact_root())
+    artifacts = config["artifact_dir"] or None
     
     if manual_login:
-        print("\n" + "="*70)
-        print("MANUAL LOGIN MODE ENABLED")
-        print("="*70)
-        print("The browser will open in visible mode (non-headless).")
-        print("You can manually log in and solve the reCAPTCHA.")
-        print("The script will automatically detect when login is complete.")
-        print("="*70 + "\n")
+        log.info(
+            "Manual login mode: the browser opens in visible mode so you can log in and solve the "
+            "reCAPTCHA; login completion is detected automatically",
+            extra={"phase": "login"},
+        )
     
     with sync_playwright() as playwright:
         context, page = setup_browser(playwright, config, manual_login=manual_login)
+        pool = pool_from_config(context, page, config)
         
         try:
             success = login_to_stockbit(page, config, manual_login=manual_login)
             if success:
-                print("\n✅ Login completed successfully!")
+                log.info("Login completed successfully", extra={"phase": "login"})
+                
+                if extract_data and stock_symbol and output_format == "ndjson":
+                    with profiling.profiled(pool.page, profile_dir), IngestPipeline(store_path) as pipeline:
+                        for day_data in iter_broker_summary(
+                            pool.page, stock_symbol, days=days, dates=dates, pool=pool,
+                            raw_dir=config["raw_dir"] or None, pages=pages, artifact_dir=artifacts, failed=failed
+                        ):
+                            pipeline.submit(stock_symbol, day_data)
+                            records.write(json.dumps(day_record(day_data)) + "\n")
+                            records.flush()
+                    log.info(f"Stored {pipeline.stored} day(s) of {stock_symbol} broker summary",
+                             extra={"symbol": stock_symbol, "phase": "store"})
+                    warn_flagged(pipeline, stock_symbol)
+                    status = extraction_status(batch, stock_symbol, pipeline.stored, failed)
                 
-                if extract_data and stock_symbol:
-                    broker_data = extract_broker_summary(page, stock_symbol, days=days)
+                elif extract_data and stock_symbol:
+                    # Days are stored on a worker thread while the browser extracts the next one
+                    with profiling.profiled(pool.page, profile_dir), IngestPipeline(store_path) as pipeline:
+                        broker_data = extract_broker_summary(
+                            pool.page, stock_symbol, days=days, dates=dates, pool=pool,
+                            raw_dir=config["raw_dir"] or None, on_day=pipeline.submit, pages=pages,
+                            artifact_dir=artifacts, failed=failed
+                        )
+                    stored_days = pipeline.stored
+                    if stored_days:
+                        log.info(f"Stored {stored_days} day(s) of {stock_symbol} broker summary",
+                                 extra={"symbol": stock_symbol, "phase": "store"})
+                    warn_flagged(pipeline, stock_symbol)
+                    status = extraction_status(batch, stock_symbol, stored_days, failed)
                     
                     # Handle multi-day extraction
                     if broker_data and broker_data.get('all_days'):
@@ -1603,43 +1206,57 @@ def main(manual_login=False, stock_symbol=None, extract_data=False, days=1):
                         print("="*100)
                     elif broker_data:
                         print("\n" + "="*70)
-                        print("BROKER SUMMARY DATA (Raw)")
+                        print("BROKER SUMMARY DATA")
                         print("="*70)
-                        print(broker_data.get('rawText', 'No data'))
+                        print(broker_data.get('summary', 'No data'))
                         print("="*70)
                 
                 if manual_login:
                     if not extract_data:
-                        print("Browser will stay open for 30 seconds for you to verify...")
-                        time.sleep(30)
+                        dwell(batch, 30, "Browser will stay open for 30 seconds for you to verify...")
                 else:
-                    print("Browser will stay open for 10 seconds...")
-                    time.sleep(10)
+                    dwell(batch, 10, "Browser will stay open for 10 seconds...")
             else:
-                print("\n❌ Login failed.")
+                log.error("Login failed", extra={"phase": "login"})
+                if batch:
+                    # Captured and re-raised below
+                    raise Exception("Login failed")
+                if artifacts:
+                    capture_failure(pool.page, artifacts, stock_symbol, "login failed")
                 if manual_login:
-                    print("Browser will stay open for 60 seconds for debugging...")
-                    time.sleep(60)
+                    dwell(batch, 60, "Browser will stay open for 60 seconds for debugging...")
                 else:
-                    print("Browser will stay open for 20 seconds...")
-                    time.sleep(20)
+                    dwell(batch, 20, "Browser will stay open for 20 seconds...")
         except Exception as e:
-            print(f"Error: {str(e)}")
-            print("Browser will stay open for 20 seconds for debugging...")
-            time.sleep(20)
+            log.error(f"Run failed: {e}", extra={"symbol": stock_symbol})
+            if artifacts:
+                capture_failure(pool.page, artifacts, stock_symbol, e)
+            if batch:
+                raise
+            dwell(batch, 20, "Browser will stay open for 20 seconds for debugging...")
         finally:
-            if not extract_data or not manual_login:
-                context.close()
+            if config["metrics_file"]:
+                try:
+                    log.info(f"Metrics written to {REGISTRY.write_textfile(config['metrics_file'])}")
+                except OSError as e:
+                    log.warning(f"Could not write metrics to {config['metrics_file']}: {e}")
+            if batch or not extract_data or not manual_login:
+                pool.close()
+                close_browser(context, pool.page)
             else:
-                print("\nBrowser will remain open. Press Ctrl+C to close.")
+                log.info("Browser will remain open. Press Ctrl+C to close.")
                 try:
                     while True:
                         time.sleep(1)
                 except KeyboardInterrupt:
-                    print("\nClosing browser...")
-                    context.close()
+                    log.info("Closing browser")
+                    # The pooled pages first: over CDP the shared browser outlives this run
+                    pool.close()
+                    close_browser(context, pool.page)
+    return status
 
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
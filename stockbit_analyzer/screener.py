@@ -0,0 +1,159 @@
+from pathlib import Path
+
+import numpy as np
+
+from stockbit_analyzer.analytics import trailing_streak
+from stockbit_analyzer.brokers import foreign_codes
+from stockbit_analyzer.matrix import BrokerMatrix
+
+
+SIGNALS = (
+    "top3_concentration",
+    "foreign_net_value",
+    "accumulation_streak",
+    "avg_gap_pct",
+)
+
+
+def lot_weighted(avg, lot):
+    """Per-broker sum of avg * lot over days, treating missing averages as zero"""
+    weighted = avg * lot
+    weighted[np.isnan(weighted)] = 0
+    return weighted.sum(axis=0)
+
+
+def list_matrix_symbols(root):
+    """Symbols that have a broker x day matrix under `root`"""
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted(path.parent.name for path in root.glob("*/meta.json"))
+
+
+def window_slice(matrix, start=None, end=None, days=None):
+    """Day slice of a matrix for [start, end], narrowed to the last `days` trading days"""
+    window = matrix.day_slice(start, end)
+    if days:
+        window = slice(max(window.start, window.stop - days), window.stop)
+    return window
+
+
+def load_window(root, symbols, start=None, end=None, days=None):
+    """Per-broker window aggregates of every symbol, padded into (symbols x brokers) arrays"""
+    per_symbol = []
+    for symbol in symbols:
+        matrix = BrokerMatrix(root, symbol)
+        window = window_slice(matrix, start, end, days)
+        if window.stop <= window.start or not matrix.brokers:
+            continue
+
+        def view(metric):
+            return matrix.read_days(metric, window)
+
+        buy_lot = view("buy_lot")
+        sell_lot = view("sell_lot")
+        net_value = view("net_value")
+        per_symbol.append((
+            symbol,
+            matrix.brokers,
+            view("buy_value").sum(axis=0),
+            net_value.sum(axis=0),
+            buy_lot.sum(axis=0),
+            sell_lot.sum(axis=0),
+            lot_weighted(view("buy_avg"), buy_lot),
+            lot_weighted(view("sell_avg"), sell_lot),
+            trailing_streak(net_value.T > 0),
+        ))
+
+    width = max((len(entry[1]) for entry in per_symbol), default=0)
+    n_symbols = len(per_symbol)
+
+    window = {
+        "symbols": np.array([entry[0] for entry in per_symbol], dtype=object),
+        "brokers": np.full((n_symbols, width), "", dtype="<U4"),
+    }
+    columns = ("buy_value", "net_value", "buy_lot", "sell_lot", "buy_lot_x_avg", "sell_lot_x_avg", "streak")
+    for column in columns:
+        window[column] = np.zeros((n_symbols, width), dtype=np.float64)
+
+    for row, entry in enumerate(per_symbol):
+        n_brokers = len(entry[1])
+        window["brokers"][row, :n_brokers] = entry[1]
+        for column, values in zip(columns, entry[2:]):
+            window[column][row, :n_brokers] = values
+    return window
+
+
+def compute_signals(window, foreign_brokers=None):
+    """Compute every screening signal for all symbols in one vectorized pass
+
+    `foreign_brokers` defaults to the brokers registered as foreign (see brokers.py).
+    """
+    if foreign_brokers is None:
+        foreign_brokers = foreign_codes()
+    buy_value = window["buy_value"]
+    total_buy = buy_value.sum(axis=1)
+    top3_buy = np.sort(buy_value, axis=1)[:, -3:].sum(axis=1)
+
+    foreign_mask = np.isin(window["brokers"], list(foreign_brokers))
+
+    streak = window["streak"]
+    streak_slot = streak.argmax(axis=1) if streak.shape[1] else np.zeros(len(streak), dtype=np.int64)
+    rows = np.arange(len(streak))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        top3_concentration = np.where(total_buy > 0, top3_buy / total_buy, np.nan)
+        buy_avg = window["buy_lot_x_avg"].sum(axis=1) / window["buy_lot"].sum(axis=1)
+        sell_avg = window["sell_lot_x_avg"].sum(axis=1) / window["sell_lot"].sum(axis=1)
+        avg_gap_pct = (buy_avg - sell_avg) / sell_avg * 100
+
+    return {
+        "symbol": window["symbols"],
+        "top3_concentration": top3_concentration,
+        "foreign_net_value": (window["net_value"] * foreign_mask).sum(axis=1),
+        "accumulation_streak": streak[rows, streak_slot] if streak.shape[1] else np.zeros(len(rows)),
+        "streak_broker": window["brokers"][rows, streak_slot] if streak.shape[1] else np.full(len(rows), "", dtype="<U4"),
+        "avg_gap_pct": avg_gap_pct,
+    }
+
+
+def screen(root, signal="top3_concentration", top=20, start=None, end=None, days=None,
+           foreign_brokers=None, symbols=None):
+    """Rank stored symbols by `signal`, largest first; returns a list of dicts"""
+    if signal not in SIGNALS:
+        raise ValueError(f"Unknown signal {signal!r}; expected one of {', '.join(SIGNALS)}")
+
+    if symbols is None:
+        symbols = list_matrix_symbols(root)
+    signals = compute_signals(load_window(root, symbols, start, end, days), foreign_brokers)
+
+    # NaN signals (no buy side data) sort last
+    order = np.argsort(-np.nan_to_num(signals[signal], nan=-np.inf), kind="stable")[:top]
+    return [
+        {key: (values[i].item() if hasattr(values[i], "item") else values[i]) for key, values in signals.items()}
+        for i in order
+    ]
+
+
+def format_screen_table(results, signal):
+    """Format screener results as a table"""
+    if not results:
+        return "No stored symbols to screen"
+
+    lines = [
+        f"Ranked by {signal}",
+        "",
+        f"{'#':>3} {'Symbol':<8} {'Top3 conc':>10} {'Foreign net val':>18} {'Streak':>7} {'By':<4} {'Avg gap %':>10}",
+        "-" * 67,
+    ]
+    for rank, result in enumerate(results, 1):
+        lines.append(
+            f"{rank:>3} "
+            f"{result['symbol']:<8} "
+            f"{result['top3_concentration']:>10.1%} "
+            f"{result['foreign_net_value']:>18,.0f} "
+            f"{result['accumulation_streak']:>7.0f} "
+            f"{result['streak_broker']:<4} "
+            f"{result['avg_gap_pct']:>10.2f}"
+        )
+    return "\n".join(lines)
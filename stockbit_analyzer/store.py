@@ -0,0 +1,276 @@
+import os
+import sqlite3
+from pathlib import Path
+
+from stockbit_analyzer.brokers import broker_ids, sync_registry
+from stockbit_analyzer.parsing import parse_number, to_iso_date
+
+
+DEFAULT_STORE_PATH = Path.home() / ".stockbit_data" / "broker_summary.db"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS broker_rows (
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        side TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        broker TEXT NOT NULL,
+        value REAL,
+        lot REAL,
+        avg REAL,
+        broker_id INTEGER,
+        PRIMARY KEY (symbol, date, side, rank)
+    );
+
+    -- Inverted index: broker -> (date, symbol) net activity, clustered by broker and date
+    CREATE TABLE IF NOT EXISTS broker_activity (
+        broker TEXT NOT NULL,
+        date TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        net_value REAL NOT NULL,
+        net_lot REAL NOT NULL,
+        buy_value REAL NOT NULL,
+        sell_value REAL NOT NULL,
+        broker_id INTEGER,
+        PRIMARY KEY (broker, date, symbol)
+    ) WITHOUT ROWID;
+
+    -- Symbol-first access to the same entries; carries the totals so per-symbol
+    -- summaries and rankings are answered from the index alone
+    CREATE INDEX IF NOT EXISTS broker_activity_symbol_date
+        ON broker_activity (symbol, date, net_value, net_lot, buy_value, sell_value);
+
+    -- Broker master data synced from the registry (see brokers.py); ids of codes
+    -- missing from the registry start at brokers.UNREGISTERED_ID_BASE
+    CREATE TABLE IF NOT EXISTS brokers (
+        id INTEGER PRIMARY KEY,
+        code TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL DEFAULT '',
+        type TEXT NOT NULL DEFAULT 'unknown',
+        category TEXT NOT NULL DEFAULT ''
+    );
+
+    CREATE TABLE IF NOT EXISTS trading_days (
+        date TEXT PRIMARY KEY
+    ) WITHOUT ROWID;
+
+    -- Intraday snapshots from `watch`: only the (side, broker) rows that changed since the
+    -- previous snapshot, keyed by broker rather than rank because ranks shift all day
+    CREATE TABLE IF NOT EXISTS intraday_rows (
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        side TEXT NOT NULL,
+        broker TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        value REAL,
+        lot REAL,
+        avg REAL,
+        removed INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (symbol, date, side, broker, ts)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS intraday_snapshots (
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        changed INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (symbol, date, ts)
+    ) WITHOUT ROWID;
+
+    -- Validation result of each stored day (see quality.py); flags is '' when the day looked right
+    CREATE TABLE IF NOT EXISTS day_quality (
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        flags TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        checked TEXT NOT NULL,
+        PRIMARY KEY (symbol, date)
+    ) WITHOUT ROWID;
+"""
+
+# Per-broker net activity of the broker_rows selected by the trailing WHERE clause
+INDEX_ACTIVITY_SQL = """
+    INSERT INTO broker_activity (broker, date, symbol, net_value, net_lot, buy_value, sell_value, broker_id)
+    SELECT
+        broker, date, symbol,
+        SUM(CASE WHEN side = 'B' THEN COALESCE(value, 0) ELSE -COALESCE(value, 0) END),
+        SUM(CASE WHEN side = 'B' THEN COALESCE(lot, 0) ELSE -COALESCE(lot, 0) END),
+        SUM(CASE WHEN side = 'B' THEN COALESCE(value, 0) ELSE 0 END),
+        SUM(CASE WHEN side = 'S' THEN COALESCE(value, 0) ELSE 0 END),
+        MAX(broker_id)
+    FROM broker_rows
+"""
+
+BUY = "B"
+SELL = "S"
+
+
+def get_store_path(path=None):
+    """Resolve the store location from an explicit path, STOCKBIT_STORE_PATH or the default"""
+    if path:
+        return Path(path)
+    env_path = os.getenv("STOCKBIT_STORE_PATH")
+    if env_path:
+        return Path(env_path)
+    return DEFAULT_STORE_PATH
+
+
+def open_store(path=None, shared=False):
+    """Open (and create if needed) the local SQLite store of broker summary rows
+
+    `shared` lets other threads use the connection; they must serialize access.
+    """
+    store_path = get_store_path(path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(str(store_path), check_same_thread=not shared)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    added = _add_broker_id_columns(conn)
+    sync_registry(conn)
+    if added:
+        _fill_broker_ids(conn, added)
+    return conn
+
+
+def open_store_readonly(path=None):
+    """Read-only connection to the store, shareable across threads (callers serialize access)
+
+    The store is opened for writing once first, so its schema exists and
+    the broker registry is synced; the returned connection can't write.
+    """
+    store_path = get_store_path(path)
+    open_store(store_path).close()
+    return sqlite3.connect(f"{store_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+
+
+def begin_write(conn):
+    """Take the store's write lock now rather than at the first write
+
+    Reads that decide what to write (e.g. allocating ids for new broker
+    codes) then can't interleave with another connection's writer; waits
+    up to the connection timeout for the lock.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def _add_broker_id_columns(conn):
+    # Stores created before broker ids existed get the column; returns the tables changed
+    added = []
+    for table in ("broker_rows", "broker_activity"):
+        if "broker_id" not in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN broker_id INTEGER")
+            added.append(table)
+    return added
+
+
+def _fill_broker_ids(conn, tables):
+    with conn:
+        begin_write(conn)
+        for table in tables:
+            broker_ids(conn, [row[0] for row in conn.execute(f"SELECT DISTINCT broker FROM {table}")])
+            conn.execute(
+                f"UPDATE {table} SET broker_id = (SELECT id FROM brokers WHERE brokers.code = {table}.broker)"
+            )
+
+
+def split_sides(rows):
+    """Split extracted table rows into (side, rank, broker, value, lot, avg) tuples"""
+    side_rows = []
+    for rank, row in enumerate(rows):
+        if row.get("buyBroker"):
+            side_rows.append((
+                BUY, rank, row["buyBroker"],
+                parse_number(row.get("buyValue")),
+                parse_number(row.get("buyLot")),
+                parse_number(row.get("buyAvg")),
+            ))
+        if row.get("sellBroker"):
+            side_rows.append((
+                SELL, rank, row["sellBroker"],
+                parse_number(row.get("sellValue")),
+                parse_number(row.get("sellLot")),
+                parse_number(row.get("sellAvg")),
+            ))
+    return side_rows
+
+
+def save_day(conn, symbol, date, rows):
+    """Replace the stored broker summary of one symbol on one date"""
+    iso_date = to_iso_date(date)
+    side_rows = split_sides(rows)
+
+    with conn:
+        begin_write(conn)
+        ids = broker_ids(conn, [side_row[2] for side_row in side_rows])
+        conn.execute(
+            "DELETE FROM broker_rows WHERE symbol = ? AND date = ?",
+            (symbol, iso_date),
+        )
+        conn.executemany(
+            "INSERT INTO broker_rows (symbol, date, side, rank, broker, value, lot, avg, broker_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(symbol, iso_date) + side_row + (ids[side_row[2]],) for side_row in side_rows],
+        )
+        conn.execute(
+            "DELETE FROM broker_activity WHERE symbol = ? AND date = ?",
+            (symbol, iso_date),
+        )
+        conn.execute(
+            INDEX_ACTIVITY_SQL + " WHERE symbol = ? AND date = ? GROUP BY broker",
+            (symbol, iso_date),
+        )
+        conn.execute("INSERT OR IGNORE INTO trading_days (date) VALUES (?)", (iso_date,))
+    return len(side_rows)
+
+
+def rebuild_broker_index(conn):
+    """Recompute the broker_activity index and trading calendar from every stored row"""
+    with conn:
+        conn.execute("DELETE FROM broker_activity")
+        conn.execute(INDEX_ACTIVITY_SQL + " GROUP BY symbol, date, broker")
+        conn.execute("INSERT OR IGNORE INTO trading_days (date) SELECT DISTINCT date FROM broker_rows")
+    return conn.execute("SELECT COUNT(*) FROM broker_activity").fetchone()[0]
+
+
+def load_rows(conn, symbol, start=None, end=None):
+    """Load (date, side, broker, value, lot, avg) rows for a symbol, optionally within [start, end]"""
+    query = "SELECT date, side, broker, value, lot, avg FROM broker_rows WHERE symbol = ?"
+    params = [symbol]
+    if start:
+        query += " AND date >= ?"
+        params.append(to_iso_date(start))
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    query += " ORDER BY date, side, rank"
+    return conn.execute(query, params).fetchall()
+
+
+def list_symbols(conn):
+    """List all symbols present in the store"""
+    return [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM broker_rows ORDER BY symbol")]
+
+
+def list_dates(conn, symbol, start=None, end=None, last=None):
+    """List the stored trading dates of a symbol, oldest first
+
+    Optionally only those within [start, end], and of those only the `last` N.
+    """
+    query = "SELECT DISTINCT date FROM broker_rows WHERE symbol = ?"
+    params = [symbol]
+    if start:
+        query += " AND date >= ?"
+        params.append(to_iso_date(start))
+    if end:
+        query += " AND date <= ?"
+        params.append(to_iso_date(end))
+    if last:
+        query += " ORDER BY date DESC LIMIT ?"
+        params.append(last)
+        return [row[0] for row in conn.execute(query, params)][::-1]
+    return [row[0] for row in conn.execute(query + " ORDER BY date", params)]
@@ -0,0 +1,60 @@
+import math
+
+from stockbit_analyzer.brokers import registry_ids
+from stockbit_analyzer.parsing import to_iso_date
+from stockbit_analyzer.store import split_sides
+
+
+def format_broker_summary_table(rows, date_range=None):
+    """Format broker summary rows into a nicely formatted table"""
+    formatted_rows = []
+    
+    # Add date range header if available
+    if date_range:
+        start_date = date_range.get('start', 'N/A')
+        end_date = date_range.get('end', 'N/A')
+        formatted_rows.append(f"📅 Date Range: {start_date} to {end_date}")
+        formatted_rows.append("")
+    
+    # Table header
+    header = f"{'BY':<6} {'B.val':<12} {'B.lot':<10} {'B.avg':<8} | {'SL':<6} {'S.val':<12} {'S.lot':<10} {'S.avg':<8}"
+    separator = "-" * 100
+    
+    formatted_rows.extend([header, separator])
+    
+    # Format each row
+    for row in rows:
+        formatted_row = (
+            f"{row['buyBroker']:<6} "
+            f"{row['buyValue']:<12} "
+            f"{row['buyLot']:<10} "
+            f"{row['buyAvg']:<8} | "
+            f"{row['sellBroker']:<6} "
+            f"{row['sellValue']:<12} "
+            f"{row['sellLot']:<10} "
+            f"{row['sellAvg']:<8}"
+        )
+        formatted_rows.append(formatted_row)
+    
+    return "\n".join(formatted_rows)
+
+
+def day_record(day_data):
+    """Typed, JSON-ready form of one extracted day: ISO date and numeric per-side rows
+
+    Rows carry the broker's registry id (None for codes not in the registry).
+    """
+    def number(value):
+        return None if math.isnan(value) else value
+    
+    ids = registry_ids()
+    return {
+        'symbol': day_data.get('symbol'),
+        'date': to_iso_date(day_data['date']),
+        'date_range': day_data.get('dateRange'),
+        'rows': [
+            {'side': side, 'rank': rank, 'broker': broker, 'broker_id': ids.get(broker),
+             'value': number(value), 'lot': number(lot), 'avg': number(avg)}
+            for side, rank, broker, value, lot, avg in split_sides(day_data['rows'])
+        ],
+    }
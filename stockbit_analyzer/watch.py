@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+
+from playwright.sync_api import sync_playwright
+
+from stockbit_analyzer.intraday import TIME_FORMAT, diff_snapshot, load_snapshot, save_snapshot, snapshot_map
+from stockbit_analyzer.logs import get_logger
+from stockbit_analyzer.parsing import ISO_DATE_FORMAT
+from stockbit_analyzer.pool import pool_from_config
+from stockbit_analyzer.runner import (
+    close_browser, extract_day_steps, interleave, load_config, login_to_stockbit, setup_browser,
+)
+from stockbit_analyzer.store import open_store
+
+
+DEFAULT_INTERVAL = 300
+
+log = get_logger(__name__)
+
+
+def poll_snapshots(pool, symbols, day):
+    """Re-read the day's table on each symbol's page, interleaving their waits; day dicts in symbol order"""
+    return interleave([
+        pool.run_steps(lambda page: extract_day_steps(page, day), index)
+        for index in range(len(symbols))
+    ])
+
+
+def watch_symbols(pool, symbols, store_path=None, interval=DEFAULT_INTERVAL, rounds=None, until=None):
+    """Snapshot the broker summary of `symbols` every `interval` seconds, storing only what changed
+
+    Each symbol keeps its own pooled page, opened once; a round only
+    re-selects today in the date picker and reads the table. Every snapshot
+    is diffed against the previous one per (side, broker), and only the
+    changed rows are stored with the snapshot time (see intraday.py).
+    Stops after `rounds` rounds or once the clock passes `until` (a time).
+    Returns the number of rounds taken.
+    """
+    pool.ensure_size(len(symbols))
+    for index, symbol in enumerate(symbols):
+        pool.open_symbol(symbol, index)
+
+    today = datetime.now()
+    iso_date = today.strftime(ISO_DATE_FORMAT)
+    conn = open_store(store_path)
+    taken = 0
+    try:
+        # Carry on from snapshots already stored today, e.g. after a restart
+        previous = {symbol: load_snapshot(conn, symbol, iso_date) for symbol in symbols}
+        while True:
+            started = time.monotonic()
+            results = poll_snapshots(pool, symbols, today)
+            ts = datetime.now().strftime(TIME_FORMAT)
+            for symbol, day_data in zip(symbols, results):
+                fields = {"symbol": symbol, "date": iso_date, "phase": "watch"}
+                if not day_data:
+                    log.warning(f"No table for {symbol} at {ts}; keeping the previous snapshot", extra=fields)
+                    continue
+                current = snapshot_map(day_data["rows"])
+                changes = diff_snapshot(previous[symbol], current)
+                save_snapshot(conn, symbol, iso_date, ts, changes, len(current))
+                previous[symbol] = current
+                log.info(f"{symbol} {ts}: {len(changes)} of {len(current)} broker rows changed",
+                         extra=dict(fields, rows=len(changes)))
+            taken += 1
+
+            if rounds and taken >= rounds:
+                return taken
+            wait = max(0.0, started + interval - time.monotonic())
+            if until and (datetime.now() + timedelta(seconds=wait)).time() > until:
+                log.info(f"Stopping watch at {until.strftime('%H:%M')}", extra={"phase": "watch"})
+                return taken
+            time.sleep(wait)
+    finally:
+        conn.close()
+
+
+def watch(symbols, interval=DEFAULT_INTERVAL, store_path=None, manual_login=False, cdp_url=None,
+          rounds=None, until=None):
+    """Log in once and run watch_symbols() until it stops or Ctrl+C"""
+    config = load_config()
+    if cdp_url:
+        config["cdp_url"] = cdp_url
+
+    with sync_playwright() as playwright:
+        context, page = setup_browser(playwright, config, manual_login=manual_login)
+        pool = pool_from_config(context, page, config)
+        try:
+            if not login_to_stockbit(page, config, manual_login=manual_login):
+                raise Exception("Login failed; not watching")
+            log.info(f"Watching {', '.join(symbols)} every {interval}s (Ctrl+C to stop)", extra={"phase": "watch"})
+            watch_symbols(pool, symbols, store_path=store_path, interval=interval, rounds=rounds, until=until)
+        except KeyboardInterrupt:
+            log.info("Stopping watch", extra={"phase": "watch"})
+        finally:
+            pool.close()
+            close_browser(context, pool.page)
@@ -0,0 +1,31 @@
+import pytest
+
+from stockbit_analyzer.store import open_store
+
+
+def table_row(buy, sell, buy_value="1.2B", sell_value="1.2B", buy_lot="1,000", sell_lot="1,000",
+              buy_avg="1,200", sell_avg="1,200"):
+    """One extracted Broker Summary row dict"""
+    return {
+        "buyBroker": buy, "buyValue": buy_value, "buyLot": buy_lot, "buyAvg": buy_avg,
+        "sellBroker": sell, "sellValue": sell_value, "sellLot": sell_lot, "sellAvg": sell_avg,
+    }
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    # Keep the store and the local broker registry out of the real ~/.stockbit_data
+    monkeypatch.setenv("STOCKBIT_STORE_PATH", str(tmp_path / "store" / "broker_summary.db"))
+    monkeypatch.setenv("STOCKBIT_BROKERS_FILE", str(tmp_path / "brokers.csv"))
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return tmp_path / "store" / "broker_summary.db"
+
+
+@pytest.fixture
+def conn(store_path):
+    conn = open_store(store_path)
+    yield conn
+    conn.close()
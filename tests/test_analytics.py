@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+
+from conftest import table_row
+from stockbit_analyzer.analytics import broker_flow, compute_flow, rows_to_arrays
+from stockbit_analyzer.store import BUY, SELL, save_day
+
+
+def flow_of(rows):
+    flow = compute_flow(rows_to_arrays(rows))
+    return {broker: index for index, broker in enumerate(flow["brokers"])}, flow
+
+
+def test_net_flow_and_lot_weighted_averages():
+    index, flow = flow_of([
+        ("2026-01-20", BUY, "YP", 1000.0, 10.0, 100.0),
+        ("2026-01-21", BUY, "YP", 3300.0, 30.0, 110.0),
+        ("2026-01-21", SELL, "YP", 500.0, 5.0, 100.0),
+    ])
+    yp = index["YP"]
+    assert flow["net_value"][yp] == 3800.0
+    assert flow["net_lot"][yp] == 35.0
+    assert flow["buy_avg"][yp] == 107.5
+    assert flow["avg_spread"][yp] == 7.5
+    assert list(flow["dates"]) == ["2026-01-20", "2026-01-21"]
+
+
+def test_rows_without_an_average_do_not_pull_it_down():
+    index, flow = flow_of([
+        ("2026-01-20", BUY, "YP", 1000.0, 10.0, 100.0),
+        ("2026-01-21", BUY, "YP", 500.0, 10.0, math.nan),
+        ("2026-01-21", SELL, "YP", 500.0, 10.0, None),
+    ])
+    yp = index["YP"]
+    assert flow["buy_avg"][yp] == 100.0
+    assert flow["buy_lot"][yp] == 20.0
+    assert math.isnan(flow["sell_avg"][yp])
+
+
+def test_streaks_count_trailing_days():
+    index, flow = flow_of([
+        ("2026-01-19", SELL, "YP", 100.0, 1.0, 1.0),
+        ("2026-01-20", BUY, "YP", 100.0, 1.0, 1.0),
+        ("2026-01-21", BUY, "YP", 100.0, 1.0, 1.0),
+        ("2026-01-19", BUY, "PD", 100.0, 1.0, 1.0),
+        ("2026-01-20", SELL, "PD", 100.0, 1.0, 1.0),
+        ("2026-01-21", SELL, "PD", 100.0, 1.0, 1.0),
+        ("2026-01-21", BUY, "CC", 100.0, 1.0, 1.0),
+        ("2026-01-21", SELL, "CC", 100.0, 1.0, 1.0),
+    ])
+    assert flow["streak"][index["YP"]] == 2
+    assert flow["streak"][index["PD"]] == -2
+    assert flow["streak"][index["CC"]] == 0
+    assert flow["accumulation_days"][index["YP"]] == 2
+    assert flow["active_days"][index["CC"]] == 0
+
+
+def test_empty_input():
+    flow = compute_flow(rows_to_arrays([]))
+    assert len(flow["brokers"]) == 0
+    assert len(flow["dates"]) == 0
+    assert flow["streak"].shape == (0,)
+
+
+def test_broker_flow_ranks_by_net_value(conn):
+    save_day(conn, "BUMI", "2026-01-20", [
+        table_row("YP", "PD", buy_value="300", sell_value="100"),
+        table_row("PD", "CC", buy_value="50", sell_value="200"),
+    ])
+    flow = broker_flow(conn, "BUMI")
+    assert list(flow["brokers"]) == ["YP", "PD", "CC"]
+    np.testing.assert_array_equal(flow["net_value"], [300.0, -50.0, -200.0])
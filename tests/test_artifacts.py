@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from stockbit_analyzer.artifacts import CONTAINER_FILE, META_FILE, PAGE_FILE, html_to_text, replay_artifact
+
+
+TABLE_HTML = """
+<div class="broker-summary"><style>.x { color: red }</style><script>var rows = 1;</script>
+  <table>
+    <thead><tr><th>BY</th><th>B.val</th><th>B.lot</th><th>B.avg</th>
+      <th>SL</th><th>S.val</th><th>S.lot</th><th>S.avg</th></tr></thead>
+    <tbody>
+      <tr><td>YP</td><td>1.2B</td><td>1,000</td><td>1,200</td><td>PD</td><td>900M</td><td>750</td><td>1,198</td></tr>
+      <tr><td>CC</td><td>500M</td><td>400</td><td>1,250</td><td>NI</td><td>300M</td><td>250</td><td>1,201</td></tr>
+    </tbody>
+  </table>
+</div>
+"""
+
+
+def test_html_to_text_separates_cells_and_drops_scripts():
+    text = html_to_text("<table><tr><td>YP</td><td>1.2B</td></tr></table><script>x()</script><p>end</p>")
+    assert text.split() == ["YP", "1.2B", "end"]
+
+
+def test_replay_artifact_directory(tmp_path):
+    artifact = tmp_path / "BUMI" / "2026-01-20-093012"
+    artifact.mkdir(parents=True)
+    (artifact / CONTAINER_FILE).write_text(TABLE_HTML, encoding="utf-8")
+    (artifact / META_FILE).write_text(json.dumps({"symbol": "BUMI", "date": "2026-01-20"}), encoding="utf-8")
+
+    day = replay_artifact(artifact)
+    assert (day["symbol"], day["date"]) == ("BUMI", "2026-01-20")
+    assert day["source"].endswith(CONTAINER_FILE)
+    assert [(row["buyBroker"], row["sellBroker"]) for row in day["rows"]] == [("YP", "PD"), ("CC", "NI")]
+    assert day["rows"][0]["buyValue"] == "1.2B"
+    assert "error" not in day
+
+
+def test_replay_whole_page_without_header(tmp_path):
+    artifact = tmp_path / "artifact"
+    artifact.mkdir()
+    (artifact / PAGE_FILE).write_text("<html><body><p>Session expired, please log in</p></body></html>")
+
+    day = replay_artifact(artifact)
+    assert day["rows"] == []
+    assert day["error"] == "Could not find header row"
+    assert day["rawExcerpt"] == "Session expired, please log in"
+
+
+def test_replay_raw_dump(tmp_path):
+    dump = tmp_path / "BUMI" / "2026-01-20.txt"
+    dump.parent.mkdir()
+    dump.write_text("BY B.val B.lot B.avg SL S.val S.lot S.avg\nYP 1.2B 1,000 1,200 PD 900M 750 1,198\n")
+
+    day = replay_artifact(dump)
+    assert (day["symbol"], day["date"]) == ("BUMI", "2026-01-20")
+    assert day["rows"][0]["sellAvg"] == "1,198"
+
+
+def test_replay_empty_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        replay_artifact(tmp_path)
@@ -0,0 +1,46 @@
+from conftest import table_row
+from stockbit_analyzer.broker_index import broker_top_symbols, last_trading_days
+from stockbit_analyzer.store import rebuild_broker_index, save_day
+
+
+def test_broker_activity_index_nets_both_sides(conn):
+    save_day(conn, "BUMI", "2026-01-20", [
+        table_row("YP", "PD", buy_value="300", sell_value="100", buy_lot="3", sell_lot="1"),
+        table_row("PD", "YP", buy_value="50", sell_value="20", buy_lot="5", sell_lot="2"),
+    ])
+    activity = {
+        broker: (net_value, net_lot)
+        for broker, net_value, net_lot in conn.execute("SELECT broker, net_value, net_lot FROM broker_activity")
+    }
+    assert activity == {"YP": (280.0, 1.0), "PD": (-50.0, 4.0)}
+
+    conn.execute("DELETE FROM broker_activity")
+    assert rebuild_broker_index(conn) == 2
+
+
+
+
+def test_last_trading_days(conn):
+    for day in ("2026-01-19", "2026-01-20", "2026-01-21"):
+        save_day(conn, "BUMI", day, [table_row("YP", "PD")])
+    assert last_trading_days(conn, 2) == ["2026-01-20", "2026-01-21"]
+    assert last_trading_days(conn, 2, end="2026-01-20") == ["2026-01-19", "2026-01-20"]
+
+
+def test_broker_top_symbols_over_the_window(conn):
+    save_day(conn, "BUMI", "2026-01-19", [table_row("YP", "PD", buy_value="1000", sell_value="1000")])
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD", buy_value="100", sell_value="100")])
+    save_day(conn, "BBCA", "2026-01-21", [table_row("YP", "PD", buy_value="300", sell_value="300")])
+    save_day(conn, "TLKM", "2026-01-21", [table_row("PD", "YP", buy_value="50", sell_value="50")])
+
+    bought = broker_top_symbols(conn, "YP", days=2)
+    assert [(result["symbol"], result["net_value"]) for result in bought] == [("BBCA", 300.0), ("BUMI", 100.0)]
+    assert (bought[0]["start"], bought[0]["end"]) == ("2026-01-20", "2026-01-21")
+
+    sold = broker_top_symbols(conn, "YP", days=2, net_sell=True)
+    assert [(result["symbol"], result["net_value"]) for result in sold] == [("TLKM", -50.0)]
+    assert broker_top_symbols(conn, "YP", days=2, limit=1)[0]["symbol"] == "BBCA"
+
+
+def test_broker_top_symbols_on_an_empty_store(conn):
+    assert broker_top_symbols(conn, "YP") == []
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer.analytics import group_flow
+from stockbit_analyzer.brokers import (
+    UNREGISTERED_ID_BASE, foreign_codes, get_registry_path, load_registry, registry_ids, sync_registry,
+    update_local_entry,
+)
+from stockbit_analyzer.store import open_store, save_day
+
+
+def write_local(rows):
+    path = get_registry_path()
+    path.write_text("id,code,name,type,category\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    # Registry reads are cached per file mtime; make every rewrite visible
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_bundled_registry():
+    registry = load_registry()
+    assert registry["AK"]["type"] == "foreign"
+    assert registry["YP"]["type"] == "local"
+    assert "AK" in foreign_codes() and "YP" not in foreign_codes()
+    assert all(0 < broker_id < UNREGISTERED_ID_BASE for broker_id in registry_ids().values())
+
+
+def test_local_file_overrides_and_extends_the_bundled_one():
+    write_local(["20,YP,Mirae,foreign,institutional", "900,ZZ,Test Sekuritas,local,retail"])
+    registry = load_registry()
+    assert registry["YP"]["type"] == "foreign"
+    assert registry["ZZ"] == {"id": 900, "code": "ZZ", "name": "Test Sekuritas", "type": "local", "category": "retail"}
+
+
+@pytest.mark.parametrize("row", [
+    "900,ZZ,Test,offshore,",
+    f"{UNREGISTERED_ID_BASE},ZZ,Test,local,",
+    "1,ZZ,Takes AK's id,local,",
+])
+def test_invalid_local_entries(row):
+    write_local([row])
+    with pytest.raises(ValueError):
+        load_registry()
+
+
+def test_update_local_entry():
+    entry = update_local_entry("zz", name="Test Sekuritas", broker_type="local")
+    assert entry["id"] == max(entry["id"] for entry in load_registry().values())
+    assert load_registry()["ZZ"]["name"] == "Test Sekuritas"
+
+    changed = update_local_entry("ZZ", category="Retail")
+    assert (changed["id"], changed["name"], changed["category"]) == (entry["id"], "Test Sekuritas", "retail")
+    with pytest.raises(ValueError):
+        update_local_entry("ZZ", broker_type="offshore")
+
+
+def test_sync_registry_moves_rows_of_newly_registered_codes(conn):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "QQ")])
+    store_id = conn.execute("SELECT broker_id FROM broker_rows WHERE broker = 'QQ'").fetchone()[0]
+    assert store_id >= UNREGISTERED_ID_BASE
+
+    entry = update_local_entry("QQ", broker_type="foreign")
+    assert sync_registry(conn) == 1
+    assert sync_registry(conn) == 0
+    for table in ("broker_rows", "broker_activity"):
+        assert conn.execute(f"SELECT broker_id FROM {table} WHERE broker = 'QQ'").fetchone()[0] == entry["id"]
+    assert conn.execute("SELECT type FROM brokers WHERE code = 'QQ'").fetchone()[0] == "foreign"
+
+
+def test_group_flow_by_type(conn):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("AK", "YP", buy_value="300", sell_value="300")])
+    save_day(conn, "BBCA", "2026-01-21", [table_row("YP", "BK", buy_value="100", sell_value="100")])
+    save_day(conn, "BBCA", "2026-01-21", [table_row("YP", "BK", buy_value="100", sell_value="100"),
+                                          table_row("QQ", "PD", buy_value="10", sell_value="10")])
+
+    flow = group_flow(conn, by="type")
+    groups = list(flow["groups"])
+    assert groups == ["foreign", "local", "unknown"]
+    np.testing.assert_array_equal(flow["net_value"][:, 0], [200.0, -210.0, 10.0])
+
+    per_date = group_flow(conn, by="type", per="date", start="2026-01-21")
+    assert list(per_date["keys"]) == ["2026-01-21"]
+    np.testing.assert_array_equal(per_date["net_value"][:, 0], [-100.0, 90.0, 10.0])
+
+    with pytest.raises(ValueError):
+        group_flow(conn, by="size")
+
+
+def test_rows_carry_registry_and_store_broker_ids(conn):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "QQ")])
+    ids = dict(conn.execute("SELECT broker, broker_id FROM broker_rows"))
+    assert ids["YP"] == registry_ids()["YP"]
+    assert ids["QQ"] >= UNREGISTERED_ID_BASE
+
+
+def test_open_store_adds_broker_ids_to_older_stores(store_path):
+    store_path.parent.mkdir(parents=True)
+    old = sqlite3.connect(store_path)
+    old.execute(
+        "CREATE TABLE broker_rows (symbol TEXT NOT NULL, date TEXT NOT NULL, side TEXT NOT NULL, "
+        "rank INTEGER NOT NULL, broker TEXT NOT NULL, value REAL, lot REAL, avg REAL, "
+        "PRIMARY KEY (symbol, date, side, rank))"
+    )
+    old.execute("INSERT INTO broker_rows VALUES ('BUMI', '2026-01-20', 'B', 0, 'YP', 1, 1, 1)")
+    old.commit()
+    old.close()
+
+    conn = open_store(store_path)
+    try:
+        assert conn.execute("SELECT broker_id FROM broker_rows").fetchone()[0] == registry_ids()["YP"]
+    finally:
+        conn.close()
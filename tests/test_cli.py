@@ -0,0 +1,54 @@
+import pytest
+
+from stockbit_analyzer import cli
+
+
+@pytest.mark.parametrize("argv, handler", [
+    (["extract", "--stock", "BUMI"], cli.run_browser),
+    (["login"], cli.run_browser),
+    (["repair", "--stock", "BUMI"], cli.run_repair),
+    (["serve"], cli.run_serve),
+    (["flow", "--stock", "BUMI"], cli.show_flow),
+    (["query", "BUMI"], cli.show_query),
+    (["screen"], cli.show_screen),
+    ([], cli.run_browser),
+    (["--stock", "BUMI", "--extract"], cli.run_browser),
+    (["--stock", "BUMI", "--flow"], cli.show_flow),
+    (["--stock", "BUMI", "--series", "YP"], cli.show_series),
+    (["--stock", "BUMI", "--rebuild-matrix"], cli.show_series),
+    (["--serve"], cli.run_serve),
+    (["--stock", "BUMI", "--rolling"], cli.show_rolling),
+    (["--screen"], cli.show_screen),
+    (["--broker", "YP"], cli.show_broker_activity),
+    (["--rebuild-index"], cli.show_broker_activity),
+    (["--replay", "artifacts/BUMI"], cli.show_replay),
+])
+def test_parse_args_routes_commands_and_legacy_flags(argv, handler):
+    assert cli.parse_args(argv).handler is handler
+
+
+def test_legacy_flags_share_the_subcommand_options():
+    legacy = cli.parse_args(["--stock", "BUMI", "--extract", "--days", "5", "--batch", "--format", "ndjson"])
+    command = cli.parse_args(["extract", "--stock", "BUMI", "--days", "5", "--batch", "--format", "ndjson"])
+    for name in ("stock", "days", "batch", "format", "pages", "artifacts", "log_level", "manual_login", "store"):
+        assert getattr(legacy, name) == getattr(command, name)
+    assert legacy.extract and command.extract
+
+
+def test_legacy_days_default():
+    assert cli.parse_args(["--stock", "BUMI", "--extract"]).days == 1
+    assert cli.parse_args(["--screen"]).days is None
+    assert cli.parse_args(["--screen", "--days", "1"]).days == 1
+    assert cli.parse_args(["screen"]).days is None
+
+
+def test_subcommands_reject_options_of_other_commands():
+    with pytest.raises(SystemExit):
+        cli.parse_args(["flow", "--stock", "BUMI", "--port", "9000"])
+    with pytest.raises(SystemExit):
+        cli.parse_args(["extract"])
+
+
+def test_main_reports_handler_errors(capsys):
+    assert cli.main(["--flow"]) == 1
+    assert "--flow requires --stock" in capsys.readouterr().err
@@ -0,0 +1,153 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("dotenv")
+
+from conftest import table_row  # noqa: E402
+from stockbit_analyzer import daemon  # noqa: E402
+from stockbit_analyzer.daemon import DONE, FAILED, QUEUED, JobQueue, job_outcome, make_handler, parse_job  # noqa: E402
+from stockbit_analyzer.query import StoreQuery  # noqa: E402
+from stockbit_analyzer.store import save_day  # noqa: E402
+
+
+def test_submit_deduplicates_in_flight_jobs():
+    jobs = JobQueue()
+    job, created = jobs.submit("BUMI", ["2026-01-20"], "cached")
+    again, created_again = jobs.submit("BUMI", ["2026-01-20"], "cached")
+    assert created and not created_again
+    assert again is job
+    assert jobs.submit("BUMI", ["2026-01-20"], "refresh")[1]
+
+    assert jobs.next(timeout=0)["id"] == job["id"]
+    jobs.complete(job, DONE, stored_days=1)
+    assert jobs.submit("BUMI", ["2026-01-20"], "cached")[1]
+
+
+def test_finished_jobs_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(daemon.time, "time", lambda: now[0])
+    jobs = JobQueue(ttl=60, max_finished=2)
+    finished = []
+    for day in ("2026-01-19", "2026-01-20", "2026-01-21"):
+        job, _ = jobs.submit("BUMI", [day], "cached")
+        jobs.complete(job, DONE)
+        finished.append(job["id"])
+    running, _ = jobs.submit("BBCA", ["2026-01-21"], "cached")
+
+    assert jobs.get(finished[0]) is None
+    assert jobs.get(finished[2]) is not None
+    now[0] += 61
+    assert jobs.get(finished[2]) is None
+    assert jobs.public(jobs.get(running["id"]))["status"] == QUEUED
+    assert "_done" not in jobs.public(running)
+
+
+@pytest.mark.parametrize("request_body", [
+    {"symbol": "BUMI", "days": 0},
+    {"symbol": "BUMI", "days": -3},
+    {"symbol": "BUMI", "dates": []},
+    {"symbol": "BUMI", "dates": ["20/01/2026"]},
+    {"symbol": "BUMI", "mode": "eventually"},
+    {"symbol": 7},
+    {"days": 5},
+    [],
+])
+def test_parse_job_rejects_invalid_requests(request_body):
+    with pytest.raises((KeyError, ValueError, AttributeError, TypeError)):
+        parse_job(request_body)
+
+
+def test_parse_job():
+    assert parse_job({"symbol": "bumi", "dates": ["Jan 21, 2026", "2026-01-20", "2026-01-21"]}) == (
+        "BUMI", ["2026-01-20", "2026-01-21"], "cached",
+    )
+    symbol, dates, mode = parse_job({"symbol": "BUMI", "days": 3, "mode": "refresh"})
+    assert (symbol, len(dates), mode) == ("BUMI", 3, "refresh")
+
+
+def test_job_outcome():
+    assert job_outcome(2, []) == (DONE, None)
+    assert job_outcome(0, [])[0] == FAILED
+    assert job_outcome(1, ["2026-01-20"]) == (FAILED, "1 day(s) failed: 2026-01-20")
+
+
+@pytest.fixture
+def server(conn, store_path):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD")])
+    jobs = JobQueue()
+    queries = StoreQuery(store_path)
+    server = daemon.ThreadingHTTPServer(("127.0.0.1", 0), make_handler(jobs, store_path, queries))
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", jobs
+    server.shutdown()
+    server.server_close()
+    queries.close()
+
+
+def request(url, body=None):
+    data = None if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    try:
+        with urllib.request.urlopen(url, data=data) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("body", [
+    {"symbol": "BUMI", "days": 0},
+    {"symbol": "BUMI", "dates": []},
+    {"symbol": ["BUMI"]},
+    b"[]",
+    b"not json",
+])
+def test_invalid_jobs_are_rejected_with_400(server, body):
+    url, jobs = server
+    status, payload = request(f"{url}/jobs", body)
+    assert status == 400
+    assert payload["error"].startswith("Invalid job")
+    assert jobs.depth() == 0
+
+
+def test_cached_and_queued_jobs(server):
+    url, jobs = server
+    status, payload = request(f"{url}/jobs", {"symbol": "bumi", "dates": ["2026-01-20"]})
+    assert (status, payload["status"], payload["cached"]) == (200, DONE, True)
+    assert [row["broker"] for row in payload["data"]["2026-01-20"]] == ["YP", "PD"]
+
+    status, payload = request(f"{url}/jobs", {"symbol": "BUMI", "dates": ["2026-01-21"]})
+    assert (status, payload["status"]) == (202, QUEUED)
+    status, again = request(f"{url}/jobs", {"symbol": "BUMI", "dates": ["2026-01-21"]})
+    assert (status, again["id"], again["deduplicated"]) == (200, payload["id"], True)
+    assert jobs.depth() == 1
+
+
+def test_bad_query_parameters_get_400(server):
+    url, _ = server
+    assert request(f"{url}/summary?symbol=BUMI&date=yesterday")[0] == 400
+    assert request(f"{url}/jobs/unknown")[0] == 404
+
+
+def test_run_job_refills_the_budget_but_keeps_breakers(monkeypatch, store_path):
+    from stockbit_analyzer.retry import BREAKER, DEFAULT_BUDGET
+
+    def extract(page, symbol, dates, on_day, failed, **kwargs):
+        on_day(symbol, {"date": "2026-01-20", "rows": [table_row(f"A{index}", f"B{index}") for index in range(5)]})
+        failed.append("2026-01-21")
+
+    monkeypatch.setattr(daemon, "extract_broker_summary", extract)
+    for _ in range(BREAKER.failure_threshold):
+        BREAKER.record_failure("TLKM", "extract_day")
+    DEFAULT_BUDGET.consume()
+    try:
+        job = {"symbol": "BUMI", "dates": ["2026-01-20", "2026-01-21"]}
+        assert daemon.run_job(SimpleNamespace(page=None), job, store_path) == (1, ["2026-01-21"])
+        assert DEFAULT_BUDGET.spent == 0
+        assert BREAKER.is_open("TLKM", "extract_day")
+    finally:
+        BREAKER.reset()
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer.indicators import (
+    RollingIndicators, check_consistency, load_indicators, rebuild_from_store, snapshot_path, update_indicators,
+)
+from stockbit_analyzer.store import save_day, split_sides
+
+
+DAYS = [f"2026-01-{day:02d}" for day in range(5, 31) if day % 7 not in (3, 4)]
+
+
+def day_rows(index):
+    return [
+        table_row("YP", "PD", buy_value=str(100 + index), sell_value=str(50 + index), buy_lot="10", sell_lot="5"),
+        table_row("CC", "YP", buy_value=str(30 * (index % 3)), sell_value="20", buy_lot="3", sell_lot="2"),
+    ]
+
+
+def side_rows(rows):
+    return [(side, broker, value, lot, avg) for side, _, broker, value, lot, avg in split_sides(rows)]
+
+
+def ingest(conn, root, days):
+    for index, date in enumerate(days):
+        rows = day_rows(index)
+        save_day(conn, "BUMI", date, rows)
+        update_indicators(root, conn, "BUMI", date, side_rows(rows), windows=(2, 5))
+
+
+def test_window_sums_evict_old_days():
+    engine = RollingIndicators("BUMI", windows=(2,))
+    engine.update("2026-01-05", {"YP": (10.0, 1.0)})
+    engine.update("2026-01-06", {"YP": (20.0, 2.0), "PD": (-5.0, -1.0)})
+    engine.update("2026-01-07", {"YP": (-1.0, 0.0)})
+    values = engine.values(2)
+    assert values["brokers"].tolist() == ["YP", "PD"]
+    assert values["net_value"].tolist() == [19.0, -5.0]
+    assert values["accumulation_days"].tolist() == [1, 0]
+    assert values["days"] == 2
+
+
+def test_readding_the_latest_day_replaces_it():
+    engine = RollingIndicators("BUMI", windows=(2,))
+    engine.update("2026-01-05", {"YP": (10.0, 1.0)})
+    engine.update("2026-01-05", {"YP": (3.0, 1.0)})
+    assert engine.values(2)["net_value"].tolist() == [3.0]
+    with pytest.raises(ValueError):
+        engine.update("2026-01-04", {"YP": (1.0, 1.0)})
+
+
+def test_incremental_updates_match_a_full_recompute(conn, tmp_path):
+    root = tmp_path / "indicators"
+    ingest(conn, root, DAYS)
+    engine = load_indicators(root, conn, "BUMI", windows=(2, 5))
+    assert engine.dates == DAYS[-5:]
+    assert check_consistency(engine, conn) == []
+
+
+def test_snapshot_round_trip(conn, tmp_path):
+    root = tmp_path / "indicators"
+    ingest(conn, root, DAYS[:4])
+    engine = RollingIndicators.load(snapshot_path(root, "BUMI"))
+    rebuilt = rebuild_from_store(conn, "BUMI", windows=(2, 5))
+    for window in (2, 5):
+        np.testing.assert_allclose(engine.values(window)["net_value"], rebuilt.values(window)["net_value"])
+
+
+def test_backfilled_day_is_caught_up(conn, tmp_path):
+    root = tmp_path / "indicators"
+    ingest(conn, root, DAYS[2:6])
+    # A day stored before the window started without going through update_indicators
+    save_day(conn, "BUMI", DAYS[0], day_rows(9))
+    engine = load_indicators(root, conn, "BUMI", windows=(2, 5))
+    assert engine.dates == [DAYS[0]] + DAYS[2:6]
+    assert check_consistency(engine, conn) == []
+
+
+def test_check_consistency_reports_drift(conn, tmp_path):
+    root = tmp_path / "indicators"
+    ingest(conn, root, DAYS[:3])
+    engine = load_indicators(root, conn, "BUMI", windows=(2, 5))
+    engine.sums[("net_value", 2)][0] += 1000
+    assert any("net_value differs for YP" in mismatch for mismatch in check_consistency(engine, conn))
@@ -0,0 +1,35 @@
+import math
+
+from conftest import table_row
+from stockbit_analyzer.intraday import diff_snapshot, list_snapshots, load_snapshot, save_snapshot, snapshot_map
+from stockbit_analyzer.store import BUY, SELL
+
+
+def test_diff_snapshot_reports_changes_and_removals():
+    previous = {(BUY, "YP"): (100.0, 10.0, 10.0), (SELL, "PD"): (50.0, 5.0, math.nan)}
+    current = {(BUY, "YP"): (100.0, 10.0, 10.0), (SELL, "PD"): (60.0, 6.0, math.nan), (BUY, "CC"): (1.0, 1.0, 1.0)}
+    changes = sorted(diff_snapshot(previous, current))
+    assert [change[:2] for change in changes] == [(BUY, "CC"), (SELL, "PD")]
+    assert changes[1][2:4] == (60.0, 6.0)
+    assert sorted(diff_snapshot(current, {})) == [
+        (BUY, "CC", None, None, None, 1),
+        (BUY, "YP", None, None, None, 1),
+        (SELL, "PD", None, None, None, 1),
+    ]
+
+
+def test_unchanged_nan_cells_are_not_changes():
+    snapshot = {(BUY, "YP"): (100.0, 10.0, math.nan)}
+    assert diff_snapshot(snapshot, dict(snapshot)) == []
+
+
+def test_deltas_rebuild_each_snapshot(conn):
+    first = snapshot_map([table_row("YP", "PD", buy_value="100"), table_row("CC", "NI")])
+    second = snapshot_map([table_row("YP", "PD", buy_value="150")])
+
+    save_snapshot(conn, "BUMI", "2026-01-20", "09:30:00", diff_snapshot({}, first), len(first))
+    save_snapshot(conn, "BUMI", "2026-01-20", "09:35:00", diff_snapshot(first, second), len(second))
+
+    assert load_snapshot(conn, "BUMI", "2026-01-20", at="09:30:00") == first
+    assert load_snapshot(conn, "BUMI", "2026-01-20") == second
+    assert list_snapshots(conn, "BUMI", "2026-01-20") == [("09:30:00", 4, 4), ("09:35:00", 3, 2)]
@@ -0,0 +1,86 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from stockbit_analyzer.logs import (
+    LOGGER_NAME, HumanFormatter, JsonFormatter, configure_logging, get_logger, shutdown_logging, timed,
+)
+
+
+def make_record(message, level=logging.INFO, exc_info=None, **fields):
+    record = logging.LogRecord(f"{LOGGER_NAME}.runner", level, __file__, 1, message, None, exc_info)
+    record.created = 1768900000.0
+    for name, value in fields.items():
+        setattr(record, name, value)
+    return record
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    shutdown_logging()
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = True
+    logger.setLevel(logging.NOTSET)
+
+
+def test_get_logger_namespaces():
+    assert get_logger("stockbit_analyzer.runner").name == "stockbit_analyzer.runner"
+    assert get_logger("__main__").name == LOGGER_NAME
+    assert get_logger("notebook").name == "stockbit_analyzer.notebook"
+
+
+def test_json_formatter_fields():
+    entry = json.loads(JsonFormatter().format(
+        make_record("Stored day", symbol="BUMI", date="2026-01-20", duration=1.23456, page=None)
+    ))
+    assert entry == {
+        "ts": "2026-01-20T09:06:40.000+00:00",
+        "level": "info",
+        "logger": "stockbit_analyzer.runner",
+        "msg": "Stored day",
+        "symbol": "BUMI",
+        "date": "2026-01-20",
+        "duration": 1.235,
+    }
+
+
+def test_json_formatter_keeps_the_traceback():
+    try:
+        raise ValueError("bad table")
+    except ValueError:
+        record = make_record("Extraction failed", level=logging.ERROR, exc_info=sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "error"
+    assert "ValueError: bad table" in entry["exc"]
+
+
+def test_human_formatter():
+    formatter = HumanFormatter()
+    assert formatter.format(make_record("Opened page", duration=2.0)) == "Opened page (2.0s)"
+    assert formatter.format(make_record("Retrying", level=logging.WARNING)) == "[warning] Retrying"
+
+
+def test_configure_logging_writes_json_lines(tmp_path, restore_logging):
+    stream = io.StringIO()
+    log_file = tmp_path / "run.jsonl"
+    configure_logging(level="INFO", stream=stream, log_file=log_file)
+    log = get_logger("stockbit_analyzer.runner")
+    log.debug("hidden")
+    with timed(log, "store", "Stored BUMI", symbol="BUMI"):
+        pass
+    shutdown_logging()
+
+    assert stream.getvalue().startswith("Stored BUMI (")
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [(entry["msg"], entry["phase"], entry["symbol"]) for entry in entries] == [("Stored BUMI", "store", "BUMI")]
+
+
+def test_configure_logging_rejects_unknown_format(restore_logging):
+    with pytest.raises(ValueError):
+        configure_logging(log_format="xml")
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer.matrix import BrokerMatrix, build_matrix
+from stockbit_analyzer.store import BUY, SELL, save_day
+
+
+def test_append_and_backfill_days(tmp_path):
+    matrix = BrokerMatrix(tmp_path, "BUMI")
+    matrix.append_day("2026-01-20", [(BUY, "YP", 100.0, 10.0, 10.0), (SELL, "PD", 40.0, 4.0, 10.0)])
+    matrix.append_day("2026-01-22", [(BUY, "PD", 30.0, 3.0, 10.0)])
+    matrix.append_day("2026-01-21", [(SELL, "YP", 5.0, 1.0, 5.0)])
+
+    reopened = BrokerMatrix(tmp_path, "BUMI")
+    dates, net_lot = reopened.series("YP")
+    assert list(dates) == ["2026-01-20", "2026-01-21", "2026-01-22"]
+    assert net_lot.tolist() == [10.0, -1.0, 0.0]
+    assert reopened.view("net_value", "2026-01-21", "2026-01-22").shape == (2, 2)
+
+
+def test_averages_of_inactive_days_are_nan(tmp_path):
+    matrix = BrokerMatrix(tmp_path, "BUMI")
+    matrix.append_day("2026-01-20", [(BUY, "YP", 100.0, 10.0, 10.0)])
+    matrix.append_day("2026-01-19", [(BUY, "PD", 100.0, 10.0, 10.0)])
+    _, buy_avg = matrix.series("YP", metric="buy_avg")
+    assert math.isnan(buy_avg[0]) and buy_avg[1] == 10.0
+
+
+def test_build_matrix_drops_days_no_longer_stored(conn, tmp_path):
+    root = tmp_path / "matrix"
+    matrix = BrokerMatrix(root, "BUMI")
+    matrix.append_day("2026-01-15", [(BUY, "ZZ", 1.0, 1.0, 1.0)])
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD", buy_value="100", sell_value="40")])
+
+    rebuilt = build_matrix(conn, "BUMI", root)
+    assert rebuilt.dates == ["2026-01-20"]
+    assert sorted(rebuilt.brokers) == ["PD", "YP"]
+    np.testing.assert_array_equal(rebuilt.series("YP", metric="net_value")[1], [100.0])
+
+
+def test_rows_without_an_average_keep_the_known_average(tmp_path):
+    matrix = BrokerMatrix(tmp_path, "BUMI")
+    matrix.append_day("2026-01-20", [(BUY, "YP", 100.0, 10.0, 10.0), (BUY, "YP", 50.0, 10.0, None)])
+    assert matrix.series("YP", metric="buy_avg")[1].tolist() == [10.0]
+    assert matrix.series("YP", metric="buy_lot")[1].tolist() == [20.0]
+
+
+def test_resize_records_the_new_capacity(tmp_path, monkeypatch):
+    matrix = BrokerMatrix(tmp_path, "BUMI")
+    matrix.append_day("2026-01-20", [(BUY, "YP", 100.0, 10.0, 10.0)])
+
+    # Die right after the widened files are written, before append_day commits the day
+    def crash(*args):
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr(BrokerMatrix, "_write_row", crash)
+    codes = [f"X{index:03d}" for index in range(matrix.capacity + 1)]
+    with pytest.raises(RuntimeError):
+        matrix.append_day("2026-01-21", [(BUY, code, 1.0, 1.0, 1.0) for code in codes])
+
+    reopened = BrokerMatrix(tmp_path, "BUMI")
+    assert reopened.capacity > len(codes)
+    assert reopened.dates == ["2026-01-20"]
+    assert reopened.series("YP", metric="net_value")[1].tolist() == [100.0]
@@ -0,0 +1,32 @@
+import pytest
+
+from stockbit_analyzer.metrics import Registry
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = Registry()
+    navigations = registry.counter("stockbit_navigations_total", "Page navigations", labels=("symbol",))
+    queue = registry.gauge("stockbit_queue_depth", "Queued jobs")
+    seconds = registry.histogram("stockbit_day_seconds", "Day extraction time", buckets=(1.0, 5.0))
+
+    navigations.inc(symbol="BUMI")
+    navigations.inc(2, symbol="BUMI")
+    queue.set(4)
+    seconds.observe(0.5)
+    seconds.observe(3.0)
+
+    assert navigations.value(symbol="BUMI") == 3
+    assert seconds.count() == 2
+    text = registry.render()
+    assert "# TYPE stockbit_navigations_total counter" in text
+    assert 'stockbit_navigations_total{symbol="BUMI"} 3' in text
+    assert "stockbit_queue_depth 4" in text
+    assert 'stockbit_day_seconds_bucket{le="1"} 1' in text
+    assert 'stockbit_day_seconds_bucket{le="+Inf"} 2' in text
+
+
+def test_duplicate_names_are_rejected():
+    registry = Registry()
+    registry.counter("stockbit_retries_total", "Retries")
+    with pytest.raises(ValueError):
+        registry.gauge("stockbit_retries_total", "Retries")
@@ -0,0 +1,50 @@
+import math
+from datetime import datetime
+
+import pytest
+
+from stockbit_analyzer.parsing import parse_broker_table, parse_number, to_iso_date
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12,345", 12345.0),
+    ("1.2B", 1.2e9),
+    ("-3.4M", -3.4e6),
+    ("850k", 850e3),
+    ("2T", 2e12),
+    (7, 7.0),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", [None, "", "-", "n/a"])
+def test_parse_number_missing_is_nan(text):
+    assert math.isnan(parse_number(text))
+
+
+def test_to_iso_date_formats():
+    assert to_iso_date("2026-01-20") == "2026-01-20"
+    assert to_iso_date("Jan 20, 2026") == "2026-01-20"
+    assert to_iso_date(datetime(2026, 1, 20, 9, 30)) == "2026-01-20"
+
+
+def test_to_iso_date_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        to_iso_date("20/01/2026")
+
+
+def test_parse_broker_table():
+    text = """
+        Broker Summary Net
+        BY B.val B.lot B.avg SL S.val S.lot S.avg
+        YP 1.2B 1,000 1,200 PD 900M 750 1,198
+        CC 500M 400 1,250 - - - -
+        Foreign Domestic
+    """
+    rows = parse_broker_table(text)
+    assert rows == [["YP", "1.2B", "1,000", "1,200", "PD", "900M", "750", "1,198"]]
+
+
+def test_parse_broker_table_without_header():
+    assert parse_broker_table("No data available") is None
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer.pipeline import IngestPipeline, PipelineError
+from stockbit_analyzer.store import list_dates, list_symbols, open_store, save_day
+
+
+def day(date, prefix="A"):
+    return {"date": date, "rows": [table_row(f"{prefix}{index}", f"Z{index}") for index in range(5)]}
+
+
+def test_stores_days_and_skips_empty_ones(store_path):
+    with IngestPipeline(store_path) as pipeline:
+        pipeline.submit("BUMI", day("2026-01-20"))
+        pipeline.submit("BUMI", {"date": "2026-01-21", "rows": []})
+        pipeline.submit("BUMI", None)
+        pipeline.submit("BUMI", day("2026-01-22"))
+    assert (pipeline.stored, pipeline.skipped) == (2, 2)
+
+    conn = open_store(store_path)
+    try:
+        assert list_dates(conn, "BUMI") == ["2026-01-20", "2026-01-22"]
+    finally:
+        conn.close()
+
+
+def test_close_is_idempotent(store_path):
+    pipeline = IngestPipeline(store_path)
+    pipeline.submit("BUMI", day("2026-01-20"))
+    assert pipeline.close() == 1
+    assert pipeline.close() == 1
+
+
+def test_worker_error_reaches_the_producer(store_path):
+    pipeline = IngestPipeline(store_path, maxsize=1)
+    pipeline.submit("BUMI", day("not a date"))
+    with pytest.raises(PipelineError):
+        for index in range(50):
+            pipeline.submit("BUMI", day("2026-01-20"))
+    pipeline.close()
+    assert isinstance(pipeline.error, ValueError)
+
+
+def test_worker_error_is_raised_on_exit(store_path):
+    with pytest.raises(PipelineError):
+        with IngestPipeline(store_path) as pipeline:
+            pipeline.submit("BUMI", day("not a date"))
+    assert pipeline.stored == 0
+
+
+def test_exit_does_not_mask_the_producer_error(store_path):
+    with pytest.raises(KeyError):
+        with IngestPipeline(store_path) as pipeline:
+            pipeline.submit("BUMI", day("not a date"))
+            raise KeyError("page")
+
+
+def test_parallel_workers_allocate_distinct_broker_ids(store_path):
+    symbols = [f"S{index:02d}" for index in range(12)]
+    with IngestPipeline(store_path, workers=4) as pipeline:
+        for symbol in symbols:
+            # Every day brings broker codes the store hasn't seen yet
+            pipeline.submit(symbol, day("2026-01-20", prefix=symbol))
+    assert pipeline.stored == len(symbols)
+
+    conn = open_store(store_path)
+    try:
+        assert list_symbols(conn) == symbols
+        ids = [row[0] for row in conn.execute("SELECT id FROM brokers")]
+        assert len(ids) == len(set(ids))
+    finally:
+        conn.close()
+
+
+def test_concurrent_writers_never_share_a_new_broker_id(store_path):
+    open_store(store_path).close()
+    writers = 4
+    barrier = threading.Barrier(writers)
+    errors = []
+
+    def write(writer):
+        conn = open_store(store_path)
+        try:
+            for index in range(20):
+                barrier.wait()
+                save_day(conn, f"S{writer}", "2026-01-20", [table_row(f"Q{writer}{index}", f"R{writer}{index}")])
+        except Exception as e:
+            errors.append(e)
+            barrier.abort()
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,125 @@
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer import cli
+from stockbit_analyzer.quality import (
+    DATE_MISMATCH, FEW_ROWS, NO_DATE_RANGE, PICKER_MISMATCH, SAME_AS_PREVIOUS, UNBALANCED_TOTALS,
+    content_hash, day_flags, flagged_days, recheck_symbol, save_quality, totals_balanced, validate_day,
+)
+from stockbit_analyzer.store import BUY, SELL, open_store, save_day
+
+
+def balanced_rows(n=5, value=100.0):
+    rows = []
+    for index in range(n):
+        broker = f"B{index}"
+        rows.append((BUY, broker, value, 10.0, 10.0))
+        rows.append((SELL, broker, value, 10.0, 10.0))
+    return rows
+
+
+def test_content_hash_ignores_order():
+    rows = balanced_rows()
+    assert content_hash(rows) == content_hash(list(reversed(rows)))
+    assert content_hash(rows) != content_hash(rows[:-1])
+
+
+def test_totals_balanced_within_tolerance():
+    rows = [(BUY, "YP", 100.0, 10.0, 1.0), (SELL, "PD", 103.0, 10.0, 1.0)]
+    assert totals_balanced(rows)
+    assert not totals_balanced([(BUY, "YP", 100.0, 10.0, 1.0), (SELL, "PD", 150.0, 10.0, 1.0)])
+
+
+def test_day_flags_clean_day():
+    date_range = {"start": "Jan 20, 2026", "end": "Jan 20, 2026"}
+    assert day_flags(balanced_rows(), "2026-01-20", date_range=date_range, date_verified=True) == []
+
+
+def test_day_flags_date_checks():
+    rows = balanced_rows()
+    wrong_range = {"start": "Jan 19, 2026", "end": "Jan 19, 2026"}
+    assert day_flags(rows, "2026-01-20", date_range=wrong_range, date_verified=True) == [DATE_MISMATCH]
+    assert day_flags(rows, "2026-01-20", date_range=None, date_verified=False) == [PICKER_MISMATCH, NO_DATE_RANGE]
+    # Without a picker result (re-checks) the date is not looked at
+    assert day_flags(rows, "2026-01-20") == []
+
+
+def test_day_flags_content_checks():
+    rows = balanced_rows()
+    assert UNBALANCED_TOTALS in day_flags(rows + [(BUY, "XX", 1e6, 1e3, 1.0)], "2026-01-20")
+    assert FEW_ROWS in day_flags(balanced_rows(n=1), "2026-01-20")
+    assert FEW_ROWS in day_flags(rows, "2026-01-20", median_rows=40)
+    assert SAME_AS_PREVIOUS in day_flags(rows, "2026-01-20", previous_hash=content_hash(rows))
+
+
+def test_validate_day_compares_with_the_previous_stored_day(conn):
+    rows = [table_row(f"A{index}", f"B{index}") for index in range(5)]
+    save_day(conn, "BUMI", "2026-01-19", rows)
+    side_rows = [(BUY, f"A{index}", 1.2e9, 1000.0, 1200.0) for index in range(5)]
+    side_rows += [(SELL, f"B{index}", 1.2e9, 1000.0, 1200.0) for index in range(5)]
+    quality = validate_day(conn, "BUMI", "2026-01-20", side_rows)
+    assert quality["flags"] == [SAME_AS_PREVIOUS]
+    assert quality["row_count"] == 10
+
+
+def test_recheck_keeps_extraction_flags(conn):
+    rows = [table_row(f"A{index}", f"B{index}") for index in range(5)]
+    save_day(conn, "BUMI", "2026-01-19", rows)
+    save_day(conn, "BUMI", "2026-01-20", [table_row(f"C{index}", f"D{index}") for index in range(5)])
+    save_quality(conn, "BUMI", "2026-01-20", {"flags": [DATE_MISMATCH], "content_hash": "", "row_count": 10})
+
+    assert recheck_symbol(conn, "BUMI") == 1
+    assert flagged_days(conn) == [("BUMI", "2026-01-20", [DATE_MISMATCH])]
+
+
+def flag_day(store_path):
+    conn = open_store(store_path)
+    try:
+        save_day(conn, "BUMI", "2026-01-20", [table_row(f"A{index}", f"B{index}") for index in range(5)])
+        save_quality(conn, "BUMI", "2026-01-20", {"flags": [DATE_MISMATCH], "content_hash": "", "row_count": 10})
+    finally:
+        conn.close()
+
+
+def repair_args(store_path):
+    return cli.parse_args(["repair", "--stock", "bumi", "--batch", "--store", str(store_path)])
+
+
+def clear_flags(store_path):
+    conn = open_store(store_path)
+    try:
+        save_quality(conn, "BUMI", "2026-01-20", {"flags": [], "content_hash": "", "row_count": 10})
+    finally:
+        conn.close()
+
+
+def test_repair_fails_when_the_browser_run_fails(store_path, monkeypatch):
+    flag_day(store_path)
+
+    def fetch(args):
+        assert [date.strftime("%Y-%m-%d") for date in args.dates] == ["2026-01-20"]
+        # The day was re-stored clean, but the run itself failed
+        clear_flags(store_path)
+        return 1
+
+    monkeypatch.setattr(cli, "run_browser", fetch)
+    assert cli.run_repair(repair_args(store_path)) == 1
+
+
+def test_repair_fails_while_days_stay_flagged(store_path, monkeypatch):
+    flag_day(store_path)
+    monkeypatch.setattr(cli, "run_browser", lambda args: 0)
+    assert cli.run_repair(repair_args(store_path)) == 1
+
+
+def test_repair_succeeds_once_no_day_is_flagged(store_path, monkeypatch):
+    flag_day(store_path)
+
+    def fetch(args):
+        clear_flags(store_path)
+        return 0
+
+    monkeypatch.setattr(cli, "run_browser", fetch)
+    assert cli.run_repair(repair_args(store_path)) == 0
+    monkeypatch.setattr(cli, "run_browser", lambda args: pytest.fail("nothing to re-fetch"))
+    assert cli.run_repair(repair_args(store_path)) == 0
@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+
+from conftest import table_row
+from stockbit_analyzer.query import StoreQuery
+from stockbit_analyzer.store import open_store, save_day
+
+
+def test_cache_is_dropped_when_another_connection_commits(conn, store_path):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD")])
+    with StoreQuery(store_path) as query:
+        first = query.summary("BUMI")
+        assert query.summary("BUMI") is first
+        assert (query.hits, query.misses) == (1, 1)
+
+        writer = open_store(store_path)
+        try:
+            save_day(writer, "BUMI", "2026-01-21", [table_row("YP", "PD")])
+        finally:
+            writer.close()
+
+        assert query.summary("BUMI") is not first
+        assert query.misses == 2
+
+
+def test_cache_is_bounded(conn, store_path):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD")])
+    with StoreQuery(store_path, cache_size=1) as query:
+        query.summary("BUMI")
+        query.top("BUMI")
+        query.summary("BUMI")
+        assert query.misses == 3
+
+
+def test_query_connection_is_read_only(store_path):
+    with StoreQuery(store_path) as query:
+        assert query.summary("BUMI") == []
+        with pytest.raises(sqlite3.OperationalError):
+            query.conn.execute("DELETE FROM broker_rows")
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from stockbit_analyzer import retry
+from stockbit_analyzer.retry import (
+    CLOSED_TARGET, MISSING_SELECTOR, OTHER, PROFILE_LOCKED, TIMEOUT,
+    CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy, classify_error,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda seconds: None)
+
+
+@pytest.mark.parametrize("message, error_class", [
+    ("Timeout 30000ms exceeded", TIMEOUT),
+    ("Target page, context or browser has been closed", CLOSED_TARGET),
+    ("waiting for selector 'table'", MISSING_SELECTOR),
+    ("The profile appears to be in use by another process", PROFILE_LOCKED),
+    ("something else", OTHER),
+])
+def test_classify_error(message, error_class):
+    assert classify_error(Exception(message)) == error_class
+
+
+def test_call_retries_then_succeeds():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Exception("Timeout exceeded")
+        return "ok"
+
+    assert RetryPolicy(max_attempts=3).call(flaky) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_only_retries_listed_error_classes():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise Exception("something else")
+
+    with pytest.raises(Exception):
+        RetryPolicy(max_attempts=3, retry_on=(TIMEOUT,)).call(broken)
+    assert len(calls) == 1
+
+
+def test_budget_caps_retries_and_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+    budget = RetryBudget(max_retries=2, refill_every=10.0)
+    assert [budget.consume() for _ in range(3)] == [True, True, False]
+    now[0] += 10.0
+    assert budget.consume()
+    assert not budget.consume()
+    budget.reset()
+    assert budget.spent == 0
+
+
+def test_exhausted_budget_stops_retrying():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise Exception("Timeout exceeded")
+
+    policy = RetryPolicy(max_attempts=5, budget=RetryBudget(max_retries=1, refill_every=None))
+    with pytest.raises(Exception):
+        policy.call(broken)
+    assert len(calls) == 2
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=60)
+    breaker.record_failure("BUMI", "extract_day")
+    assert breaker.allow("BUMI", "extract_day")
+    breaker.record_failure("BUMI", "extract_day")
+    assert breaker.is_open("BUMI", "extract_day")
+    assert breaker.allow("BBCA", "extract_day")
+    with pytest.raises(CircuitOpenError):
+        RetryPolicy().call(lambda: None, key="BUMI", phase="extract_day", breaker=breaker)
+
+    # Half-open after reset_after: one trial goes through, and success closes it
+    opened = time.time()
+    monkeypatch.setattr(retry.time, "time", lambda: opened + 61)
+    assert breaker.allow("BUMI", "extract_day")
+    breaker.record_success("BUMI", "extract_day")
+    assert not breaker.is_open("BUMI", "extract_day")
+
+
+def test_breaker_reset():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure("BUMI", "navigate")
+    breaker.reset()
+    assert breaker.allow("BUMI", "navigate")
+
+
+def test_is_open_does_not_use_up_the_half_open_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry.time, "time", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=60)
+    breaker.record_failure("BUMI", "navigate")
+    assert breaker.is_open("BUMI", "navigate")
+
+    now[0] += 61
+    assert not breaker.is_open("BUMI", "navigate")
+    assert not breaker.is_open("BUMI", "navigate")
+    assert breaker.allow("BUMI", "navigate")
+    # The trial restarted the timer: no second trial until it fails or succeeds
+    assert not breaker.allow("BUMI", "navigate")
+    assert breaker.is_open("BUMI", "navigate")
@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from stockbit_analyzer.matrix import BrokerMatrix
+from stockbit_analyzer.screener import list_matrix_symbols, screen
+from stockbit_analyzer.store import BUY, SELL
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "matrix"
+    # BUMI: YP and its foreign peers accumulate two days running at a premium
+    bumi = BrokerMatrix(root, "BUMI")
+    bumi.append_day("2026-01-19", [(BUY, "PD", 100.0, 1.0, 100.0), (SELL, "YP", 100.0, 1.0, 100.0)])
+    bumi.append_day("2026-01-20", [(BUY, "YP", 600.0, 6.0, 110.0), (SELL, "PD", 600.0, 6.0, 100.0)])
+    bumi.append_day("2026-01-21", [(BUY, "YP", 400.0, 4.0, 110.0), (SELL, "PD", 400.0, 4.0, 100.0)])
+    # BBCA: buying spread over five brokers
+    bbca = BrokerMatrix(root, "BBCA")
+    bbca.append_day("2026-01-21", [(BUY, code, 100.0, 1.0, 100.0) for code in ("AA", "BB", "CC", "DD", "EE")])
+    return root
+
+
+def by_symbol(results):
+    return {result["symbol"]: result for result in results}
+
+
+def test_list_matrix_symbols(root, tmp_path):
+    assert list_matrix_symbols(root) == ["BBCA", "BUMI"]
+    assert list_matrix_symbols(tmp_path / "missing") == []
+
+
+def test_top3_concentration(root):
+    results = screen(root, "top3_concentration", foreign_brokers={"YP"})
+    assert [result["symbol"] for result in results] == ["BUMI", "BBCA"]
+    assert results[1]["top3_concentration"] == pytest.approx(0.6)
+
+
+def test_foreign_net_value_and_streak(root):
+    results = by_symbol(screen(root, "foreign_net_value", foreign_brokers={"YP"}))
+    assert results["BUMI"]["foreign_net_value"] == 900.0
+    assert results["BUMI"]["accumulation_streak"] == 2
+    assert results["BUMI"]["streak_broker"] == "YP"
+    assert results["BBCA"]["foreign_net_value"] == 0.0
+
+
+def test_days_narrows_the_window(root):
+    results = by_symbol(screen(root, "accumulation_streak", days=1, foreign_brokers=set()))
+    assert results["BUMI"]["accumulation_streak"] == 1
+    assert results["BUMI"]["avg_gap_pct"] == pytest.approx(10.0)
+    # BBCA has no sell side, so its gap is NaN and sorts last
+    assert math.isnan(results["BBCA"]["avg_gap_pct"])
+    assert screen(root, "avg_gap_pct", foreign_brokers=set())[-1]["symbol"] == "BBCA"
+
+
+def test_unknown_signal(root):
+    with pytest.raises(ValueError):
+        screen(root, "momentum")
@@ -0,0 +1,34 @@
+import math
+
+from conftest import table_row
+from stockbit_analyzer.store import BUY, SELL, list_dates, list_symbols, load_rows, save_day, split_sides
+
+
+def test_split_sides_keeps_rank_and_skips_empty_sides():
+    rows = [table_row("YP", "PD"), {"buyBroker": "CC", "buyValue": "1M", "buyLot": "10", "buyAvg": "-"}]
+    side_rows = split_sides(rows)
+    assert [(side, rank, broker) for side, rank, broker, *_ in side_rows] == [
+        (BUY, 0, "YP"), (SELL, 0, "PD"), (BUY, 1, "CC"),
+    ]
+    assert side_rows[0][3] == 1.2e9
+    assert math.isnan(side_rows[2][5])
+
+
+def test_save_day_replaces_the_day(conn):
+    save_day(conn, "BUMI", "2026-01-20", [table_row("YP", "PD"), table_row("CC", "NI")])
+    save_day(conn, "BUMI", "Jan 20, 2026", [table_row("AK", "BK")])
+    rows = load_rows(conn, "BUMI")
+    assert [(date, side, broker) for date, side, broker, *_ in rows] == [
+        ("2026-01-20", BUY, "AK"), ("2026-01-20", SELL, "BK"),
+    ]
+
+
+def test_list_dates_window_and_last(conn):
+    for day in ("2026-01-19", "2026-01-20", "2026-01-21", "2026-01-22"):
+        save_day(conn, "BUMI", day, [table_row("YP", "PD")])
+    save_day(conn, "BBCA", "2026-01-23", [table_row("YP", "PD")])
+    assert list_symbols(conn) == ["BBCA", "BUMI"]
+    assert list_dates(conn, "BUMI") == ["2026-01-19", "2026-01-20", "2026-01-21", "2026-01-22"]
+    assert list_dates(conn, "BUMI", start="2026-01-20", end="2026-01-21") == ["2026-01-20", "2026-01-21"]
+    assert list_dates(conn, "BUMI", last=2) == ["2026-01-21", "2026-01-22"]
+    assert list_dates(conn, "BUMI", end="2026-01-21", last=2) == ["2026-01-20", "2026-01-21"]